@@ -0,0 +1,252 @@
+"""
+Emoji analytics over chat exports too large for memory: counts how often each emoji and each
+pair of emoji in the same line are used, and prints the top N of both.
+
+    python -m apps.emoji_to_text.analytics [-n 20] [-j 4] [--exact] [export.txt ...]
+
+The input is read in chunks cut at line ends, or at a space in a line longer than a chunk,
+that are tokenized in a process pool. By default the counts go to count-min sketches with a
+top-K heap, so memory stays bounded whatever the size and variety of the input; --exact keeps
+exact counts instead, whose memory grows with the number of distinct emoji and pairs.
+Throughput is reported on stderr.
+"""
+import argparse
+import collections
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+
+from apps.emoji_to_text.index import load_index
+from apps.emoji_to_text.sketch import CountMinSketch, TopK
+from apps.emoji_to_text.tokenizer import EmojiTokenizer
+
+# bytes of input read into one chunk
+CHUNK_BYTES = 1 << 20
+
+# chunks submitted to the pool per worker before waiting for the oldest one
+_CHUNKS_IN_FLIGHT_PER_JOB = 4
+
+# separates the two emoji of a pair key
+PAIR_SEPARATOR = "\t"
+
+# whitespace a chunk may be cut after when it holds no line end
+_SPACES = (b" ", b"\t", b"\r")
+
+# index and tokenizer of the current process, created once per process
+_TOKENIZER = None
+_INDEX = None
+
+
+def get_index():
+    """Returns the emoji index, loaded once per process and inherited by forked workers"""
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = load_index()
+    return _INDEX
+
+
+def _init_worker():
+    """Pool initializer: reuses the index inherited from the parent, or loads the cache"""
+    global _TOKENIZER
+    _TOKENIZER = EmojiTokenizer(get_index().trie)
+
+
+def count_chunk(data, tokenizer=None):
+    """
+    Counts the emoji of a chunk of bytes and the pairs of distinct emoji sharing a line.
+    Returns (emoji counts, pair counts, bytes read).
+    """
+    text = data.decode("utf-8", "replace")
+    emoji_counts = collections.Counter()
+    pair_counts = collections.Counter()
+
+    def count_line(found):
+        emoji_counts.update(found)
+        if len(found) > 1:
+            distinct = sorted(set(found))
+            pair_counts.update(first + PAIR_SEPARATOR + second
+                               for first, second in itertools.combinations(distinct, 2))
+
+    # the chunk is tokenized in one pass and the emoji are grouped by line afterwards, no
+    # emoji spanning a line break
+    found = []
+    line_end = -1
+    for start, end, _ in (tokenizer or _TOKENIZER).finditer(text):
+        if start > line_end:
+            if found:
+                count_line(found)
+                found = []
+            line_end = text.find("\n", start)
+            if line_end < 0:
+                line_end = len(text)
+        found.append(text[start:end])
+    if found:
+        count_line(found)
+    return emoji_counts, pair_counts, len(data)
+
+
+def read_chunks(files, chunk_bytes=CHUNK_BYTES):
+    """
+    Yields chunks of about chunk_bytes of the binary files, read chunk_bytes at a time
+    however long the lines are. A chunk ends after its last line end, or after its last space
+    when it holds none, so only the pairs of a line longer than a chunk can be missed. One
+    with neither ends before its last character, which may be incomplete.
+    """
+    for file in files:
+        rest = b""
+        while True:
+            data = file.read(chunk_bytes)
+            if not data:
+                break
+            data = rest + data
+            cut = data.rfind(b"\n")
+            if cut < 0:
+                cut = max(data.rfind(space) for space in _SPACES)
+            if cut < 0:
+                # back to the first byte of the last character, at most 4 bytes long
+                cut = len(data) - 1
+                while cut > max(0, len(data) - 4) and data[cut] & 0xC0 == 0x80:
+                    cut -= 1
+                cut -= 1
+            rest = data[cut + 1:]
+            if cut >= 0:
+                yield data[:cut + 1]
+        if rest:
+            yield rest
+
+
+class SketchCounter:
+    """Approximate counts in a count-min sketch, with the top k keys kept aside"""
+    def __init__(self, k, width, depth):
+        self.sketch = CountMinSketch(width, depth)
+        self.top = TopK(k)
+
+    def add(self, counts):
+        self.sketch.add(counts)
+        keys = list(counts)
+        for key, estimate in zip(keys, self.sketch.estimate(keys).tolist()):
+            self.top.offer(key, estimate)
+
+    def most_common(self, n):
+        return self.top.items()[:n]
+
+    def total(self):
+        return self.sketch.total
+
+
+class ExactCounter:
+    """Exact counts in a Counter"""
+    def __init__(self):
+        self.counts = collections.Counter()
+
+    def add(self, counts):
+        self.counts.update(counts)
+
+    def most_common(self, n):
+        return self.counts.most_common(n)
+
+    def total(self):
+        return sum(self.counts.values())
+
+
+def analyze(files, jobs=1, top=20, exact=False, width=1 << 16, depth=4,
+            chunk_bytes=CHUNK_BYTES):
+    """
+    Counts the emoji and emoji pairs of the binary files. Returns (emoji counter, pair
+    counter, bytes read), the counters having most_common(n) and total().
+    """
+    if exact:
+        emoji_counter, pair_counter = ExactCounter(), ExactCounter()
+    else:
+        # a few more keys than shown are tracked, so the last ranks are not cut short
+        emoji_counter = SketchCounter(top * 2, width, depth)
+        pair_counter = SketchCounter(top * 2, width, depth)
+    read = 0
+
+    def merge(result):
+        nonlocal read
+        emoji_counts, pair_counts, size = result
+        emoji_counter.add(emoji_counts)
+        pair_counter.add(pair_counts)
+        read += size
+
+    chunks = read_chunks(files, chunk_bytes)
+    # loaded before the pool workers are forked so that they inherit it
+    index = get_index()
+    if jobs <= 1:
+        tokenizer = EmojiTokenizer(index.trie)
+        for chunk in chunks:
+            merge(count_chunk(chunk, tokenizer))
+        return emoji_counter, pair_counter, read
+
+    pending = collections.deque()
+    with multiprocessing.Pool(jobs, initializer=_init_worker) as pool:
+        for chunk in chunks:
+            if len(pending) >= jobs * _CHUNKS_IN_FLIGHT_PER_JOB:
+                merge(pending.popleft().get())
+            pending.append(pool.apply_async(count_chunk, (chunk,)))
+        while pending:
+            merge(pending.popleft().get())
+    return emoji_counter, pair_counter, read
+
+
+def meaning_of(emoji, meanings):
+    """The meaning of a counted emoji, which may carry a variation selector its key lacks"""
+    views = meanings.get(emoji) or meanings.get(emoji.replace("\ufe0f", ""))
+    return views[0] if views else "?"
+
+
+def format_table(title, rows, total, meanings):
+    """Returns the lines of a top-N table of (key, count) rows"""
+    lines = [title, f"{'rank':>4}  {'count':>12}  {'share':>6}  emoji"]
+    for rank, (key, count) in enumerate(rows, 1):
+        names = " + ".join(f"{emoji} {meaning_of(emoji, meanings)}"
+                           for emoji in key.split(PAIR_SEPARATOR))
+        share = count / total if total else 0.0
+        lines.append(f"{rank:>4}  {count:>12,}  {share:>6.1%}  {names}")
+    return lines
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="chat exports to analyze, - or nothing for stdin")
+    parser.add_argument("-n", "--top", type=int, default=20, help="rows of each table")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes, 0 for one per CPU (default 1)")
+    parser.add_argument("--exact", action="store_true",
+                        help="exact counts instead of sketches (memory grows with the input)")
+    parser.add_argument("--width", type=int, default=1 << 16, help="counters per sketch row")
+    parser.add_argument("--depth", type=int, default=4, help="rows of the sketches")
+    args = parser.parse_args(argv)
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    files = [sys.stdin.buffer if path == "-" else open(path, "rb") for path in args.inputs]
+    start = time.perf_counter()
+    try:
+        emoji_counter, pair_counter, read = analyze(
+            files, jobs, args.top, args.exact, args.width, args.depth)
+    finally:
+        for file in files:
+            if file is not sys.stdin.buffer:
+                file.close()
+    seconds = time.perf_counter() - start
+
+    meanings = get_index().lookup
+    total = emoji_counter.total()
+    lines = format_table(f"Top {args.top} emoji ({total:,} found)",
+                         emoji_counter.most_common(args.top), total, meanings)
+    lines.append("")
+    lines += format_table(f"Top {args.top} pairs in the same line",
+                          pair_counter.most_common(args.top), pair_counter.total(), meanings)
+    print("\n".join(lines))
+    print(f"{read / 1e6:,.1f} MB in {seconds:.2f} s, {read / 1e6 / seconds:,.1f} MB/s "
+          f"({'exact' if args.exact else 'sketch'}, {jobs} job{'s' if jobs > 1 else ''})",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
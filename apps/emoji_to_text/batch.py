@@ -0,0 +1,137 @@
+"""
+Headless batch translation: streams a text file or stdin line by line through the Translator
+and writes the chosen outputs, one line per input line. With several outputs, they are
+written as columns in the order given, separated by a tab.
+
+    python -m apps.emoji_to_text.batch [-m full,first,binary] [-o out.txt] [-j 4] [input.txt]
+
+With more than one job, chunks of lines are translated in a process pool. The emoji index is
+loaded once before the pool starts, so forked workers share it, and at most a few chunks per
+worker are in flight at a time, so memory stays bounded whatever the size of the input.
+The output keeps the order of the input.
+"""
+import argparse
+import collections
+import multiprocessing
+import os
+import sys
+
+from apps.emoji_to_text.index import load_index
+from apps.emoji_to_text.translator import MODES, Translator
+
+DEFAULT_CHUNK_LINES = 2000
+DEFAULT_CHUNK_CHARS = 1 << 20
+
+# chunks submitted to the pool per worker before waiting for the oldest one
+_CHUNKS_IN_FLIGHT_PER_JOB = 4
+
+# translator of the current process, created once per pool worker
+_TRANSLATOR = None
+_INDEX = None
+
+
+def format_lines(translator, lines, modes, separator):
+    """Translates the lines and returns the output text for them"""
+    # only the requested outputs are computed for each line
+    return "".join(separator.join(translator.translate_modes(line, modes)) + "\n"
+                   for line in lines)
+
+
+def _init_worker():
+    """Pool initializer: reuses the index inherited from the parent, or loads the cache"""
+    global _TRANSLATOR
+    _TRANSLATOR = Translator(_INDEX)
+
+
+def _translate_chunk(lines, modes, separator):
+    """Runs in a pool worker"""
+    return format_lines(_TRANSLATOR, lines, modes, separator)
+
+
+def read_chunks(lines, chunk_lines=DEFAULT_CHUNK_LINES, chunk_chars=DEFAULT_CHUNK_CHARS):
+    """Groups the lines, without their line break, into lists of bounded length and size"""
+    chunk = []
+    chars = 0
+    for line in lines:
+        line = line.rstrip("\r\n")
+        chunk.append(line)
+        chars += len(line)
+        if len(chunk) >= chunk_lines or chars >= chunk_chars:
+            yield chunk
+            chunk = []
+            chars = 0
+    if chunk:
+        yield chunk
+
+
+def translate_stream(lines, out, modes=("full",), jobs=1, separator="\t",
+                     chunk_lines=DEFAULT_CHUNK_LINES, chunk_chars=DEFAULT_CHUNK_CHARS):
+    """
+    Translates every line of the iterable lines and writes the outputs of the given modes to
+    the text file out. Returns the number of lines translated.
+    """
+    global _INDEX
+    chunks = read_chunks(lines, chunk_lines, chunk_chars)
+    count = 0
+    if jobs <= 1:
+        translator = Translator()
+        for chunk in chunks:
+            out.write(format_lines(translator, chunk, modes, separator))
+            count += len(chunk)
+        return count
+
+    # loaded before the workers are forked so that they inherit it instead of each one
+    # reading (or, without a cache, building) its own copy
+    _INDEX = load_index()
+    pending = collections.deque()
+    with multiprocessing.Pool(jobs, initializer=_init_worker) as pool:
+        for chunk in chunks:
+            if len(pending) >= jobs * _CHUNKS_IN_FLIGHT_PER_JOB:
+                out.write(pending.popleft().get())
+            pending.append(pool.apply_async(_translate_chunk, (chunk, modes, separator)))
+            count += len(chunk)
+        while pending:
+            out.write(pending.popleft().get())
+    return count
+
+
+def parse_modes(value):
+    """argparse type for a comma separated list of modes"""
+    modes = [mode.strip() for mode in value.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown or not modes:
+        raise argparse.ArgumentTypeError(
+            f"unknown mode {', '.join(unknown) or value!r}, expected some of {', '.join(MODES)}")
+    return modes
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", nargs="?", default="-",
+                        help="text file to translate, - or nothing for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file, - for stdout")
+    parser.add_argument("-m", "--modes", type=parse_modes, default=["full"],
+                        help=f"comma separated outputs among {', '.join(MODES)} (default full)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes, 0 for one per CPU (default 1)")
+    parser.add_argument("--separator", default="\t", help="between the columns of a line")
+    parser.add_argument("--chunk-lines", type=int, default=DEFAULT_CHUNK_LINES,
+                        help="lines sent to a worker at once")
+    args = parser.parse_args(argv)
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    if args.input == "-":
+        source = open(sys.stdin.fileno(), encoding="utf-8", errors="replace", closefd=False)
+    else:
+        source = open(args.input, encoding="utf-8", errors="replace")
+    if args.output == "-":
+        target = open(sys.stdout.fileno(), "w", encoding="utf-8", closefd=False)
+    else:
+        target = open(args.output, "w", encoding="utf-8")
+    with source, target:
+        translate_stream(source, target, args.modes, jobs, args.separator, args.chunk_lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Read-only buffers behind the output panes. A buffer is cut into rows of fixed length that are
+only materialized when asked for, so a pane shows a huge translation by rendering the few
+rows in view, and copy or export stream the rows from the buffer instead of the widget.
+"""
+import numpy as np
+
+from apps.emoji_to_text.tokenizer import cluster_boundary
+
+# characters per row of a text buffer
+TEXT_ROW_LENGTH = 100
+
+# bytes per row of a binary buffer, 8 digits each
+BINARY_ROW_BYTES = 16
+
+
+class TextBuffer:
+    """
+    A string cut into rows of about row_length characters. Each cut is moved forward to the
+    end of the grapheme cluster it falls in, so that no emoji is split between two rows (a
+    row_length shorter than a cluster leaves empty rows).
+    - row_count(), row(i): the rows, each sliced on demand
+    - chunks(): the text in pieces, for streaming it out
+    """
+    def __init__(self, text="", row_length=TEXT_ROW_LENGTH):
+        self.text = text
+        self.row_length = row_length
+
+    def __len__(self):
+        return len(self.text)
+
+    def _row_start(self, i):
+        """Where row i starts, found from the text around it only"""
+        return cluster_boundary(self.text, i * self.row_length)
+
+    def row_count(self):
+        count = -(-len(self.text) // self.row_length)
+        # the last cut may have been moved to the end of the text
+        if count and self._row_start(count - 1) == len(self.text):
+            count -= 1
+        return count
+
+    def row(self, i):
+        return self.text[self._row_start(i):self._row_start(i + 1)]
+
+    def chunks(self, size=1 << 16):
+        for start in range(0, len(self.text), size):
+            yield self.text[start:start + size]
+
+    def write_to(self, file):
+        """Writes the whole buffer to a text file"""
+        for chunk in self.chunks():
+            file.write(chunk)
+
+
+class BinaryBuffer:
+    """
+    The binary digits of some bytes (8 per byte, most significant bit first), produced row by
+    row from the bytes: the text of the whole buffer never exists at once.
+    - row_count(), row(i): rows of row_bytes bytes
+    - chunks(): the digits in pieces, for streaming them out
+    """
+    def __init__(self, data=b"", row_bytes=BINARY_ROW_BYTES):
+        self.data = np.frombuffer(data, dtype=np.uint8)
+        self.row_bytes = row_bytes
+
+    @classmethod
+    def from_text(cls, text, row_bytes=BINARY_ROW_BYTES):
+        """The binary digits of the UTF-8 encoding of text, see Translator.convert_to_binary()"""
+        return cls(text.encode("utf-8"), row_bytes)
+
+    def __len__(self):
+        return len(self.data) * 8
+
+    def _digits(self, start, stop):
+        """Returns the digits of the bytes from start to stop"""
+        digits = np.unpackbits(self.data[start:stop]) + np.uint8(ord("0"))
+        return digits.tobytes().decode("ascii")
+
+    def row_count(self):
+        return -(-len(self.data) // self.row_bytes)
+
+    def row(self, i):
+        start = i * self.row_bytes
+        return self._digits(start, start + self.row_bytes)
+
+    def chunks(self, size=1 << 13):
+        for start in range(0, len(self.data), size):
+            yield self._digits(start, start + size)
+
+    def write_to(self, file):
+        """Writes the whole buffer to a text file"""
+        for chunk in self.chunks():
+            file.write(chunk)
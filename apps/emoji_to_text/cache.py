@@ -0,0 +1,155 @@
+"""
+Bounded caches used by the translator: an LRU cache of recent messages and a memo of the
+tokenized words. Both are bounded by their number of entries and by the total size of the
+entries, and count their hits, misses and evictions.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+
+class CacheInfo(namedtuple("CacheInfo", "hits misses evictions entries bytes max_entries "
+                                        "max_bytes")):
+    """Statistics of an LRUCache, like functools.lru_cache's cache_info()"""
+    __slots__ = ()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache:
+    """
+    A mapping that drops its least recently used entries when it outgrows its limits.
+    - max_entries: most entries kept, None for no limit, 0 disables the cache
+    - max_bytes: most bytes kept, as counted by the sizes given to put(), None for no limit
+    get() and put() may be called from several threads.
+    """
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Returns the value of key and marks it as recently used, or default"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=0):
+        """Stores value under key, evicting the oldest entries to stay within the limits"""
+        if self.max_entries == 0 or (self.max_bytes is not None and size > self.max_bytes):
+            # would evict everything else and still not fit
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self.entries[key] = (value, size)
+            self.bytes += size
+            self._evict()
+
+    def _evict(self):
+        """Drops the least recently used entries until the cache is within its limits"""
+        while ((self.max_entries is not None and len(self.entries) > self.max_entries)
+               or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def resize(self, key, size):
+        """Changes the size counted for key, if it is still cached, and evicts to fit"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            self.entries[key] = (entry[0], size)
+            self.bytes += size - entry[1]
+            self._evict()
+
+    def clear(self):
+        """Drops every entry and resets the counters"""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """Returns the CacheInfo of the cache"""
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, len(self.entries),
+                             self.bytes, self.max_entries, self.max_bytes)
+
+
+class Memo(dict):
+    """
+    A dict that computes the value of a missing key with function(key) and keeps it, dropping
+    the oldest values first when it outgrows its limits (see LRUCache). Hits are plain dict
+    lookups, so it suits cheap functions called on many small keys, where the bookkeeping of
+    an LRUCache would cost more than the function. The caller counts its lookups with
+    count_lookups() for the hit rate.
+    - size_of(key, value): bytes of an entry, counted against max_bytes
+    """
+    def __init__(self, function, size_of, max_entries=None, max_bytes=None):
+        super().__init__()
+        self.function = function
+        self.size_of = size_of
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizes = {}
+        self.bytes = 0
+        self.lookups = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __missing__(self, key):
+        value = self.function(key)
+        size = self.size_of(key, value)
+        with self.lock:
+            self.misses += 1
+            if self.max_entries == 0 or (self.max_bytes is not None and size > self.max_bytes):
+                return value
+            if key not in self.sizes:
+                self[key] = value
+                self.sizes[key] = size
+                self.bytes += size
+            while ((self.max_entries is not None and len(self) > self.max_entries)
+                   or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                oldest = next(iter(self))
+                del self[oldest]
+                self.bytes -= self.sizes.pop(oldest)
+                self.evictions += 1
+        return value
+
+    def count_lookups(self, count):
+        """Adds count to the lookups made, hits and misses alike"""
+        self.lookups += count
+
+    def clear(self):
+        """Drops every entry and resets the counters"""
+        with self.lock:
+            super().clear()
+            self.sizes.clear()
+            self.bytes = 0
+            self.lookups = self.misses = self.evictions = 0
+
+    def info(self):
+        """Returns the CacheInfo of the memo"""
+        with self.lock:
+            hits = max(self.lookups - self.misses, 0)
+            return CacheInfo(hits, self.misses, self.evictions, len(self), self.bytes,
+                             self.max_entries, self.max_bytes)
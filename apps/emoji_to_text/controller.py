@@ -1,9 +1,47 @@
 """
 Controller for the emoji to text app.
 """
-from PySide6.QtCore import QObject, Slot
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal, Slot
+from apps.emoji_to_text.buffers import BinaryBuffer, TextBuffer
 from apps.emoji_to_text.view import EmojiToTextView
-from apps.emoji_to_text.translator import Translator
+from apps.emoji_to_text.translator import MODES, Translator
+
+# quiet time after the last keystroke before the input is translated
+DEBOUNCE_MS = 150
+
+
+class TranslationSignals(QObject):
+    """Signals of a TranslationTask, emitted from the worker thread"""
+    # generation of the request, mode -> output buffer
+    finished = Signal(int, object)
+
+
+class TranslationTask(QRunnable):
+    """
+    Translates one message in the thread pool. The task gives up, without emitting, as soon as
+    a newer request has been made (is_current(generation) is False).
+    """
+    def __init__(self, translator, message, generation, is_current):
+        super().__init__()
+        self.translator = translator
+        self.message = message
+        self.generation = generation
+        self.is_current = is_current
+        self.signals = TranslationSignals()
+
+    def run(self):
+        translation = self.translator.translate(self.message)
+        outputs = {}
+        for mode in MODES:
+            if not self.is_current(self.generation):
+                return
+            if mode == "binary":
+                # the pane formats the digits of the visible rows from the bytes, instead of
+                # holding a string eight times the size of the full meaning
+                outputs[mode] = BinaryBuffer.from_text(translation.get("full"))
+            else:
+                outputs[mode] = TextBuffer(translation.get(mode))
+        self.signals.finished.emit(self.generation, outputs)
 
 
 class EmojiToTextController(QObject):
@@ -14,7 +52,27 @@ class EmojiToTextController(QObject):
         self.views = EmojiToTextView()
         self.translator_logic = Translator()
 
+        # translations run one at a time off the GUI thread. Every request gets a new
+        # generation and only the results of the latest one reach the view
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.generation = 0
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self.start_translation)
+
         self.views.translate_button.clicked.connect(self.do_translation)
+        self.views.input_message.textChanged.connect(self.input_changed)
+
+    def is_current(self, generation):
+        """True while no request newer than generation has been made"""
+        return generation == self.generation
+
+    @Slot(str)
+    def input_changed(self):
+        """Translates as the user types, once the typing pauses"""
+        self.debounce_timer.start()
 
     @Slot(bool)
     def do_translation(self):
@@ -22,12 +80,23 @@ class EmojiToTextController(QObject):
         Processes the translation of the text input and fills the required fields
         accordingly.
         """
-        self.views.translate_button.setEnabled(False)
-        self.translator_logic.message = self.views.input_message.text()
-        self.translator_logic.translate_emoji()
-        self.views.first_letter_textbox.setText(self.translator_logic.first_letter_only)
-        self.views.middle_letter_textbox.setText(self.translator_logic.middle_letter_only)
-        self.views.last_letter_textbox.setText(self.translator_logic.last_letter_only)
-        self.views.binary_textbox.setText(self.translator_logic.binary_result)
-        self.views.full_meaning_textbox.setText(self.translator_logic.full_meaning)
-        self.views.translate_button.setEnabled(True)
+        self.debounce_timer.stop()
+        self.start_translation()
+
+    @Slot()
+    def start_translation(self):
+        """Hands the current input to the thread pool, dropping the requests still queued"""
+        self.generation += 1
+        self.thread_pool.clear()
+        message = self.views.input_message.text()
+        self.translator_logic.message = message
+        task = TranslationTask(self.translator_logic, message, self.generation, self.is_current)
+        task.signals.finished.connect(self.translation_finished)
+        self.thread_pool.start(task)
+
+    @Slot(int, object)
+    def translation_finished(self, generation, outputs):
+        """Shows the outputs of the latest request, in one update of the view"""
+        if not self.is_current(generation):
+            return
+        self.views.show_translation(outputs)
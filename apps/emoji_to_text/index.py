@@ -0,0 +1,118 @@
+"""
+Builds the emoji index used by the translator and keeps it in an on-disk cache.
+The index is built once from the emot dictionaries and is reloaded from the cache on the
+next launches, as long as the emot version and the index format have not changed.
+"""
+import importlib.util
+import os
+import os.path
+import pickle
+
+from apps.emoji_to_text.phrases import build_phrase_trie
+from apps.emoji_to_text.tokenizer import build_trie
+
+# bump whenever the content of the index changes, so old caches are rebuilt
+INDEX_VERSION = 5
+
+_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def emot_version():
+    """
+    Returns the installed version of the emot package, read from its dist-info directory
+    next to the package. Neither emot nor importlib.metadata is imported, both being much
+    slower than loading the cache itself. Falls back to the size and modification time of
+    the emot dictionaries when no dist-info is found.
+    """
+    spec = importlib.util.find_spec("emot")
+    if spec is None or not spec.submodule_search_locations:
+        return "missing"
+    package_dir = list(spec.submodule_search_locations)[0]
+    for name in os.listdir(os.path.dirname(package_dir)):
+        if name.startswith("emot-") and name.endswith((".dist-info", ".egg-info")):
+            return name[len("emot-"):].rsplit(".", 1)[0]
+    stat = os.stat(os.path.join(package_dir, "emo_unicode.py"))
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def cache_path(cache_dir=None):
+    """Returns the cache file for the current index format and emot version"""
+    if cache_dir is None:
+        cache_dir = _CACHE_DIR
+    return os.path.join(cache_dir, f"emoji_index_v{INDEX_VERSION}_emot-{emot_version()}.pickle")
+
+
+def letter_views(meaning):
+    """Returns (full, first, middle, last letter) of an emoji's meaning"""
+    return (meaning, meaning[0], meaning[len(meaning) // 2], meaning[-1])
+
+
+class EmojiIndex:
+    """
+    Everything the translator derives from the emot dictionaries.
+    - mapping: emoji or emoticon -> cleaned meaning
+    - matcher: flashtext KeywordProcessor over the mapping
+    - lookup: every key of the mapping, and every keyword of the (case insensitive) matcher,
+      -> (full, first, middle, last letter) of its meaning
+    - trie: character trie over the keys of lookup, used by the tokenizer
+    - phrases: word trie from the meanings back to their emoji, used by the reverse translation
+    """
+    def __init__(self, mapping, matcher, lookup, trie, phrases):
+        self.mapping = mapping
+        self.matcher = matcher
+        self.lookup = lookup
+        self.trie = trie
+        self.phrases = phrases
+
+    @classmethod
+    def build(cls):
+        """Builds the index from the emot dictionaries"""
+        from emot.emo_unicode import UNICODE_EMOJI, UNICODE_EMOJI_ALIAS, EMOTICONS_EMO
+        from flashtext import KeywordProcessor
+
+        temp = {**UNICODE_EMOJI, **UNICODE_EMOJI_ALIAS, **EMOTICONS_EMO}
+        mapping = {}
+        for key, val in temp.items():
+            new_val = val.replace(":", "").replace("_", " ").strip()
+            mapping[key] = new_val
+        matcher = KeywordProcessor()
+        for k, v in mapping.items():
+            matcher.add_keyword(k, v)
+        lookup = {key: letter_views(meaning) for key, meaning in mapping.items()}
+        # the lower-cased keywords of the matcher keep matching as they always have
+        for keyword, meaning in matcher.get_all_keywords().items():
+            if keyword not in lookup:
+                lookup[keyword] = letter_views(meaning)
+        return cls(mapping, matcher, lookup, build_trie(lookup), build_phrase_trie(mapping))
+
+
+def load_index(cache_dir=None):
+    """
+    Returns the emoji index, from the cache when a valid one exists, otherwise by building it
+    and saving it for the next launches. A cache that cannot be read or written is ignored.
+    """
+    path = cache_path(cache_dir)
+    try:
+        with open(path, "rb") as f:
+            cached = pickle.load(f)
+        if isinstance(cached, EmojiIndex):
+            return cached
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        pass
+
+    index = EmojiIndex.build()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        # the caches of older index formats or emot versions are never read again
+        cache_dir = os.path.dirname(path)
+        for name in os.listdir(cache_dir):
+            if (name.startswith("emoji_index_") and name.endswith(".pickle")
+                    and name != os.path.basename(path)):
+                os.remove(os.path.join(cache_dir, name))
+    except OSError as e:
+        print(f"Could not save the emoji index cache: {e}")
+    return index
@@ -0,0 +1,128 @@
+"""
+The user's own emoji dictionary, a yaml file of "key: meaning" layered on top of the emoji
+index. The index is never rebuilt for it: each added, changed or removed key is applied to the
+lookup and the tokenizer trie in O(key length), and the file is reloaded when it changes.
+The index may be shared by several translators, so its lookup and trie are copied before the
+first change rather than changed in place.
+"""
+import os
+import threading
+import time
+
+import yaml
+
+from apps.emoji_to_text.index import letter_views
+from apps.emoji_to_text.tokenizer import copy_trie
+
+OVERLAY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "custom_emoji.yaml")
+
+# seconds between two checks of the file for changes
+CHECK_INTERVAL = 1.0
+
+
+def clean_meaning(meaning):
+    """Cleans a meaning the way the index cleans the emot ones (":thumbs_up:" -> "thumbs up")"""
+    return str(meaning).replace(":", "").replace("_", " ").strip()
+
+
+class DictionaryOverlay:
+    """
+    Applies the entries of the overlay file to a lookup and a tokenizer built from the index.
+    A key with an empty meaning hides the index's own entry for it. The index entries an
+    overlay key replaced or hid are kept aside and restored when the key leaves the file.
+    - check(): reloads the file if it changed, returns True if the entries changed
+    - lookup: the lookup with the entries applied
+    """
+    def __init__(self, path, lookup, tokenizer, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.lookup = lookup
+        self.tokenizer = tokenizer
+        self.check_interval = check_interval
+        # the lookup and the trie are those of the index until the first change
+        self.copied = False
+        # translations may run on several threads, which all check the file
+        self.lock = threading.Lock()
+        # key -> letter views, or None for a hidden key
+        self.entries = {}
+        # key -> its letter views in the index before the overlay, None if it had none
+        self.base = {}
+        self.mtime = None
+        self.last_check = None
+
+    def check(self):
+        """Reloads the file if its modification time changed, at most once per interval"""
+        with self.lock:
+            return self._check()
+
+    def _check(self):
+        """check(), with the lock held"""
+        now = time.monotonic()
+        if self.last_check is not None and now - self.last_check < self.check_interval:
+            return False
+        self.last_check = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self.mtime:
+            return False
+        self.mtime = mtime
+        entries = self._load_yaml() if mtime is not None else {}
+        if entries is None:
+            # a file being edited may not parse yet, the previous entries stay
+            return False
+        return self.apply(entries)
+
+    def _load_yaml(self):
+        """Loads the entries from the yaml, None on error"""
+        try:
+            with open(self.path, 'r', encoding="utf-8") as file:
+                result = yaml.safe_load(file)
+        except FileNotFoundError:
+            return {}
+        except yaml.YAMLError as e:
+            print("Yaml error: " + str(e))
+            return None
+        if result is None:
+            return {}
+        if not isinstance(result, dict):
+            print("Yaml error: " + self.path + " should map each emoji to its meaning")
+            return None
+        entries = {}
+        for key, meaning in result.items():
+            key = str(key)
+            if not key:
+                continue
+            meaning = clean_meaning(meaning) if meaning is not None else ""
+            entries[key] = letter_views(meaning) if meaning else None
+        return entries
+
+    def apply(self, entries):
+        """Applies only the keys that differ from the current entries, returns True if any"""
+        old = self.entries
+        changed = False
+        for key in old.keys() - entries.keys():
+            self._set(key, self.base.pop(key))
+            changed = True
+        for key, views in entries.items():
+            if key in old and old[key] == views:
+                continue
+            if key not in self.base:
+                self.base[key] = self.lookup.get(key)
+            self._set(key, views)
+            changed = True
+        self.entries = entries
+        return changed
+
+    def _set(self, key, views):
+        """Gives key the letter views, or removes it for None"""
+        if not self.copied:
+            self.lookup = dict(self.lookup)
+            self.tokenizer.trie = copy_trie(self.tokenizer.trie)
+            self.copied = True
+        if views is None:
+            self.lookup.pop(key, None)
+            self.tokenizer.delete(key)
+        else:
+            self.lookup[key] = views
+            self.tokenizer.insert(key, views)
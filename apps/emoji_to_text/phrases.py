@@ -0,0 +1,133 @@
+"""
+Reverse translation, from text to emoji. The cleaned meanings of the emoji index become a
+word-level phrase trie ("thumbs up" -> 👍), and a message is scanned once from left to right,
+replacing at each word the longest phrase that starts there. A meaning of a single word ("dog",
+"fire", "top") is an ordinary word of a sentence, so it is only replaced when written as a
+shortcode (":dog:"), as is any meaning with its words joined by underscores (":thumbs_up:").
+"""
+import re
+import unicodedata
+
+# a word of a meaning or a message, apostrophes included ("man's")
+_WORD = re.compile(r"\w+(?:'\w+)*")
+
+# what may separate two words of a phrase in a message ("thumbs up", "medium-dark")
+_PHRASE_GAP = re.compile(r"[\s-]+")
+
+_SKIN_TONE = re.compile(r"[\U0001F3FB-\U0001F3FF]")
+_SKIN_TONE_MEANING = re.compile(r"\s*\b(light|medium-light|medium|medium-dark|dark) skin tone\b")
+
+# numbered alias names of the emot dictionaries ("dog2", "cat2")
+_NUMBERED_ALIAS = re.compile(r"([a-z]{3,})\d")
+
+# combining enclosing keycap of "1️⃣", the only emoji made of no symbol character
+_KEYCAP = "\u20e3"
+
+# key under which a trie node stores the emoji of the phrase ending there
+_TERMINAL = ""
+
+# key under which the root of the trie stores the shortcodes ("thumbs_up" -> 👍), never a word
+_SHORTCODES = ":"
+
+
+def phrase_words(text):
+    """Returns the lower-cased words of text"""
+    return _WORD.findall(text.lower().replace("’", "'"))
+
+
+def is_emoji(key):
+    """True for an emoji, False for an emoticon made of punctuation (":‑)", "(=^·^=)")"""
+    return any(ch == _KEYCAP or unicodedata.category(ch) == "So" for ch in key)
+
+
+def build_phrase_trie(mapping):
+    """
+    Builds a word trie (nested dicts) from every meaning of mapping (emoji -> meaning) of more
+    than one word to its emoji, and the shortcodes of all the meanings. Emoji are preferred to
+    emoticons for a meaning, then the first emoji or the shortest emoticon. The skin tone
+    variants also give their base emoji a phrase ("thumbs up" for 👍, whose own meaning is
+    "thumbsup"), as do numbered aliases (":dog:" for "dog2").
+    """
+    phrases = {}
+    emoticons = {}
+    for key, meaning in mapping.items():
+        words = tuple(phrase_words(meaning))
+        if not words:
+            continue
+        if is_emoji(key):
+            phrases.setdefault(words, key)
+        elif words not in emoticons or len(key) < len(emoticons[words]):
+            emoticons[words] = key
+    for key, meaning in mapping.items():
+        if _SKIN_TONE.search(key):
+            base_words = tuple(phrase_words(_SKIN_TONE_MEANING.sub("", meaning)))
+            if base_words:
+                phrases.setdefault(base_words, _SKIN_TONE.sub("", key))
+        alias = _NUMBERED_ALIAS.fullmatch(meaning)
+        if alias and is_emoji(key):
+            phrases.setdefault((alias.group(1),), key)
+    for words, key in emoticons.items():
+        phrases.setdefault(words, key)
+
+    shortcodes = {"_".join(words): key for words, key in phrases.items()}
+    root = {_SHORTCODES: shortcodes}
+    for words, key in phrases.items():
+        if len(words) == 1:
+            continue
+        node = root
+        for word in words:
+            node = node.setdefault(word, {})
+        node[_TERMINAL] = key
+    return root
+
+
+class PhraseMatcher:
+    """
+    Scans messages for the phrases and shortcodes of a phrase trie.
+    - finditer(text): yields (start, end, emoji) for each phrase or shortcode, left to right
+    - replace(text): returns text with every phrase replaced by its emoji
+    """
+    def __init__(self, trie):
+        self.trie = trie
+        self.shortcodes = trie.get(_SHORTCODES, {})
+
+    def finditer(self, text):
+        """Yields (start, end, emoji) of the longest phrase at each word, without overlaps"""
+        words = [(match.start(), match.end(), match.group().replace("’", "'").lower())
+                 for match in _WORD.finditer(text)]
+        count = len(words)
+        i = 0
+        while i < count:
+            start, end, word = words[i]
+            if (start > 0 and text[start - 1] == ":" and text.startswith(":", end)
+                    and word in self.shortcodes):
+                yield (start - 1, end + 1, self.shortcodes[word])
+                i += 1
+                continue
+            node = self.trie.get(word)
+            best = None
+            j = i
+            while node is not None:
+                if _TERMINAL in node:
+                    best = (j, node[_TERMINAL])
+                j += 1
+                if j >= count or not _PHRASE_GAP.fullmatch(text, words[j - 1][1], words[j][0]):
+                    break
+                node = node.get(words[j][2])
+            if best is None:
+                i += 1
+                continue
+            last, emoji = best
+            yield (words[i][0], words[last][1], emoji)
+            i = last + 1
+
+    def replace(self, text):
+        """Returns text with every phrase replaced by its emoji"""
+        result = []
+        previous_end = 0
+        for start, end, emoji in self.finditer(text):
+            result.append(text[previous_end:start])
+            result.append(emoji)
+            previous_end = end
+        result.append(text[previous_end:])
+        return "".join(result)
@@ -0,0 +1,323 @@
+"""
+Translation service for other programs: a small asyncio HTTP/1.1 server around one preloaded
+Translator, so a caller does not start Python and load the emoji index for every message.
+
+    python -m apps.emoji_to_text.server [--host 127.0.0.1] [--port 8765] [--unix PATH] [-j 2]
+
+    POST /translate  {"text": "hi 🙂", "modes": ["full", "first"]}
+                  -> {"full": "hi slightly smiling face", "first": "hi s"}
+    POST /batch      {"texts": ["hi 🙂", ":)"], "modes": ["full"]}
+                  -> {"results": [{"full": "hi slightly smiling face"}, {"full": "Happy face smiley"}]}
+    GET  /health  -> {"status": "ok"}
+
+The modes are those of MODES, "full" when none are given. Connections are kept alive, and a
+client may pipeline requests: they are read ahead while earlier ones are being answered, and
+the responses come back in order. Requests are translated on the event loop, except those
+with more than --large-chars characters of text, which go to a process pool so that they do
+not hold up the other connections.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import signal
+import sys
+
+from apps.emoji_to_text.index import load_index
+from apps.emoji_to_text.translator import MODES, Translator
+
+DEFAULT_PORT = 8765
+
+# requests with more characters of text than this are translated in the process pool
+LARGE_PAYLOAD_CHARS = 64 << 10
+
+MAX_HEADER_BYTES = 16 << 10
+MAX_BODY_BYTES = 64 << 20
+
+# requests of a connection read ahead of the response being sent
+PIPELINE_DEPTH = 16
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 431: "Request Header Fields Too Large",
+            500: "Internal Server Error", 501: "Not Implemented"}
+
+# translator of a pool worker, created from the index inherited from the server
+_TRANSLATOR = None
+_INDEX = None
+
+
+def _init_worker():
+    """Pool initializer: reuses the index inherited from the server, or loads the cache"""
+    global _TRANSLATOR
+    _TRANSLATOR = Translator(_INDEX)
+
+
+def translate_texts(translator, texts, modes):
+    """Returns a dict mode -> output for each text"""
+    return [dict(zip(modes, translator.translate_modes(text, modes))) for text in texts]
+
+
+def _translate_texts(texts, modes):
+    """Runs in a pool worker"""
+    return translate_texts(_TRANSLATOR, texts, modes)
+
+
+class HttpError(Exception):
+    """A request that is answered with an error status"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """A parsed HTTP request"""
+    def __init__(self, method, path, version, headers, body):
+        self.method = method
+        self.path = path
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        """HTTP/1.1 keeps the connection open unless told otherwise, HTTP/1.0 the opposite"""
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+async def read_request(reader):
+    """Reads the next request of a connection, None once the client closed it"""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise HttpError(400, "incomplete request") from None
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "request headers too large") from None
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HttpError(400, "malformed request line") from None
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    if "transfer-encoding" in headers:
+        raise HttpError(501, "chunked bodies are not supported, send a Content-Length")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HttpError(400, "invalid Content-Length") from None
+    if length < 0:
+        raise HttpError(400, "invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, f"body larger than {MAX_BODY_BYTES} bytes")
+    try:
+        body = await reader.readexactly(length) if length else b""
+    except asyncio.IncompleteReadError:
+        raise HttpError(400, "incomplete body") from None
+    return Request(method, target.split("?", 1)[0], version, headers, body)
+
+
+def format_response(status, payload, keep_alive=True):
+    """Returns the bytes of a JSON response"""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+    return head.encode("ascii") + b"\r\n" + body
+
+
+def parse_modes(payload):
+    """The modes of a request, validated against MODES"""
+    modes = payload.get("modes", ["full"])
+    if isinstance(modes, str):
+        modes = [mode.strip() for mode in modes.split(",")]
+    if (not isinstance(modes, list) or not modes
+            or any(not isinstance(mode, str) or mode not in MODES for mode in modes)):
+        raise HttpError(400, f"modes should be a list of {', '.join(MODES)}")
+    return modes
+
+
+class TranslationServer:
+    """
+    Serves the translations of one Translator. Handles each connection with handle(), usable
+    with asyncio.start_server() or start_unix_server().
+    """
+    def __init__(self, translator, pool=None, large_chars=LARGE_PAYLOAD_CHARS):
+        self.translator = translator
+        self.pool = pool
+        self.large_chars = large_chars
+
+    async def handle(self, reader, writer):
+        """Reads the requests of a connection and answers them in order"""
+        # futures of the responses, in the order of the requests, None once no more follow
+        responses = asyncio.Queue(PIPELINE_DEPTH)
+        sender = asyncio.create_task(self._send(responses, writer))
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HttpError as e:
+                    await responses.put((self._done(format_response(
+                        e.status, {"error": str(e)}, False)), False))
+                    break
+                if request is None or sender.done():
+                    break
+                keep_alive = request.keep_alive
+                try:
+                    response = self.respond(request, keep_alive)
+                except Exception as e:
+                    # a bug in one request must not drop the others of the connection
+                    response = self._done(format_response(
+                        500, {"error": f"internal error: {e}"}, keep_alive))
+                await responses.put((response, keep_alive))
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            if not sender.done():
+                await responses.put(None)
+            await sender
+
+    async def _send(self, responses, writer):
+        """Writes the responses as they complete, in order"""
+        try:
+            while True:
+                item = await responses.get()
+                if item is None:
+                    break
+                response, keep_alive = item
+                writer.write(await response)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            # the reader may still be waiting to queue a response
+            while not responses.empty():
+                responses.get_nowait()
+            writer.close()
+
+    def _done(self, data):
+        """A future already holding data"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(data)
+        return future
+
+    def respond(self, request, keep_alive):
+        """Returns a future of the response bytes to request"""
+        try:
+            if request.path == "/health":
+                if request.method != "GET":
+                    raise HttpError(405, "use GET")
+                return self._done(format_response(200, {"status": "ok"}, keep_alive))
+            if request.path not in ("/translate", "/batch"):
+                raise HttpError(404, f"no such endpoint {request.path}")
+            if request.method != "POST":
+                raise HttpError(405, "use POST")
+            try:
+                payload = json.loads(request.body)
+            except (UnicodeDecodeError, ValueError) as e:
+                raise HttpError(400, f"invalid JSON: {e}") from None
+            if not isinstance(payload, dict):
+                raise HttpError(400, "the body should be a JSON object")
+            modes = parse_modes(payload)
+            if request.path == "/translate":
+                texts = [payload.get("text")]
+            else:
+                texts = payload.get("texts")
+                if not isinstance(texts, list):
+                    raise HttpError(400, "texts should be a list of strings")
+            if not all(isinstance(text, str) for text in texts):
+                raise HttpError(400, "the texts should be strings")
+        except HttpError as e:
+            return self._done(format_response(e.status, {"error": str(e)}, keep_alive))
+
+        single = request.path == "/translate"
+        if self.pool is None or sum(map(len, texts)) <= self.large_chars:
+            try:
+                results = translate_texts(self.translator, texts, modes)
+            except Exception as e:
+                return self._done(format_response(500, {"error": f"translation failed: {e}"},
+                                                  keep_alive))
+            return self._done(format_response(200, results[0] if single else {"results": results},
+                                              keep_alive))
+        return asyncio.ensure_future(self._respond_in_pool(texts, modes, single, keep_alive))
+
+    async def _respond_in_pool(self, texts, modes, single, keep_alive):
+        """Translates a large request in the process pool"""
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, _translate_texts, texts, modes)
+        except Exception as e:
+            return format_response(500, {"error": f"translation failed: {e}"}, keep_alive)
+        return format_response(200, results[0] if single else {"results": results}, keep_alive)
+
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, unix_path=None, jobs=1,
+                large_chars=LARGE_PAYLOAD_CHARS):
+    """Runs the server until it is cancelled, or terminated with SIGTERM"""
+    global _INDEX
+    try:
+        # the pool is shut down on the way out rather than leaving its workers behind
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM,
+                                                      asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    # loaded before the pool workers are forked so that they inherit it
+    _INDEX = load_index()
+    translator = Translator(_INDEX)
+    pool = None
+    if jobs > 0:
+        pool = concurrent.futures.ProcessPoolExecutor(jobs, initializer=_init_worker)
+    handler = TranslationServer(translator, pool, large_chars)
+    try:
+        if unix_path:
+            server = await asyncio.start_unix_server(handler.handle, unix_path,
+                                                     limit=MAX_HEADER_BYTES)
+            print(f"Listening on {unix_path}", flush=True)
+        else:
+            server = await asyncio.start_server(handler.handle, host, port,
+                                                limit=MAX_HEADER_BYTES)
+            address = server.sockets[0].getsockname()
+            print(f"Listening on http://{address[0]}:{address[1]}", flush=True)
+        async with server:
+            await server.serve_forever()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if unix_path and os.path.exists(unix_path):
+            os.remove(unix_path)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 for any free port")
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes for large requests, 0 for none (default 1)")
+    parser.add_argument("--large-chars", type=int, default=LARGE_PAYLOAD_CHARS,
+                        help="characters of text above which a request goes to the workers")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.jobs, args.large_chars))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("Stopped", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Streaming frequency sketches for the emoji analytics: a count-min sketch, whose memory does not
+depend on the number of distinct keys, and a top-K tracker over its estimates.
+"""
+import hashlib
+import heapq
+
+import numpy as np
+
+
+def key_hashes(keys):
+    """Returns two arrays of 32-bit hashes of the keys, stable across processes and runs"""
+    digests = b"".join(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+                       for key in keys)
+    halves = np.frombuffer(digests, dtype=np.uint32).reshape(-1, 2).astype(np.uint64)
+    return halves[:, 0], halves[:, 1] | np.uint64(1)
+
+
+class CountMinSketch:
+    """
+    Approximate counts of string keys in depth x width counters. An estimate is never below
+    the true count and exceeds it by at most 2.72 * total / width with probability
+    1 - e^-depth. Keys are added in batches, which numpy updates in one go.
+    - add(counts): adds a mapping key -> count
+    - estimate(keys): the estimated counts of the keys, as an array
+    """
+    def __init__(self, width=1 << 16, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+        self.rows = np.arange(depth, dtype=np.uint64)[:, None]
+
+    def _columns(self, keys):
+        """Counter of each key in each row: h1 + row * h2 (mod width), the double hashing of
+        Kirsch and Mitzenmacher"""
+        h1, h2 = key_hashes(keys)
+        return ((h1[None, :] + self.rows * h2[None, :]) % np.uint64(self.width)).astype(np.intp)
+
+    def add(self, counts):
+        """Adds the counts of a mapping key -> count"""
+        if not counts:
+            return
+        keys = list(counts)
+        values = np.fromiter(counts.values(), dtype=np.int64, count=len(keys))
+        columns = self._columns(keys)
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], values)
+        self.total += int(values.sum())
+
+    def estimate(self, keys):
+        """Returns the estimated counts of keys"""
+        if not keys:
+            return np.zeros(0, dtype=np.int64)
+        columns = self._columns(keys)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def merge(self, other):
+        """Adds the counts of a sketch of the same shape"""
+        self.table += other.table
+        self.total += other.total
+
+
+class TopK:
+    """
+    The k keys with the largest counts offered so far. Counts of a key only grow, so old heap
+    entries are invalidated lazily instead of being searched for.
+    - offer(key, count): records the latest count of key
+    - items(): (key, count) pairs, largest count first
+    """
+    def __init__(self, k):
+        self.k = k
+        self.counts = {}
+        self.heap = []
+
+    def offer(self, key, count):
+        counts = self.counts
+        if key not in counts and len(counts) >= self.k:
+            heap = self.heap
+            # drop the outdated entries at the top of the heap
+            while counts.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            if count <= heap[0][0]:
+                return
+            _, smallest = heapq.heappop(heap)
+            del counts[smallest]
+        counts[key] = count
+        heapq.heappush(self.heap, (count, key))
+        if len(self.heap) > 4 * self.k + 64:
+            self.heap = [(count, key) for key, count in counts.items()]
+            heapq.heapify(self.heap)
+
+    def items(self):
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,257 @@
+"""
+Finds the emoji and emoticons of a message in a single pass, whether or not they are separated
+by spaces. Matching is longest-match over a character trie of every key of the emoji index and
+never splits a grapheme cluster: a ZWJ sequence, a flag or an emoji with its skin tone or
+variation selector is matched as a whole or not at all.
+"""
+import re
+import unicodedata
+
+ZWJ = "\u200d"
+_VARIATION_SELECTORS = "\ufe0e\ufe0f"
+
+# key under which a trie node stores the value of the key ending there. Never a character
+# of a key since keys are made of single characters.
+_TERMINAL = ""
+
+# punctuation that may directly follow an emoticon made of ASCII characters
+_EMOTICON_PUNCTUATION = ".,;!?\"'"
+
+
+def build_trie(lookup):
+    """Builds a character trie (nested dicts) mapping every key of lookup to its value"""
+    root = {}
+    for key, value in lookup.items():
+        node = root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[_TERMINAL] = value
+    return root
+
+
+def copy_trie(node):
+    """Copies the nodes of a trie, sharing the values"""
+    return {ch: child if ch == _TERMINAL else copy_trie(child) for ch, child in node.items()}
+
+
+def _keys(node, prefix=""):
+    """Yields every key of a trie"""
+    for ch, child in node.items():
+        if ch == _TERMINAL:
+            yield prefix
+        else:
+            yield from _keys(child, prefix + ch)
+
+
+def _is_skin_tone(ch):
+    return "\U0001F3FB" <= ch <= "\U0001F3FF"
+
+
+def _is_regional_indicator(ch):
+    return "\U0001F1E6" <= ch <= "\U0001F1FF"
+
+
+def _is_tag(ch):
+    return "\U000E0020" <= ch <= "\U000E007F"
+
+
+def _extends_cluster(ch):
+    """True when ch belongs to the grapheme cluster of the character before it"""
+    return (ch in _VARIATION_SELECTORS or _is_skin_tone(ch) or _is_tag(ch)
+            or unicodedata.category(ch).startswith("M"))
+
+
+def cluster_end(text, start):
+    """Returns the end of the grapheme cluster starting at start (emoji rules only)"""
+    n = len(text)
+    end = start + 1
+    if end < n and _is_regional_indicator(text[start]) and _is_regional_indicator(text[end]):
+        return end + 1
+    while end < n:
+        ch = text[end]
+        if ch == ZWJ:
+            end += 2
+        elif _extends_cluster(ch):
+            end += 1
+        else:
+            break
+    return min(end, n)
+
+
+def cluster_boundary(text, pos):
+    """Returns the first grapheme cluster boundary at or after pos (emoji rules only)"""
+    n = len(text)
+    if pos >= n:
+        return n
+    start = max(pos, 0)
+    # back up to a character that starts a cluster whatever comes before it
+    while start > 0 and (_extends_cluster(text[start]) or text[start] == ZWJ
+                         or text[start - 1] == ZWJ or _is_regional_indicator(text[start])):
+        start -= 1
+    while start < pos:
+        start = cluster_end(text, start)
+    return start
+
+
+def _is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+def _character_class(chars):
+    """
+    Returns a regex character class matching at least chars. sre tests characters outside
+    the BMP one by one against every entry of a class, which is slower than the trie walk, so
+    they are covered by a single range of the whole supplementary planes instead; the trie
+    walk rejects the candidates that start no key.
+    """
+    bmp = sorted(ch for ch in chars if ord(ch) < 0x10000)
+    part = "".join(re.escape(ch) for ch in bmp)
+    if len(bmp) < len(chars):
+        part += "\U00010000-\U0010ffff"
+    return "[" + part + "]"
+
+
+def _ends_emoticon(ch):
+    """True when an ASCII emoticon may be followed by ch ("ok:)." but not "http://")"""
+    return ch.isspace() or not ch.isascii() or ch in _EMOTICON_PUNCTUATION
+
+
+class EmojiTokenizer:
+    """
+    Scans messages for the keys of a trie.
+    - finditer(text): yields (start, end, value) for each match, left to right
+    Candidate start positions are found by a compiled character class, so runs of plain text
+    are skipped at the speed of the regex engine and only candidates walk the trie.
+    """
+    def __init__(self, trie):
+        """Initializes the tokenizer over a trie built with build_trie()"""
+        self.trie = trie
+        # the few keys with a space in them, "<(_ _)>", are the only matches that can span
+        # two words
+        self.spanning_keys = {key for key in _keys(trie) if any(ch.isspace() for ch in key)}
+        self._compile()
+
+    def _compile(self):
+        """Compiles the regexes of candidate positions and of keys spanning words"""
+        symbol_starts = []
+        word_prefixes = []
+        for ch, node in self.trie.items():
+            if ch == _TERMINAL:
+                continue
+            if not _is_word_char(ch):
+                symbol_starts.append(ch)
+            elif _TERMINAL in node:
+                word_prefixes.append(re.escape(ch))
+            else:
+                # most words start with one of these letters, so the second character is
+                # checked by the regex too rather than by a walk of the trie
+                word_prefixes.append(re.escape(ch) + _character_class(
+                    [next_ch for next_ch in node if next_ch != _TERMINAL]))
+        alternatives = []
+        if symbol_starts:
+            alternatives.append(_character_class(symbol_starts))
+        if word_prefixes:
+            # emoticons starting with a letter or digit (XD, 8-)) must start a word
+            alternatives.append("(?<![A-Za-z0-9])(?:" + "|".join(word_prefixes) + ")")
+        self.candidates = re.compile("|".join(alternatives) if alternatives else r"(?!)")
+        self.spanning = re.compile("|".join(re.escape(key) for key in self.spanning_keys)
+                                   if self.spanning_keys else r"(?!)")
+
+    def _prefix_state(self, key):
+        """What the candidate regex knows of the first two characters of key"""
+        first = self.trie.get(key[0])
+        if first is None:
+            return None
+        return _TERMINAL in first, len(key) > 1 and key[1] in first
+
+    def insert(self, key, value):
+        """
+        Adds key, or changes its value, in O(len(key)). The regexes are only recompiled when
+        the key changes what they match: a new first character or word prefix, or a space.
+        """
+        before = self._prefix_state(key)
+        node = self.trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[_TERMINAL] = value
+        spanning = any(ch.isspace() for ch in key)
+        if spanning:
+            self.spanning_keys.add(key)
+        if spanning or self._prefix_state(key) != before:
+            self._compile()
+
+    def delete(self, key):
+        """Removes key in O(len(key)), pruning the nodes left empty. Returns its value or None"""
+        before = self._prefix_state(key)
+        path = []
+        node = self.trie
+        for ch in key:
+            path.append((node, ch))
+            node = node.get(ch)
+            if node is None:
+                return None
+        value = node.pop(_TERMINAL, None)
+        for parent, ch in reversed(path):
+            if parent[ch]:
+                break
+            del parent[ch]
+        spanning = key in self.spanning_keys
+        self.spanning_keys.discard(key)
+        if spanning or self._prefix_state(key) != before:
+            self._compile()
+        return value
+
+    def spans_words(self, text):
+        """True when a key with a space in it may match in text, so it cannot be split into words"""
+        return self.spanning.search(text) is not None
+
+    def _longest_match(self, text, start):
+        """
+        Walks the trie from start and returns (end, value) of the longest key that ends on a
+        cluster and word boundary, or None. Variation selectors and skin tones following a key
+        that does not include them are absorbed into the match. An ASCII emoticon must be
+        followed by a space, punctuation, an emoji or the end of the text.
+        """
+        n = len(text)
+        node = self.trie
+        position = start
+        is_ascii = True
+        best = None
+        while position < n:
+            ch = text[position]
+            node = node.get(ch)
+            if node is None:
+                break
+            position += 1
+            is_ascii = is_ascii and ch.isascii()
+            if _TERMINAL not in node:
+                continue
+            end = position
+            while end < n and (text[end] in _VARIATION_SELECTORS or _is_skin_tone(text[end])):
+                end += 1
+            if end < n:
+                following = text[end]
+                if following == ZWJ or _extends_cluster(following):
+                    continue
+                if is_ascii and not _ends_emoticon(following):
+                    continue
+            best = (end, node[_TERMINAL])
+        return best
+
+    def finditer(self, text):
+        """Yields (start, end, value) for every key found in text, longest match first"""
+        search = self.candidates.search
+        position = 0
+        while True:
+            candidate = search(text, position)
+            if candidate is None:
+                return
+            start = candidate.start()
+            match = self._longest_match(text, start)
+            if match is None:
+                # skip the whole cluster so a match never starts inside one
+                position = cluster_end(text, start)
+                continue
+            end, value = match
+            yield (start, end, value)
+            position = end
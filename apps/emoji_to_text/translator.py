@@ -2,74 +2,236 @@
 Class that implements the logic for the translator.
 Enables translation from emoji to text with options such as
 binary, first letter of emoji, middle letter of emoji, last letter of emoji,
-full meaning of emoji
+full meaning of emoji, and from text back to emoji
 """
-from emot.emo_unicode import UNICODE_EMOJI, UNICODE_EMOJI_ALIAS, EMOTICONS_EMO
-from flashtext import KeywordProcessor
+import re
+import sys
+
+import numpy as np
+
+from apps.emoji_to_text.cache import LRUCache, Memo
+from apps.emoji_to_text.index import load_index
+from apps.emoji_to_text.overlay import OVERLAY_PATH, DictionaryOverlay
+from apps.emoji_to_text.phrases import PhraseMatcher
+from apps.emoji_to_text.tokenizer import EmojiTokenizer
+
+# output mode -> attribute of the Translator and of a Translation holding it
+MODES = {
+    "full": "full_meaning",
+    "first": "first_letter_only",
+    "middle": "middle_letter_only",
+    "last": "last_letter_only",
+    "binary": "binary_result",
+    "emoji": "emoji_text",
+}
+
+# default limits of the caches of tokenized messages and words
+MESSAGE_CACHE_ENTRIES = 4096
+MESSAGE_CACHE_BYTES = 16 << 20
+WORD_CACHE_ENTRIES = 65536
+WORD_CACHE_BYTES = 16 << 20
+
+_VIEW_POSITIONS = {"full": 0, "first": 1, "middle": 2, "last": 3}
+
+_WHITESPACE = re.compile(r"(\s+)")
+
+
+def pieces_size(key, pieces):
+    """Bytes taken by a cache entry. The letter views are shared with the index and not counted"""
+    return (sys.getsizeof(key) + sys.getsizeof(pieces)
+            + sum(sys.getsizeof(piece) for piece in pieces if piece.__class__ is str))
 
 
 class Translator:
     """Implements the translator logic"""
 
-    def __init__(self):
+    def __init__(self, index=None, cache_entries=MESSAGE_CACHE_ENTRIES,
+                 cache_bytes=MESSAGE_CACHE_BYTES, word_cache_entries=WORD_CACHE_ENTRIES,
+                 word_cache_bytes=WORD_CACHE_BYTES, overlay_path=OVERLAY_PATH):
+        """
+        Uses the given emoji index, or loads it (from the cache when possible). Recent messages
+        and words are kept tokenized within the given limits, 0 entries disables a cache. The
+        user's dictionary at overlay_path is layered on top of the index, None for none.
+        """
         self.message = ""
         self.binary_result = ""
         self.first_letter_only = ""
         self.middle_letter_only = ""
         self.last_letter_only = ""
         self.full_meaning = ""
+        self.emoji_text = ""
 
         # setting up the emoji dictionary for processing
-        # keyword processor will do the replacement
-        temp = {**UNICODE_EMOJI, **UNICODE_EMOJI_ALIAS, **EMOTICONS_EMO}
-        self.all_emoji_dict = {}
-        for key, val in temp.items():
-            new_val = val.replace(":", "").replace("_", " ").strip()
-            self.all_emoji_dict[key] = new_val
-        self.kp_all_emoji = KeywordProcessor()
-        for k, v in self.all_emoji_dict.items():
-            self.kp_all_emoji.add_keyword(k, v)
+        # keyword processor will do the replacement. Both are built once and then
+        # loaded from the index cache
+        if index is None:
+            index = load_index()
+        self.all_emoji_dict = index.mapping
+        self.kp_all_emoji = index.matcher
+        self.emoji_lookup = index.lookup
+        self.tokenizer = EmojiTokenizer(index.trie)
+        self.phrase_matcher = PhraseMatcher(index.phrases)
+        self.message_cache = LRUCache(cache_entries, cache_bytes)
+        self.word_cache = Memo(self.tokenize, pieces_size, word_cache_entries, word_cache_bytes)
+        self.overlay = None
+        if overlay_path is not None:
+            self.overlay = DictionaryOverlay(overlay_path, self.emoji_lookup, self.tokenizer)
+            self.overlay.check()
+            self.emoji_lookup = self.overlay.lookup
+
+    def cache_info(self):
+        """returns the CacheInfo of the message cache and of the word cache"""
+        return {"messages": self.message_cache.info(), "words": self.word_cache.info()}
+
+    def split_message(self, message):
+        """
+        returns the pieces of message (see tokenize()), put together from the cached pieces of
+        its words when possible
+        """
+        if self.word_cache.max_entries == 0 or self.tokenizer.spans_words(message):
+            return self.tokenize(message)
+        # an emoji never spans two words here and the spaces added around an emoji only
+        # depend on its word, so each word is tokenized once and for all
+        words = _WHITESPACE.split(message)
+        word_cache = self.word_cache
+        word_cache.count_lookups(len(words))
+        pieces = []
+        for word in words:
+            pieces.extend(word_cache[word])
+        return tuple(pieces)
+
+    def tokenize(self, message):
+        """
+        returns message split into the text between emoji (str) and the letter views of each
+        emoji (tuple). A space is added where an emoji touches the neighbouring text.
+        """
+        pieces = []
+        previous_end = 0
+        for start, end, views in self.tokenizer.finditer(message):
+            if start > previous_end:
+                pieces.append(message[previous_end:start])
+                if not message[start - 1].isspace():
+                    pieces.append(" ")
+            pieces.append(views)
+            if end < len(message) and not message[end].isspace():
+                # an emoji right after this one does not add a second space
+                pieces.append(" ")
+            previous_end = end
+        if previous_end < len(message):
+            pieces.append(message[previous_end:])
+        return tuple(pieces)
+
+    def translate(self, message):
+        """
+        returns the lazy Translation of message, nothing is computed until an output is read.
+        Recent messages come from the message cache with the outputs already computed.
+        """
+        if self.overlay is not None and self.overlay.check():
+            # the user's dictionary changed, what was tokenized with the old one is dropped
+            self.emoji_lookup = self.overlay.lookup
+            self.message_cache.clear()
+            self.word_cache.clear()
+        translation = self.message_cache.get(message)
+        if translation is None:
+            translation = Translation(message, self)
+            self.message_cache.put(message, translation, translation.nbytes)
+        return translation
+
+    def translate_modes(self, message, modes):
+        """returns the outputs of message for the given modes of MODES only"""
+        translation = self.translate(message)
+        return tuple(translation.get(mode) for mode in modes)
 
     def translate_emoji(self):
         """extracts the emojis from the text and puts the first letter"""
         if self.message:
-            result_first_letter = []
-            result_middle_letter = []
-            result_last_letter = []
-            result_full_word = []
-            message_list_form = self.message.split(" ")
-            mappings = self.kp_all_emoji.get_all_keywords()
-            for el in message_list_form:
-                if el not in mappings:
-                    result_first_letter.append(el)
-                    result_middle_letter.append(el)
-                    result_last_letter.append(el)
-                    result_full_word.append(el)
-                else:
-                    val = mappings[el]
-                    first_letter = val[0]
-                    middle_letter = val[(len(val) // 2)]
-                    last_letter = val[-1]
-
-                    result_first_letter.append(first_letter)
-                    result_middle_letter.append(middle_letter)
-                    result_last_letter.append(last_letter)
-                    result_full_word.append(val)
-
-            self.first_letter_only = " ".join(result_first_letter)
-            self.middle_letter_only = " ".join(result_middle_letter)
-            self.last_letter_only = " ".join(result_last_letter)
-            self.full_meaning = " ".join(result_full_word)
-
-            binary_str = self.convert_to_binary(self.full_meaning)
-            self.binary_result = binary_str
+            translation = self.translate(self.message)
+            self.first_letter_only = translation.first_letter_only
+            self.middle_letter_only = translation.middle_letter_only
+            self.last_letter_only = translation.last_letter_only
+            self.full_meaning = translation.full_meaning
+            self.binary_result = translation.binary_result
+            self.emoji_text = translation.emoji_text
+
+    def reverse(self, message):
+        """replaces the words and phrases of message that are the meaning of an emoji by it"""
+        return self.phrase_matcher.replace(message)
+
+    def convert_to_bits(self, word_list):
+        """
+        returns the bits of the UTF-8 encoding of word_list, most significant bit first, as a
+        numpy uint8 array of 0 and 1. For callers that do not need the text of
+        convert_to_binary(); the packed form of the same bits is word_list.encode("utf-8")
+        """
+        return np.unpackbits(np.frombuffer(word_list.encode("utf-8"), dtype=np.uint8))
 
     def convert_to_binary(self, word_list):
         """
         converts elements in word_list into its binary representation
         """
-        result = []
-        for w in bytearray(word_list, 'utf-8'):
-            new_w = format(w, '08b')
-            result.append(new_w)
-        return ''.join(result)
+        # each bit becomes the ASCII code of "0" or "1", decoded in one go
+        digits = self.convert_to_bits(word_list) + np.uint8(ord("0"))
+        return digits.tobytes().decode("ascii")
+
+
+class Translation:
+    """
+    The outputs of one message, each computed the first time it is read and then kept.
+    - get(mode): the output of a mode of MODES
+    - full_meaning, first_letter_only, middle_letter_only, last_letter_only, binary_result,
+      emoji_text
+    The message is tokenized once, on the first output read.
+    """
+    def __init__(self, message, translator):
+        self.message = message
+        self.translator = translator
+        self.pieces = None
+        self.outputs = {}
+        # bytes taken by the message, its pieces and the outputs computed so far
+        self.nbytes = sys.getsizeof(self) + sys.getsizeof(self.outputs) + sys.getsizeof(message)
+
+    def get(self, mode):
+        """returns the output of mode, computing it if needed"""
+        output = self.outputs.get(mode)
+        if output is None:
+            if mode == "binary":
+                output = self.translator.convert_to_binary(self.get("full"))
+            elif mode == "emoji":
+                output = self.translator.reverse(self.message)
+            else:
+                if self.pieces is None:
+                    self.pieces = self.translator.split_message(self.message)
+                    self.nbytes += pieces_size(self.message, self.pieces)
+                # position of the output in the letter views of an emoji, see letter_views()
+                position = _VIEW_POSITIONS[mode]
+                output = "".join(piece if piece.__class__ is str else piece[position]
+                                 for piece in self.pieces)
+            self.outputs[mode] = output
+            self.nbytes += sys.getsizeof(output)
+            # the message cache charges what this translation has grown by
+            self.translator.message_cache.resize(self.message, self.nbytes)
+        return output
+
+    @property
+    def full_meaning(self):
+        return self.get("full")
+
+    @property
+    def first_letter_only(self):
+        return self.get("first")
+
+    @property
+    def middle_letter_only(self):
+        return self.get("middle")
+
+    @property
+    def last_letter_only(self):
+        return self.get("last")
+
+    @property
+    def binary_result(self):
+        return self.get("binary")
+
+    @property
+    def emoji_text(self):
+        return self.get("emoji")
@@ -2,10 +2,88 @@
 Creates the GUI for the emoji to text translation
 """
 import os.path
-from PySide6.QtWidgets import QGridLayout, QHBoxLayout, QLabel, QLineEdit, QMainWindow, QPushButton, \
-    QScrollArea, QVBoxLayout, \
+from PySide6.QtWidgets import QAbstractItemView, QApplication, QFileDialog, QGridLayout, QHBoxLayout, \
+    QLabel, QLineEdit, QListView, QMainWindow, QMessageBox, QPushButton, QVBoxLayout, \
     QWidget
-from PySide6.QtCore import Qt
+from PySide6.QtGui import QAction
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+from apps.emoji_to_text.buffers import TextBuffer
+
+# long enough for large pastes, which are translated off the GUI thread
+MAX_INPUT_LENGTH = 1 << 20
+
+
+class OutputModel(QAbstractListModel):
+    """
+    List model over the rows of an output buffer (see buffers.py). Qt only asks for the rows
+    that are visible, so only those are ever turned into text.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.buffer = TextBuffer()
+
+    def set_buffer(self, buffer):
+        """replaces the output displayed"""
+        self.beginResetModel()
+        self.buffer = buffer
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.buffer.row_count()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.buffer.row(index.row())
+
+
+class OutputPane(QListView):
+    """
+    Shows an output buffer as a virtualized list of rows, with "Copy" and "Export..." actions
+    that read the buffer itself rather than the text of the widget.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.output_model = OutputModel(self)
+        self.setModel(self.output_model)
+        # every row has the height of one line, which saves Qt from measuring each of them
+        self.setUniformItemSizes(True)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setContextMenuPolicy(Qt.ActionsContextMenu)
+        copy_action = QAction("Copy", self)
+        copy_action.triggered.connect(self.copy_to_clipboard)
+        export_action = QAction("Export...", self)
+        export_action.triggered.connect(self.export_requested)
+        self.addAction(copy_action)
+        self.addAction(export_action)
+
+    def set_buffer(self, buffer):
+        """displays buffer, scrolled back to its start"""
+        self.output_model.set_buffer(buffer)
+        self.scrollToTop()
+
+    def buffer(self):
+        return self.output_model.buffer
+
+    def text(self):
+        """the whole output as one string, built from the buffer"""
+        return "".join(self.buffer().chunks())
+
+    def copy_to_clipboard(self):
+        QApplication.clipboard().setText(self.text())
+
+    def export_requested(self):
+        """streams the buffer to a text file chosen by the user"""
+        path, _ = QFileDialog.getSaveFileName(self, "Export output", "", "Text files (*.txt)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                self.buffer().write_to(f)
+        except OSError as e:
+            QMessageBox.warning(self, "Export output", f"Could not export the output: {e}")
 
 
 class EmojiToTextView(QMainWindow):
@@ -37,7 +115,7 @@ class EmojiToTextView(QMainWindow):
             color: blue;
             background-color: lightgrey;
         }}
-        QLabel#Box{{
+        QListView#Box{{
             border: 1px solid black;
             background-color: lightgrey;
         }}
@@ -59,7 +137,7 @@ class EmojiToTextView(QMainWindow):
         input_message_title.setObjectName("Title")
         second_inner_layout = QHBoxLayout()
         self.input_message = QLineEdit()
-        self.input_message.setMaxLength(100)
+        self.input_message.setMaxLength(MAX_INPUT_LENGTH)
         self.input_message.setPlaceholderText("Your text can contain emojis or not")
         self.translate_button = QPushButton("Translate")
         second_inner_layout.addWidget(self.input_message)
@@ -69,74 +147,22 @@ class EmojiToTextView(QMainWindow):
         input_message_layout.addLayout(second_inner_layout)
 
         # first letter text box
-        first_letter_layout = QHBoxLayout()
-        first_letter_title = QLabel("Emoji First Letter")
-        first_letter_title.setObjectName("Title")
-        self.first_letter_textbox = QLabel("")
-        self.first_letter_textbox.setObjectName("Box")
-        self.first_letter_textbox.setWordWrap(True)
-        first_letter_scroll = QScrollArea()
-        first_letter_scroll.setWidgetResizable(True)
-        first_letter_scroll.setWidget(self.first_letter_textbox)
-        first_letter_layout.addWidget(first_letter_title)
-        first_letter_layout.addSpacing(5)
-        first_letter_layout.addWidget(first_letter_scroll)
+        first_letter_layout, self.first_letter_textbox = self.output_box("Emoji First Letter")
 
         # middle letter text box
-        middle_letter_layout = QHBoxLayout()
-        middle_letter_title = QLabel("Emoji Middle Letter")
-        middle_letter_title.setObjectName("Title")
-        self.middle_letter_textbox = QLabel("")
-        self.middle_letter_textbox.setObjectName("Box")
-        self.middle_letter_textbox.setWordWrap(True)
-        middle_letter_scroll = QScrollArea()
-        middle_letter_scroll.setWidgetResizable(True)
-        middle_letter_scroll.setWidget(self.middle_letter_textbox)
-        middle_letter_layout.addWidget(middle_letter_title)
-        middle_letter_layout.addSpacing(5)
-        middle_letter_layout.addWidget(middle_letter_scroll)
+        middle_letter_layout, self.middle_letter_textbox = self.output_box("Emoji Middle Letter")
 
         # last letter text box
-        last_letter_layout = QHBoxLayout()
-        last_letter_title = QLabel("Emoji Last Letter")
-        last_letter_title.setObjectName("Title")
-        self.last_letter_textbox = QLabel("")
-        self.last_letter_textbox.setObjectName("Box")
-        self.last_letter_textbox.setWordWrap(True)
-        last_letter_scroll = QScrollArea()
-        last_letter_scroll.setWidgetResizable(True)
-        last_letter_scroll.setWidget(self.last_letter_textbox)
-        last_letter_layout.addWidget(last_letter_title)
-        last_letter_layout.addSpacing(5)
-        last_letter_layout.addWidget(last_letter_scroll)
+        last_letter_layout, self.last_letter_textbox = self.output_box("Emoji Last Letter")
 
         # binary version text box
-        binary_version_layout = QHBoxLayout()
-        binary_version_title = QLabel("Binary version of the text")
-        binary_version_title.setObjectName("Title")
-        self.binary_textbox = QLabel("")
-        self.binary_textbox.setObjectName("Box")
-        self.binary_textbox.setWordWrap(True)
-        binary_scrollArea = QScrollArea()
-        binary_scrollArea.setWidgetResizable(True)
-        binary_scrollArea.setWidget(self.binary_textbox)
-        binary_version_layout.addWidget(binary_version_title)
-        binary_version_layout.addSpacing(5)
-        binary_version_layout.addWidget(binary_scrollArea)
+        binary_version_layout, self.binary_textbox = self.output_box("Binary version of the text")
 
         # full meaning textbox
-        full_meaning_layout = QHBoxLayout()
-        full_meaning_title = QLabel("Full meaning")
-        full_meaning_title.setObjectName("Title")
-        self.full_meaning_textbox = QLabel("")
-        self.full_meaning_textbox.setObjectName("Box")
-        self.full_meaning_textbox.setWordWrap(True)
-        full_meaning_scroll_area = QScrollArea()
-        full_meaning_scroll_area.setWidgetResizable(True)
-        full_meaning_scroll_area.setWidget(self.full_meaning_textbox)
-        full_meaning_layout.addWidget(full_meaning_title)
-        full_meaning_layout.addSpacing(5)
-        full_meaning_layout.addWidget(full_meaning_scroll_area)
+        full_meaning_layout, self.full_meaning_textbox = self.output_box("Full meaning")
+
+        # text to emoji textbox
+        emoji_text_layout, self.emoji_text_textbox = self.output_box("Text as emoji")
 
         # arranging the different layouts
         central_widget_layout.addLayout(input_message_layout, 0, 1, 2, 10)
@@ -145,3 +171,35 @@ class EmojiToTextView(QMainWindow):
         central_widget_layout.addLayout(last_letter_layout, 9, 1, 2, 10)
         central_widget_layout.addLayout(binary_version_layout, 12, 1, 2, 10)
         central_widget_layout.addLayout(full_meaning_layout, 15, 1, 2, 10)
+        central_widget_layout.addLayout(emoji_text_layout, 18, 1, 2, 10)
+
+        # output boxes by translation mode, see MODES in the translator
+        self.output_boxes = {
+            "first": self.first_letter_textbox,
+            "middle": self.middle_letter_textbox,
+            "last": self.last_letter_textbox,
+            "binary": self.binary_textbox,
+            "full": self.full_meaning_textbox,
+            "emoji": self.emoji_text_textbox,
+        }
+
+    def output_box(self, title):
+        """Creates a titled output pane and returns its layout and the pane"""
+        layout = QHBoxLayout()
+        title_label = QLabel(title)
+        title_label.setObjectName("Title")
+        pane = OutputPane()
+        pane.setObjectName("Box")
+        layout.addWidget(title_label)
+        layout.addSpacing(5)
+        layout.addWidget(pane)
+        return layout, pane
+
+    def show_translation(self, outputs):
+        """Fills the output panes from outputs (mode -> buffer) and repaints the window once"""
+        self.setUpdatesEnabled(False)
+        try:
+            for mode, buffer in outputs.items():
+                self.output_boxes[mode].set_buffer(buffer)
+        finally:
+            self.setUpdatesEnabled(True)
@@ -0,0 +1,168 @@
+"""
+Implements an asyncio facade over the AudioRecorder for headless services. The PortAudio and
+playback monitor threads hand their events to the event loop with call_soon_threadsafe, so
+many recorders can run in one process without Qt and without blocking the loop.
+"""
+import asyncio
+
+from apps.voice_recorder.recorder import AudioConfig, AudioRecorder, to_float32
+
+# blocks buffered for each stream() consumer before the oldest are dropped
+_STREAM_QUEUE_SIZE = 256
+
+# marks the end of a recording in the stream queues
+_END_OF_STREAM = None
+
+
+class AsyncAudioRecorder:
+    """
+    An asyncio wrapper around AudioRecorder.
+    - await start() / await stop(): records from the configured device
+    - await start_vad(): records in voice activated mode, the paths of the takes written are
+      in saved_takes once stop() returns
+    - await start_multi(device_indices): records several devices at once
+    - async for block in stream(): yields the captured chunks while recording, in whichever
+      mode the recorder was started (plain, voice activated or multi-device)
+    - await save(wav_name): writes the take, like save_wav()
+    - await save_tracks(): writes the aligned tracks of a multi-device take, like save_tracks()
+    - await play(): plays the take and returns once the playback has ended
+    - await close(): releases the audio subsystem
+    """
+    def __init__(self, audio_config=None, recorder=None):
+        """Wraps the given recorder, or creates one for the audio config"""
+        if recorder is None:
+            recorder = AudioRecorder(audio_config or AudioConfig())
+        self.recorder = recorder
+        self.audio_config = recorder.audio_config
+        self.loop = None
+        self.stream_queues = set()
+        self.dropped_blocks = 0
+        self.playback_waiters = []
+        self.recorder.chunk_listeners.append(self._on_chunk)
+        self.recorder.playback_listeners.append(self._on_playback_finished)
+
+    def _bind_loop(self):
+        """Remembers the running loop the threads should hand their events to"""
+        self.loop = asyncio.get_running_loop()
+
+    def _on_chunk(self, data, track):
+        """Called on the PortAudio thread with each captured chunk and its track, if any"""
+        if self.loop is not None and self.stream_queues:
+            self.loop.call_soon_threadsafe(self._publish, (data, track))
+
+    def _publish(self, item):
+        """Runs on the event loop: hands a (chunk, track) to every stream() consumer"""
+        for stream_queue in self.stream_queues:
+            if stream_queue.full():
+                # a slow consumer loses its oldest blocks rather than holding up the others
+                stream_queue.get_nowait()
+                self.dropped_blocks += 1
+            stream_queue.put_nowait(item)
+
+    def _on_playback_finished(self):
+        """Called on the playback monitor thread when a playback ends"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._wake_playback_waiters)
+
+    def _wake_playback_waiters(self):
+        """Runs on the event loop: resolves the pending play() calls"""
+        waiters, self.playback_waiters = self.playback_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def start(self):
+        """Starts recording. Opening the device runs in the default executor"""
+        self._bind_loop()
+        await self.loop.run_in_executor(None, self.recorder.start)
+
+    async def start_vad(self):
+        """Starts recording in voice activated mode, see AudioRecorder.start_vad()"""
+        self._bind_loop()
+        await self.loop.run_in_executor(None, self.recorder.start_vad)
+
+    async def start_multi(self, device_indices=None):
+        """Starts recording the given devices, those of the audio config by default"""
+        self._bind_loop()
+        await self.loop.run_in_executor(None, self.recorder.start_multi, device_indices)
+
+    @property
+    def saved_takes(self):
+        """The paths of the takes written by the last voice activated recording"""
+        return self.recorder.saved_takes
+
+    async def stop(self):
+        """Stops recording and ends every stream() in progress"""
+        self._bind_loop()
+        await self.loop.run_in_executor(None, self.recorder.stop)
+        for stream_queue in self.stream_queues:
+            if stream_queue.full():
+                stream_queue.get_nowait()
+            stream_queue.put_nowait(_END_OF_STREAM)
+
+    async def stream(self, raw=False, with_device=False):
+        """
+        Yields the chunks captured from now until stop(), as float32 arrays of shape
+        (n, channels), or as the raw bytes when raw is True. When recording several devices,
+        the chunks of all of them come in the order they arrive. With with_device, each chunk
+        comes as (device index, chunk), the device index being None for a single device.
+        """
+        self._bind_loop()
+        stream_queue = asyncio.Queue(maxsize=_STREAM_QUEUE_SIZE)
+        self.stream_queues.add(stream_queue)
+        try:
+            while True:
+                item = await stream_queue.get()
+                if item is _END_OF_STREAM:
+                    return
+                data, track = item
+                if not raw:
+                    channels = self.audio_config.channels if track is None else track.channels
+                    data = to_float32(data, self.audio_config.sample_format, channels)
+                if with_device:
+                    yield (None if track is None else track.device_index, data)
+                else:
+                    yield data
+        finally:
+            self.stream_queues.discard(stream_queue)
+
+    async def save(self, wav_name=None):
+        """Saves the take in the default executor and returns the path written"""
+        self._bind_loop()
+        return await self.loop.run_in_executor(None, self.recorder.save_wav, wav_name)
+
+    async def save_tracks(self):
+        """
+        Saves the tracks of a multi-device take in the default executor and returns the
+        (path, device name, drift in ppm) of each
+        """
+        self._bind_loop()
+        return await self.loop.run_in_executor(None, self.recorder.save_tracks)
+
+    async def play(self):
+        """Plays the take and returns when the playback has finished, paused or stopped"""
+        self._bind_loop()
+        waiter = self.loop.create_future()
+        self.playback_waiters.append(waiter)
+        try:
+            await self.loop.run_in_executor(None, self.recorder.play_audio)
+        except Exception:
+            self.playback_waiters.remove(waiter)
+            raise
+        await waiter
+
+    async def stop_playing(self):
+        """Stops the playback, which also resolves the pending play()"""
+        self._bind_loop()
+        await self.loop.run_in_executor(None, self.recorder.stop_playing)
+
+    async def close(self):
+        """Stops everything and releases the audio subsystem"""
+        self._bind_loop()
+        if self.recorder.is_recording():
+            await self.stop()
+        if self.recorder.is_in_playing():
+            await self.stop_playing()
+        self.recorder.chunk_listeners.remove(self._on_chunk)
+        self.recorder.playback_listeners.remove(self._on_playback_finished)
+        await self.loop.run_in_executor(None, self.recorder.audio_system.terminate)
@@ -1,11 +1,22 @@
+import os.path
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 from PySide6.QtCore import QObject, Qt, QTimer, Slot
-from apps.voice_recorder.recorder import (AudioRecorder, AudioConfig,
-                                          NoRecordingAvailable, PlayRecordingInSession,
-                                          RecordingInSession)
+from apps.voice_recorder.calibration import ChunkCalibrator
+from apps.voice_recorder.library import RecordingsLibrary
+from apps.voice_recorder.metering import TruePeakMeter
+from apps.voice_recorder.stretch import window_frames
+from apps.voice_recorder.recorder import (AudioRecorder, NoRecordingAvailable,
+                                          PlayRecordingInSession, RecordingInSession,
+                                          load_audio_config, save_device_chunks, to_float32)
 from enum import Enum, auto
 
-from apps.voice_recorder.views import VoiceRecorderView
+from apps.voice_recorder.views import RecordingsLibraryPanel, VoiceRecorderView
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
 
 
 class State(Enum):
@@ -25,7 +36,7 @@ class VoiceRecorder(QObject):
 
     def __init__(self):
         super().__init__()
-        self.audio_config = AudioConfig()
+        self.audio_config = load_audio_config(CONFIG_PATH)
         self.audio_recorder_logic = AudioRecorder(self.audio_config)
         self.audio_recorder_views = VoiceRecorderView()
         self.state_machine = State.IDLE
@@ -36,16 +47,95 @@ class VoiceRecorder(QObject):
         self.audio_recorder_views.stop_button.clicked.connect(self.stop_requested)
         self.audio_recorder_views.play_button.clicked.connect(self.play_requested)
         self.audio_recorder_views.save_wav_button.clicked.connect(self.save_wav_requested)
+        self.audio_recorder_views.vad_checkbox.toggled.connect(self.vad_toggled)
+        self.audio_recorder_views.library_button.clicked.connect(self.library_requested)
+        speed_index = self.audio_recorder_views.speed_selector.findData(
+            self.audio_config.playback_speed)
+        if speed_index >= 0:
+            self.audio_recorder_views.speed_selector.setCurrentIndex(speed_index)
+        self.audio_recorder_views.speed_selector.currentIndexChanged.connect(self.speed_changed)
+        self.update_speed_tooltip()
+        self.audio_recorder_views.calibrate_button.clicked.connect(self.calibrate_requested)
 
         # timer for the db level, clip level and meter bar
         self.timer = QTimer()
         self.timer.setInterval(75)
         self.timer.timeout.connect(self.timer_tick)
 
+        # per-channel sample and true peak meter, fed with the chunks captured between ticks
+        self.peak_meter = TruePeakMeter(self.audio_config.channels)
+        self.metered_frames = None
+        self.metered_count = 0
+        self.audio_recorder_views.setChannelCount(self.audio_config.channels)
+
+        # recordings library, indexed lazily by a process pool the first time it is opened
+        recordings_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      self.audio_config.output_dir)
+        self.library = RecordingsLibrary(recordings_dir)
+        self.library_panel = None
+        self.library_executor = None
+        self.library_futures = []
+        self.library_timer = QTimer()
+        self.library_timer.setInterval(200)
+        self.library_timer.timeout.connect(self.library_tick)
+        self.audio_recorder_views.closed.connect(self.window_closed)
+
+        # chunk size calibration, run in a thread since it keeps streams open for seconds
+        self.calibration_thread = None
+        self.calibration_result = None
+        self.calibration_timer = QTimer()
+        self.calibration_timer.setInterval(200)
+        self.calibration_timer.timeout.connect(self.calibration_tick)
+
+        # takes interrupted by a crash are rebuilt from the capture journal, in a thread since
+        # a long take takes a while to convert. The sessions are listed before any recording
+        # can start, so the thread never sees the journal of a new take
+        self.recovery_thread = None
+        self.recovery_result = None
+        self.recovery_timer = QTimer()
+        self.recovery_timer.setInterval(200)
+        self.recovery_timer.timeout.connect(self.recovery_tick)
+        sessions = self.audio_recorder_logic.list_interrupted()
+        if sessions:
+            self.recover_sessions(sessions)
+
+    def recover_sessions(self, sessions):
+        """rebuilds the takes of the given journal sessions in a background thread"""
+        recorder = self.audio_recorder_logic
+
+        def _run():
+            self.recovery_result = recorder.recover_interrupted(sessions)
+
+        self.audio_recorder_views.message_box.setText(
+            f"Recovering {len(sessions)} interrupted takes...")
+        self.recovery_thread = threading.Thread(target=_run, daemon=True)
+        self.recovery_thread.start()
+        self.recovery_timer.start()
+
+    @Slot()
+    def recovery_tick(self):
+        """reports the recovered takes once the recovery thread is done"""
+        if self.recovery_thread.is_alive():
+            return
+        self.recovery_timer.stop()
+        self.recovery_thread = None
+        recovered = self.recovery_result or []
+        self.audio_recorder_views.message_box.setText(
+            f"Recovered {len(recovered)} interrupted takes")
+        self.refresh_library()
+
 
     def compute_byte_slice_size(self):
-        current_sample_rate = self.audio_config.rate
+        recorder = self.audio_recorder_logic
+        # a multi-device take is metered on its first track, which may have fewer channels
+        source = recorder
         current_channels = int(self.audio_config.channels)
+        if self.audio_config.device_indices and recorder.tracks:
+            source = recorder.tracks[0]
+            current_channels = source.channels
+        if self.peak_meter.channels != current_channels:
+            self.peak_meter = TruePeakMeter(current_channels)
+        current_sample_rate = self.audio_config.rate
         current_sample_format = self.audio_config.sample_format
         if current_sample_format == "int16":
             bytes_per_sample = 2
@@ -56,37 +146,41 @@ class VoiceRecorder(QObject):
         bytes_per_frames = current_channels * bytes_per_sample
         bytes_in_window = frames_in_window * bytes_per_frames
 
-        current_byte_frame = (self.audio_recorder_logic.
-                              get_raw_bytes(self.audio_recorder_logic.frames))
-        tail = current_byte_frame[-bytes_in_window:]
-        if len(tail) == 0:
-            return (0, 0, 0, False)
-        rem = len(tail) % bytes_per_frames
-        if rem != 0:
-            tail = tail[:-rem]
+        # only the chunks captured since the last tick go through the peak meter, and only the
+        # chunks covering the window are joined, so a tick costs the same at any take length
+        with source.lock:
+            frames = source.frames
+            if frames is not self.metered_frames or self.metered_count > len(frames):
+                self.metered_frames = frames
+                self.metered_count = 0
+                self.peak_meter.reset()
+            new_chunks = frames[self.metered_count:]
+            self.metered_count = len(frames)
+            tail_chunks = []
+            tail_size = 0
+            for chunk in reversed(frames):
+                if tail_size >= bytes_in_window:
+                    break
+                tail_chunks.append(chunk)
+                tail_size += len(chunk)
+        tail_chunks.reverse()
 
-        # normalization
-        if current_sample_format == "int16":
-            int_array = np.frombuffer(tail, dtype=np.int16)
-            normalized_float_array = ((int_array.astype('float32') / 32768.0)
-                                      .reshape(-1, current_channels))
-        elif current_sample_format == "int32":
-            int_array = np.frombuffer(tail, dtype=np.int32)
-            normalized_float_array = ((int_array.astype('float32') / 2147483648.0).
-                                      reshape(-1, current_channels))
-        elif current_sample_format == "float32":
-            normalized_float_array = (np.frombuffer(tail, dtype=np.float32).
-                                      reshape(-1, current_channels))
+        for chunk in new_chunks:
+            self.peak_meter.process(to_float32(chunk, current_sample_format, current_channels))
+        sample_peaks, true_peaks = self.peak_meter.read()
+        channel_clipping = self.peak_meter.clipping(sample_peaks, true_peaks)
+
+        tail = b"".join(tail_chunks)[-bytes_in_window:]
+        if len(tail) == 0:
+            return (0, 0, 0, False, channel_clipping)
+        normalized_float_array = to_float32(tail, current_sample_format, current_channels)
 
         samples = np.mean(np.abs(normalized_float_array), axis=1)
         rms = np.sqrt(np.mean(samples ** 2))
-        peak = np.max(np.abs(samples))
+        peak = float(np.max(true_peaks)) if true_peaks.size else 0.0
         db = 20 * np.log10(rms + 1e-12)
-        if peak >= 0.999:
-            is_clipping = True
-        else:
-            is_clipping = False
-        return (rms, peak, db, is_clipping)
+        is_clipping = any(channel_clipping)
+        return (rms, peak, db, is_clipping, channel_clipping)
 
     @Slot()
     def timer_tick(self):
@@ -94,12 +188,13 @@ class VoiceRecorder(QObject):
         does the computation for the VU, clip and db
         """
         if self.state_machine == State.RECORDING:
-            rms, peak, db_level, clip_state = self.compute_byte_slice_size()
+            rms, peak, db_level, clip_state, channel_clipping = self.compute_byte_slice_size()
             self.audio_recorder_views.setVULevel(rms)
             if db_level < -80:
                 db_level = -80
             self.audio_recorder_views.setDBLabel(str(db_level))
             self.audio_recorder_views.setPeakClipping(clip_state)
+            self.audio_recorder_views.setChannelClipping(channel_clipping)
         elif self.state_machine == State.PLAYING:
             if not self.audio_recorder_logic.is_in_playing():
                 self.state_machine = State.STOPPED
@@ -115,13 +210,24 @@ class VoiceRecorder(QObject):
         if self.state_machine == State.PLAYING or self.state_machine == State.PAUSED:
             self.audio_recorder_views.message_box.setText("Finish playing or stop pausing 1st")
             return
+        if self.audio_config.vad_enabled and self.audio_config.device_indices:
+            self.audio_recorder_views.message_box.setText(
+                "Voice activated mode records one device, clear device_indices to use it")
+            return
         try:
-            self.audio_recorder_logic.start()
+            if self.audio_config.vad_enabled:
+                self.audio_recorder_logic.start_vad()
+            elif self.audio_config.device_indices:
+                self.audio_recorder_logic.start_multi()
+            else:
+                self.audio_recorder_logic.start()
             self.state_machine = State.RECORDING
             self.audio_recorder_views.recording_label.setStyleSheet("background-color: red;")
             self.timer.start()
         except (RecordingInSession):
             self.audio_recorder_views.message_box.setText("Recording in Session")
+        except (IOError, OSError) as e:
+            self.audio_recorder_views.message_box.setText("Could not open the device: " + str(e))
 
 
 
@@ -147,6 +253,11 @@ class VoiceRecorder(QObject):
             self.state_machine = State.STOPPED
             self.audio_recorder_views.recording_label.setStyleSheet("background-color: grey;")
             self.timer.stop()
+            if self.audio_config.vad_enabled:
+                self.state_machine = State.IDLE
+                saved_takes = len(self.audio_recorder_logic.saved_takes)
+                self.audio_recorder_views.message_box.setText(f"{saved_takes} takes saved")
+                self.refresh_library()
 
         elif self.state_machine == State.PLAYING:
             self.audio_recorder_logic.stop_playing()
@@ -181,9 +292,174 @@ class VoiceRecorder(QObject):
         wav file in the recordings directory from the audio config.
         """
         try:
-            self.audio_recorder_logic.save_wav()
+            if self.audio_config.device_indices:
+                saved = self.audio_recorder_logic.save_tracks()
+                drifts = ", ".join(f"{name}: {ppm:+.0f} ppm" for _, name, ppm in saved)
+                self.audio_recorder_views.message_box.setText(
+                    f"Saved {len(saved)} aligned tracks ({drifts})")
+            else:
+                self.audio_recorder_logic.save_wav()
             self.state_machine = State.IDLE
             if self.timer.isActive():
                 self.timer.stop()
+            self.refresh_library()
         except (RecordingInSession):
             self.audio_recorder_views.message_box.setText("Recording rn! Cant save")
+        except (NoRecordingAvailable):
+            self.audio_recorder_views.message_box.setText("Nothing recorded to save")
+
+    @Slot(int)
+    def speed_changed(self, index):
+        """
+        changes the playback speed, also while a recording is being played.
+        """
+        speed = self.audio_recorder_views.speed_selector.itemData(index)
+        if self.audio_config.playback_speed == 1.0 and self.state_machine == State.PLAYING:
+            self.audio_recorder_views.message_box.setText("New speed applies on the next play")
+        self.audio_recorder_logic.set_playback_speed(speed)
+
+    def update_speed_tooltip(self):
+        """shows how late a speed change is heard with the current playback chunk"""
+        rate = self.audio_config.rate
+        playback_chunk = self.audio_config.playback_chunk or self.audio_config.chunk
+        lag_ms = window_frames(rate, playback_chunk) // 2 * 1000 / rate
+        self.audio_recorder_views.speed_selector.setToolTip(
+            f"Playback speed, the pitch is kept. Speeds other than 1x lag by up to "
+            f"{lag_ms:.1f} ms")
+
+    @Slot(bool)
+    def vad_toggled(self, checked):
+        """
+        switches the voice activated mode on or off. Only allowed when not recording.
+        """
+        if self.state_machine == State.RECORDING:
+            self.audio_recorder_views.vad_checkbox.blockSignals(True)
+            self.audio_recorder_views.vad_checkbox.setChecked(self.audio_config.vad_enabled)
+            self.audio_recorder_views.vad_checkbox.blockSignals(False)
+            self.audio_recorder_views.message_box.setText("Stop recording first")
+            return
+        if checked and self.audio_config.device_indices:
+            self.audio_recorder_views.message_box.setText(
+                "Voice activated mode records one device, clear device_indices to use it")
+        self.audio_config.vad_enabled = checked
+
+    @Slot(bool)
+    def library_requested(self):
+        """
+        opens the recordings library. The cached index is shown right away and the takes
+        that are new or changed are analyzed in the background.
+        """
+        if self.library_panel is None:
+            self.library_panel = RecordingsLibraryPanel()
+            self.library.load()
+        self.library_panel.setEntries(self.library.sorted_entries())
+        self.library_panel.show()
+        self.refresh_library()
+
+    def refresh_library(self):
+        """submits the stale takes of the library to the process pool"""
+        if self.library_panel is None or self.library_futures:
+            return
+        if self.library_executor is None:
+            self.library_executor = ProcessPoolExecutor()
+        self.library_futures = self.library.refresh(self.library_executor)
+        if self.library_futures:
+            self.library_panel.setStatus(f"Indexing {len(self.library_futures)} takes...")
+            self.library_timer.start()
+        else:
+            self.library_panel.setEntries(self.library.sorted_entries())
+            self.library_panel.setStatus(f"{len(self.library.entries)} takes")
+
+    @Slot()
+    def window_closed(self):
+        """stops everything when the window is closed, an unsaved take is thrown away"""
+        self.timer.stop()
+        self.audio_recorder_logic.close()
+        self.shutdown_library()
+
+    def shutdown_library(self):
+        """stops the indexing of the library and its worker processes"""
+        self.library_timer.stop()
+        self.library_futures = []
+        if self.library_executor is not None:
+            self.library_executor.shutdown(wait=False, cancel_futures=True)
+            self.library_executor = None
+
+    @Slot()
+    def library_tick(self):
+        """
+        applies the finished analyses to the library and the table, and saves the index once
+        every take has been analyzed
+        """
+        done = [future for future in self.library_futures if future.done()]
+        if not done:
+            return
+        for future in done:
+            self.library_futures.remove(future)
+            try:
+                metadata = future.result()
+            except Exception as e:
+                print("Library error: " + str(e))
+                continue
+            if metadata is not None:
+                self.library.apply(metadata)
+        self.library_panel.setEntries(self.library.sorted_entries())
+        if self.library_futures:
+            self.library_panel.setStatus(f"Indexing {len(self.library_futures)} takes...")
+        else:
+            self.library_timer.stop()
+            self.library.save()
+            self.library_panel.setStatus(f"{len(self.library.entries)} takes")
+
+    @Slot(bool)
+    def calibrate_requested(self):
+        """
+        measures the callback timing of the selected device for several chunk sizes and keeps
+        the smallest stable one for capture and for playback.
+        """
+        if self.state_machine in (State.RECORDING, State.PLAYING, State.PAUSED):
+            self.audio_recorder_views.message_box.setText("Stop recording or playing first")
+            return
+        if self.calibration_thread is not None:
+            return
+        calibrator = ChunkCalibrator(self.audio_recorder_logic.audio_system, self.audio_config)
+
+        def _run():
+            self.calibration_result = calibrator.calibrate()
+
+        self.calibration_result = None
+        self.audio_recorder_views.calibrate_button.setEnabled(False)
+        self.audio_recorder_views.record_button.setEnabled(False)
+        self.audio_recorder_views.play_button.setEnabled(False)
+        self.audio_recorder_views.message_box.setText("Calibrating, stay quiet...")
+        self.calibration_thread = threading.Thread(target=_run, daemon=True)
+        self.calibration_thread.start()
+        self.calibration_timer.start()
+
+    @Slot()
+    def calibration_tick(self):
+        """applies and persists the calibration once its thread is done"""
+        if self.calibration_thread.is_alive():
+            return
+        self.calibration_timer.stop()
+        self.calibration_thread = None
+        self.audio_recorder_views.calibrate_button.setEnabled(True)
+        self.audio_recorder_views.record_button.setEnabled(True)
+        self.audio_recorder_views.play_button.setEnabled(True)
+        result = self.calibration_result
+        if result is None or result.capture_chunk is None:
+            self.audio_recorder_views.message_box.setText("No stable chunk size found")
+            return
+        self.audio_config.chunk = result.capture_chunk
+        self.audio_config.playback_chunk = result.playback_chunk
+        # the capture chunk belongs to the input device, the playback one to the output device
+        updates = {result.device_name: {"chunk": result.capture_chunk}}
+        if result.playback_chunk is not None and result.output_device_name is not None:
+            updates.setdefault(result.output_device_name, {})["playback_chunk"] = \
+                result.playback_chunk
+        for device_name, chunks in updates.items():
+            self.audio_config.device_chunks.setdefault(device_name, {}).update(chunks)
+        save_device_chunks(CONFIG_PATH, updates)
+        self.update_speed_tooltip()
+        self.audio_recorder_views.message_box.setText(
+            f"Chunk set to {result.capture_chunk} (playback {result.playback_chunk})")
@@ -0,0 +1,160 @@
+"""
+Implements the chunk size calibration of the voice recorder: the selected device is opened with
+increasingly large buffers and the smallest one whose callbacks arrive on time is kept.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pyaudio
+
+from apps.voice_recorder.recorder import _SAMPLE_FORMAT
+
+# buffer sizes tried, smallest first
+CANDIDATE_CHUNKS = (64, 128, 256, 512, 1024, 2048, 4096)
+
+# seconds each buffer size is measured for
+_MEASURE_SECONDS = 1.5
+
+# callbacks ignored at the start of a measurement while the stream settles
+_WARMUP_CALLBACKS = 4
+
+# a buffer size is stable when the jitter stays below this fraction of the callback period
+# and no callback arrives later than the late factor times the period
+_MAX_JITTER_RATIO = 0.25
+_MAX_LATE_FACTOR = 1.9
+
+
+@dataclass
+class ChunkMeasurement:
+    """Timing of the callbacks for one buffer size"""
+    chunk: int
+    callbacks: int
+    jitter_ratio: float
+    worst_ratio: float
+    overruns: int
+    stable: bool
+
+
+@dataclass
+class CalibrationResult:
+    """
+    Smallest stable capture chunk of the input device and playback chunk of the output
+    device, with the measurements
+    """
+    device_name: str
+    output_device_name: Optional[str] = None
+    capture_chunk: Optional[int] = None
+    playback_chunk: Optional[int] = None
+    capture_measurements: list = field(default_factory=list)
+    playback_measurements: list = field(default_factory=list)
+
+
+def assess_timing(chunk, rate, arrivals, overruns):
+    """
+    Rates the callback arrival times (in seconds) measured for a buffer size.
+    The jitter is the standard deviation of the intervals between callbacks and the worst
+    ratio is the longest interval, both relative to the nominal period chunk / rate.
+    """
+    period = chunk / rate
+    intervals = np.diff(np.asarray(arrivals[_WARMUP_CALLBACKS:], dtype=np.float64))
+    if intervals.size < 2:
+        return ChunkMeasurement(chunk, len(arrivals), float("inf"), float("inf"), overruns, False)
+    jitter_ratio = float(np.std(intervals)) / period
+    worst_ratio = float(np.max(intervals)) / period
+    stable = (overruns == 0 and jitter_ratio <= _MAX_JITTER_RATIO
+              and worst_ratio <= _MAX_LATE_FACTOR)
+    return ChunkMeasurement(chunk, len(arrivals), jitter_ratio, worst_ratio, overruns, stable)
+
+
+class ChunkCalibrator:
+    """
+    Sweeps the candidate buffer sizes on the device of an audio config.
+    - measure(chunk, output): opens one stream and times its callbacks
+    - calibrate(): returns a CalibrationResult with the smallest stable chunk in each direction
+    """
+    def __init__(self, audio_system, audio_config, candidates=CANDIDATE_CHUNKS,
+                 seconds=_MEASURE_SECONDS):
+        """Initializes the calibrator with an open PyAudio handle and the audio config"""
+        self.audio_system = audio_system
+        self.audio_config = audio_config
+        self.candidates = candidates
+        self.seconds = seconds
+
+    def device_name(self):
+        """Returns the name of the input device used by the audio config"""
+        if self.audio_config.device_index is None:
+            info = self.audio_system.get_default_input_device_info()
+        else:
+            info = self.audio_system.get_device_info_by_index(self.audio_config.device_index)
+        return info.get("name")
+
+    def output_device_name(self):
+        """Returns the name of the output device played to, the default one"""
+        try:
+            return self.audio_system.get_default_output_device_info().get("name")
+        except (IOError, OSError):
+            return None
+
+    def measure(self, chunk, output=False):
+        """
+        Opens a capture (or playback) stream with the given buffer size, records the arrival
+        time of every callback and the overflow (or underflow) flags it reports.
+        """
+        config = self.audio_config
+        sample_format = _SAMPLE_FORMAT[config.sample_format]
+        arrivals = []
+        overruns = [0]
+        if output:
+            silence = bytes(chunk * config.channels * pyaudio.get_sample_size(sample_format))
+            overrun_flag = pyaudio.paOutputUnderflow
+        else:
+            silence = None
+            overrun_flag = pyaudio.paInputOverflow
+
+        def _callback(data_in, frame_count, time_info, status_flag):
+            arrivals.append(time.perf_counter())
+            if len(arrivals) > _WARMUP_CALLBACKS and status_flag & overrun_flag:
+                overruns[0] += 1
+            return (silence, pyaudio.paContinue)
+
+        stream_options = dict(format=sample_format,
+                              channels=config.channels,
+                              rate=config.rate,
+                              frames_per_buffer=chunk,
+                              stream_callback=_callback)
+        if output:
+            stream_options["output"] = True
+        else:
+            stream_options["input"] = True
+            stream_options["input_device_index"] = config.device_index
+        try:
+            stream = self.audio_system.open(**stream_options)
+        except (OSError, ValueError):
+            return ChunkMeasurement(chunk, 0, float("inf"), float("inf"), 0, False)
+        try:
+            stream.start_stream()
+            threading.Event().wait(self.seconds)
+            stream.stop_stream()
+        finally:
+            stream.close()
+        return assess_timing(chunk, config.rate, list(arrivals), overruns[0])
+
+    def _smallest_stable(self, output, measurements):
+        """Measures the candidates in increasing order and stops at the first stable one"""
+        for chunk in self.candidates:
+            measurement = self.measure(chunk, output)
+            measurements.append(measurement)
+            if measurement.stable:
+                return chunk
+        return None
+
+    def calibrate(self):
+        """Calibrates capture then playback and returns the CalibrationResult"""
+        result = CalibrationResult(device_name=self.device_name(),
+                                   output_device_name=self.output_device_name())
+        result.capture_chunk = self._smallest_stable(False, result.capture_measurements)
+        result.playback_chunk = self._smallest_stable(True, result.playback_measurements)
+        return result
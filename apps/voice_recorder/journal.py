@@ -0,0 +1,232 @@
+"""
+Implements the capture journal of the voice recorder. While recording, the audio is appended
+to a sequence of fixed-size segment files by a writer thread so that a take survives a crash,
+and interrupted sessions are turned back into wav files on the next startup.
+"""
+import json
+import os
+import os.path
+import queue
+import shutil
+import threading
+import time
+import uuid
+import wave
+
+import numpy as np
+
+# name of the journal directory inside the recordings directory
+JOURNAL_DIR = ".journal"
+# directory of the journal the sessions that cannot be recovered are moved to
+BROKEN_DIR = "broken"
+_INDEX_FILE = "index.json"
+_SEGMENT_NAME = "seg_{:06d}.raw"
+
+# bytes written between two fsyncs, and the longest time data may stay unsynced
+_SYNC_BYTES = 1 << 20
+_SYNC_SECONDS = 0.5
+
+# bytes copied at a time when recovering a session
+_RECOVERY_BLOCK = 1 << 22
+
+_SAMPLE_WIDTHS = {
+    "int16": 2,
+    "int32": 4,
+    "float32": 4
+}
+
+
+class CaptureJournal:
+    """
+    An append-only journal for one recording session.
+    - append(data): hands a captured chunk to the writer thread, never blocks
+    - close(): writes what is left, syncs it and stops the writer thread
+    - discard(): deletes the session once its take has been saved or thrown away
+    - failed: set when the writer hit an error, after which nothing more is journaled
+    """
+    def __init__(self, journal_root, audio_config, segment_bytes=1 << 24):
+        """Creates the session directory and its index, and starts the writer thread"""
+        self.channels = audio_config.channels
+        self.rate = audio_config.rate
+        self.sample_format = audio_config.sample_format
+        frame_bytes = self.channels * _SAMPLE_WIDTHS[self.sample_format]
+        # segments always hold whole frames so every segment can be read on its own
+        self.segment_bytes = max(frame_bytes, segment_bytes // frame_bytes * frame_bytes)
+
+        self.session_dir = os.path.join(journal_root,
+                                        time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8])
+        os.makedirs(self.session_dir)
+        index = {
+            "channels": self.channels,
+            "rate": self.rate,
+            "sample_format": self.sample_format,
+            "segment_bytes": self.segment_bytes
+        }
+        # written under another name first, so a crash never leaves a partial index behind
+        index_path = os.path.join(self.session_dir, _INDEX_FILE)
+        temp_path = index_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, index_path)
+
+        self.chunks = queue.SimpleQueue()
+        self.failed = False
+        self.segment_number = 0
+        self.segment_file = None
+        self.segment_used = 0
+        self.writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer.start()
+
+    def append(self, data):
+        """Queues a chunk of captured bytes. Safe to call from the audio callback"""
+        if not self.failed:
+            self.chunks.put(data)
+
+    def close(self):
+        """Flushes the queued chunks to disk and stops the writer thread"""
+        if self.writer is None:
+            return
+        self.chunks.put(None)
+        self.writer.join()
+        self.writer = None
+
+    def discard(self):
+        """Stops the journal and deletes its session directory"""
+        self.close()
+        shutil.rmtree(self.session_dir, ignore_errors=True)
+
+    def _open_next_segment(self):
+        """Syncs and closes the current segment and opens the next one"""
+        if self.segment_file is not None:
+            self._sync()
+            self.segment_file.close()
+        path = os.path.join(self.session_dir, _SEGMENT_NAME.format(self.segment_number))
+        self.segment_number += 1
+        self.segment_file = open(path, "wb")
+        self.segment_used = 0
+
+    def _sync(self):
+        """Pushes the written bytes of the current segment to the disk"""
+        self.segment_file.flush()
+        os.fsync(self.segment_file.fileno())
+
+    def _writer_loop(self):
+        """
+        Runs the writer thread. An error such as a full disk ends the journal rather than the
+        recording: it is reported once and the chunks stop being queued.
+        """
+        try:
+            self._write_chunks()
+        except OSError as e:
+            print("Journal error: " + str(e) + ", the take is no longer journaled")
+            self.failed = True
+            if self.segment_file is not None:
+                try:
+                    self.segment_file.close()
+                except OSError:
+                    pass
+                self.segment_file = None
+
+    def _write_chunks(self):
+        """
+        Writes the queued chunks into the segments, rolling over to a new segment when one is
+        full and syncing in batches of _SYNC_BYTES or _SYNC_SECONDS, whichever comes first.
+        """
+        self._open_next_segment()
+        unsynced = 0
+        last_sync = time.monotonic()
+        while True:
+            try:
+                data = self.chunks.get(timeout=_SYNC_SECONDS)
+            except queue.Empty:
+                data = b""
+            if data is None:
+                break
+            view = memoryview(data)
+            while view:
+                if self.segment_used == self.segment_bytes:
+                    self._open_next_segment()
+                    unsynced = 0
+                    last_sync = time.monotonic()
+                room = self.segment_bytes - self.segment_used
+                self.segment_file.write(view[:room])
+                written = min(room, len(view))
+                self.segment_used += written
+                unsynced += written
+                view = view[written:]
+            if unsynced and (unsynced >= _SYNC_BYTES
+                             or time.monotonic() - last_sync >= _SYNC_SECONDS):
+                self._sync()
+                unsynced = 0
+                last_sync = time.monotonic()
+        self._sync()
+        self.segment_file.close()
+        self.segment_file = None
+
+
+def interrupted_sessions(journal_root):
+    """Returns the session directories left in the journal, oldest first"""
+    if not os.path.isdir(journal_root):
+        return []
+    sessions = []
+    for name in sorted(os.listdir(journal_root)):
+        path = os.path.join(journal_root, name)
+        if os.path.isfile(os.path.join(path, _INDEX_FILE)):
+            sessions.append(path)
+    return sessions
+
+
+def quarantine_session(session_dir):
+    """
+    Moves a session that cannot be recovered to the broken directory of the journal, where
+    it is kept for inspection but no longer retried
+    """
+    broken_dir = os.path.join(os.path.dirname(session_dir), BROKEN_DIR)
+    try:
+        os.makedirs(broken_dir, exist_ok=True)
+        os.replace(session_dir, os.path.join(broken_dir, os.path.basename(session_dir)))
+    except OSError as e:
+        print("Journal error: " + str(e))
+
+
+def recover_session(session_dir, wav_path):
+    """
+    Rebuilds a wav file from the segments of an interrupted session in one streaming pass,
+    then deletes the session. Integer formats are copied as they are and float32 is converted
+    to int16 like save_wav() does. A partial frame at the end of the journal is dropped.
+    Returns the number of frames recovered.
+    """
+    with open(os.path.join(session_dir, _INDEX_FILE), "r") as f:
+        index = json.load(f)
+    channels = index["channels"]
+    sample_format = index["sample_format"]
+    sample_width = _SAMPLE_WIDTHS[sample_format]
+    frame_bytes = channels * sample_width
+    segments = sorted(name for name in os.listdir(session_dir) if name.startswith("seg_"))
+
+    frames_written = 0
+    carry = b""
+    with wave.open(wav_path, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2 if sample_format == "float32" else sample_width)
+        wf.setframerate(index["rate"])
+        for name in segments:
+            with open(os.path.join(session_dir, name), "rb") as segment:
+                while True:
+                    block = segment.read(_RECOVERY_BLOCK)
+                    if not block:
+                        break
+                    if carry:
+                        block = carry + block
+                    usable = len(block) - len(block) % frame_bytes
+                    carry = block[usable:]
+                    block = block[:usable]
+                    if sample_format == "float32":
+                        samples = np.clip(np.frombuffer(block, np.float32), -1.0, 1.0)
+                        block = np.round(samples * 32767.0).astype(np.int16).tobytes()
+                    wf.writeframesraw(block)
+                    frames_written += usable // frame_bytes
+    shutil.rmtree(session_dir, ignore_errors=True)
+    return frames_written
@@ -0,0 +1,324 @@
+"""
+Implements the recordings library of the voice recorder: a metadata index of the takes in the
+recordings directory, cached in a sidecar store and refreshed in a background process pool.
+"""
+import json
+import math
+import os
+import os.path
+import wave
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import numpy as np
+
+# name of the sidecar directory holding the index and the peak pyramids
+_SIDECAR_DIR = ".library"
+_INDEX_FILE = "index.json"
+_INDEX_VERSION = 1
+
+# frames read from a wav file at a time
+_READ_BLOCK_FRAMES = 1 << 16
+
+# frames summarized by one value of the finest peak pyramid level, and reduction between levels
+_PYRAMID_BIN = 256
+_PYRAMID_FACTOR = 4
+
+# loudness is measured on 400 ms blocks overlapping by 75%, built from 100 ms segments (BS.1770)
+_SEGMENT_MS = 100
+_SEGMENTS_PER_BLOCK = 4
+
+_WIDTH_DTYPES = {
+    1: np.uint8,
+    2: np.int16,
+    4: np.int32
+}
+
+
+@dataclass
+class TakeMetadata:
+    """Holds what the library knows about one take"""
+    name: str
+    size: int
+    mtime: float
+    duration: float = 0.0
+    channels: int = 0
+    rate: int = 0
+    peak: float = 0.0
+    rms: float = 0.0
+    lufs: float = -math.inf
+    pyramid_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _biquad_power(b, a, w):
+    """Returns |H(e^jw)|^2 of a biquad for the angular frequencies w"""
+    z = np.exp(-1j * w)
+    numerator = b[0] + b[1] * z + b[2] * z * z
+    denominator = a[0] + a[1] * z + a[2] * z * z
+    return np.abs(numerator) ** 2 / np.abs(denominator) ** 2
+
+
+def k_weighting_power(rate, n_fft):
+    """
+    Returns the power response of the BS.1770 K-weighting filter (high shelf followed by
+    the RLB high pass) at the rfft bins of an n_fft long segment.
+    """
+    w = 2.0 * np.pi * np.fft.rfftfreq(n_fft, 1.0 / rate) / rate
+
+    # stage 1: high shelf
+    gain_db, q, fc = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+    big_a = 10.0 ** (gain_db / 40.0)
+    w0 = 2.0 * np.pi * fc / rate
+    alpha = np.sin(w0) / (2.0 * q)
+    cos_w0 = np.cos(w0)
+    sqrt_a = np.sqrt(big_a)
+    shelf_b = (big_a * ((big_a + 1) + (big_a - 1) * cos_w0 + 2 * sqrt_a * alpha),
+               -2 * big_a * ((big_a - 1) + (big_a + 1) * cos_w0),
+               big_a * ((big_a + 1) + (big_a - 1) * cos_w0 - 2 * sqrt_a * alpha))
+    shelf_a = ((big_a + 1) - (big_a - 1) * cos_w0 + 2 * sqrt_a * alpha,
+               2 * ((big_a - 1) - (big_a + 1) * cos_w0),
+               (big_a + 1) - (big_a - 1) * cos_w0 - 2 * sqrt_a * alpha)
+
+    # stage 2: high pass
+    q, fc = 0.5003270373238773, 38.13547087602444
+    w0 = 2.0 * np.pi * fc / rate
+    alpha = np.sin(w0) / (2.0 * q)
+    cos_w0 = np.cos(w0)
+    high_pass_b = ((1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2)
+    high_pass_a = (1 + alpha, -2 * cos_w0, 1 - alpha)
+
+    return _biquad_power(shelf_b, shelf_a, w) * _biquad_power(high_pass_b, high_pass_a, w)
+
+
+def gated_loudness(segment_powers):
+    """
+    Computes the integrated loudness in LUFS from the K-weighted mean square of each 100 ms
+    segment, summed over channels. Applies the absolute (-70 LUFS) and relative (-10 LU) gates.
+    """
+    if len(segment_powers) < _SEGMENTS_PER_BLOCK:
+        blocks = np.array([np.mean(segment_powers)]) if len(segment_powers) else np.empty(0)
+    else:
+        window = np.ones(_SEGMENTS_PER_BLOCK) / _SEGMENTS_PER_BLOCK
+        blocks = np.convolve(segment_powers, window, mode="valid")
+    if blocks.size == 0:
+        return -math.inf
+    block_loudness = -0.691 + 10.0 * np.log10(blocks + 1e-20)
+    blocks = blocks[block_loudness > -70.0]
+    if blocks.size == 0:
+        return -math.inf
+    relative_gate = -0.691 + 10.0 * np.log10(np.mean(blocks)) - 10.0
+    block_loudness = -0.691 + 10.0 * np.log10(blocks)
+    blocks = blocks[block_loudness > relative_gate]
+    if blocks.size == 0:
+        return -math.inf
+    return float(-0.691 + 10.0 * np.log10(np.mean(blocks)))
+
+
+def _decode(raw, sample_width, channels):
+    """Decodes the raw bytes of a wav file into float32 samples of shape (n, channels)"""
+    if sample_width == 3:
+        as_bytes = np.frombuffer(raw, np.uint8).reshape(-1, 3)
+        widened = np.zeros((as_bytes.shape[0], 4), np.uint8)
+        widened[:, 1:] = as_bytes
+        samples = widened.view("<i4").reshape(-1).astype(np.float32) / 2147483648.0
+    else:
+        samples = np.frombuffer(raw, _WIDTH_DTYPES[sample_width]).astype(np.float32)
+        if sample_width == 1:
+            samples = (samples - 128.0) / 128.0
+        else:
+            samples /= float(1 << (8 * sample_width - 1))
+    return samples.reshape(-1, channels)
+
+
+def analyze_take(path, pyramid_path):
+    """
+    Reads a wav file once, block by block, and returns a TakeMetadata with its duration,
+    format, sample peak, RMS and integrated loudness. The peak pyramid (max absolute value
+    per bin, one array per level) is written to pyramid_path as a .npz file.
+    Runs in the worker processes of the library, so it only takes and returns plain data.
+    Returns None when the take disappeared before it could be read.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    metadata = TakeMetadata(name=os.path.basename(path), size=stat.st_size, mtime=stat.st_mtime)
+    try:
+        with wave.open(path, "rb") as wf:
+            channels = wf.getnchannels()
+            rate = wf.getframerate()
+            sample_width = wf.getsampwidth()
+            total_frames = wf.getnframes()
+
+            segment_frames = max(1, rate * _SEGMENT_MS // 1000)
+            k_weights = k_weighting_power(rate, segment_frames)
+            read_frames = max(segment_frames, _READ_BLOCK_FRAMES // segment_frames * segment_frames)
+
+            peak = 0.0
+            sum_squares = 0.0
+            segment_powers = []
+            finest_level = []
+            # samples of an unfinished loudness segment and magnitudes of an unfinished bin,
+            # carried over to the next block
+            segment_rest = np.empty((0, channels), np.float32)
+            bin_rest = np.empty(0, np.float32)
+            while True:
+                raw = wf.readframes(read_frames)
+                if not raw:
+                    break
+                samples = _decode(raw, sample_width, channels)
+                if samples.size == 0:
+                    continue
+                magnitudes = np.abs(samples).max(axis=1)
+                peak = max(peak, float(magnitudes.max()))
+                sum_squares += float(np.einsum("ij,ij->", samples, samples, dtype=np.float64))
+
+                samples = np.concatenate((segment_rest, samples))
+                whole_segments = samples.shape[0] // segment_frames
+                if whole_segments:
+                    segments = samples[:whole_segments * segment_frames]
+                    segments = segments.reshape(whole_segments, segment_frames, channels)
+                    power = np.abs(np.fft.rfft(segments, axis=1)) ** 2
+                    power *= k_weights[None, :, None]
+                    # Parseval: the bins other than DC (and Nyquist) stand for two bins
+                    power[:, 1:(segment_frames + 1) // 2] *= 2.0
+                    segment_powers.append(power.sum(axis=(1, 2)) / (segment_frames ** 2))
+                segment_rest = samples[whole_segments * segment_frames:]
+
+                magnitudes = np.concatenate((bin_rest, magnitudes))
+                whole_bins = magnitudes.size // _PYRAMID_BIN
+                if whole_bins:
+                    binned = magnitudes[:whole_bins * _PYRAMID_BIN].reshape(whole_bins, _PYRAMID_BIN)
+                    finest_level.append(binned.max(axis=1))
+                bin_rest = magnitudes[whole_bins * _PYRAMID_BIN:]
+            if bin_rest.size:
+                finest_level.append(bin_rest.max(keepdims=True))
+    except (OSError, wave.Error, EOFError, KeyError, ValueError) as e:
+        metadata.error = str(e)
+        return metadata
+
+    metadata.channels = channels
+    metadata.rate = rate
+    metadata.duration = total_frames / rate if rate else 0.0
+    metadata.peak = peak
+    sample_count = total_frames * channels
+    metadata.rms = math.sqrt(sum_squares / sample_count) if sample_count else 0.0
+    powers = np.concatenate(segment_powers) if segment_powers else np.empty(0)
+    metadata.lufs = gated_loudness(powers)
+
+    levels = [np.concatenate(finest_level).astype(np.float16)
+              if finest_level else np.empty(0, np.float16)]
+    while levels[-1].size > 1:
+        level = levels[-1]
+        padding = (-level.size) % _PYRAMID_FACTOR
+        if padding:
+            level = np.concatenate((level, np.zeros(padding, level.dtype)))
+        levels.append(level.reshape(-1, _PYRAMID_FACTOR).max(axis=1))
+    try:
+        np.savez(pyramid_path, *levels)
+    except OSError as e:
+        # the metadata is still good, the waveform is just not cached
+        print("Could not save the peaks of " + metadata.name + ": " + str(e))
+        return metadata
+    metadata.pyramid_path = pyramid_path
+    return metadata
+
+
+class RecordingsLibrary:
+    """
+    A metadata index over the takes in a recordings directory.
+    - load(): reads the cached index from the sidecar store, without touching any wav file
+    - stale_takes(): lists the takes that are new or whose mtime/size changed
+    - refresh(executor): analyzes the stale takes in the caller's process pool, one future
+      per take
+    - apply(metadata) / save(): records a result and persists the index
+    """
+    def __init__(self, recordings_dir):
+        """Initializes the library for the given recordings directory"""
+        self.recordings_dir = recordings_dir
+        self.sidecar_dir = os.path.join(recordings_dir, _SIDECAR_DIR)
+        self.index_path = os.path.join(self.sidecar_dir, _INDEX_FILE)
+        self.entries = {}
+
+    def load(self):
+        """Loads the cached index. A missing or unreadable index starts an empty library"""
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+            return self.entries
+        if data.get("version") != _INDEX_VERSION:
+            self.entries = {}
+            return self.entries
+        self.entries = {name: TakeMetadata(**fields) for name, fields in data["takes"].items()}
+        return self.entries
+
+    def save(self):
+        """Writes the index atomically so an interrupted save never corrupts the cache"""
+        os.makedirs(self.sidecar_dir, exist_ok=True)
+        data = {
+            "version": _INDEX_VERSION,
+            "takes": {name: asdict(metadata) for name, metadata in self.entries.items()}
+        }
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.index_path)
+
+    def stale_takes(self):
+        """
+        Scans the recordings directory and returns the paths of the takes that are not in the
+        index or changed since they were indexed. Takes that disappeared are dropped.
+        """
+        if not os.path.isdir(self.recordings_dir):
+            self.entries = {}
+            return []
+        stale = []
+        seen = set()
+        with os.scandir(self.recordings_dir) as it:
+            for entry in it:
+                if not (entry.is_file() and entry.name.endswith(".wav")):
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                cached = self.entries.get(entry.name)
+                if (cached is None or cached.size != stat.st_size
+                        or cached.mtime != stat.st_mtime):
+                    stale.append(entry.path)
+        for name in list(self.entries):
+            if name not in seen:
+                self._drop_pyramid(self.entries.pop(name))
+        return stale
+
+    def refresh(self, executor):
+        """
+        Submits every stale take to the executor (a ProcessPoolExecutor, owned by the caller)
+        and returns the list of futures, each resolving to a TakeMetadata to be passed to
+        apply(), or None for a take that disappeared in the meantime.
+        """
+        stale = self.stale_takes()
+        if not stale:
+            return []
+        os.makedirs(self.sidecar_dir, exist_ok=True)
+        futures = []
+        for path in stale:
+            name = os.path.basename(path)
+            pyramid_path = os.path.join(self.sidecar_dir, name[:-4] + ".peaks.npz")
+            futures.append(executor.submit(analyze_take, path, pyramid_path))
+        return futures
+
+    def apply(self, metadata):
+        """Records the metadata of an analyzed take"""
+        self.entries[metadata.name] = metadata
+
+    def sorted_entries(self):
+        """Returns the entries ordered by name"""
+        return [self.entries[name] for name in sorted(self.entries)]
+
+    @staticmethod
+    def _drop_pyramid(metadata):
+        """Removes the peak pyramid of a take that is no longer in the directory"""
+        if metadata.pyramid_path and os.path.exists(metadata.pyramid_path):
+            os.remove(metadata.pyramid_path)
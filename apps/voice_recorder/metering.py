@@ -0,0 +1,78 @@
+"""
+Implements the per-channel peak metering of the voice recorder: sample peaks and true peaks
+estimated by oversampling the signal with a polyphase FIR interpolator (BS.1770 style).
+"""
+import numpy as np
+
+# sample peaks at or above this value are treated as clipped
+SAMPLE_CLIP_LEVEL = 0.999
+
+# true peaks above full scale mean the converter will clip between samples
+TRUE_PEAK_CLIP_LEVEL = 1.0
+
+
+def polyphase_interpolator(factor=4, taps_per_phase=12, beta=8.0):
+    """
+    Designs a windowed-sinc low pass for oversampling by factor and splits it into its
+    phases. Returns an array of shape (factor, taps_per_phase), each row reversed so it can
+    be applied directly to a window of past samples, oldest first.
+    """
+    length = factor * taps_per_phase
+    n = np.arange(length) - (length - 1) / 2.0
+    prototype = np.sinc(n / factor) * np.kaiser(length, beta)
+    phases = prototype.reshape(taps_per_phase, factor).T
+    # every phase passes DC with unity gain
+    phases = phases / phases.sum(axis=1, keepdims=True)
+    return np.ascontiguousarray(phases[:, ::-1], dtype=np.float32)
+
+
+class TruePeakMeter:
+    """
+    Keeps the per-channel sample peak and true peak of the audio fed to it since the last read.
+    - process(samples): feeds a block of float32 samples of shape (n, channels)
+    - read(): returns (sample_peaks, true_peaks) as arrays and starts a new measurement
+    The filter history is carried over between blocks so that blocks can be of any size.
+    """
+    def __init__(self, channels, factor=4, taps_per_phase=12):
+        """Initializes the meter for the given number of channels"""
+        self.channels = channels
+        self.phases = polyphase_interpolator(factor, taps_per_phase)
+        self.taps = taps_per_phase
+        self.history = np.zeros((taps_per_phase - 1, channels), dtype=np.float32)
+        self.sample_peaks = np.zeros(channels, dtype=np.float32)
+        self.true_peaks = np.zeros(channels, dtype=np.float32)
+
+    def reset(self):
+        """Forgets the filter history and the peaks"""
+        self.history.fill(0.0)
+        self.sample_peaks.fill(0.0)
+        self.true_peaks.fill(0.0)
+
+    def process(self, samples):
+        """Updates the peaks with a block of samples"""
+        if samples.shape[0] == 0:
+            return
+        np.maximum(self.sample_peaks, np.abs(samples).max(axis=0), out=self.sample_peaks)
+
+        extended = np.concatenate((self.history, samples.astype(np.float32, copy=False)))
+        # windows of shape (n, channels, taps), oldest sample first
+        windows = np.lib.stride_tricks.sliding_window_view(extended, self.taps, axis=0)
+        oversampled = np.einsum("nck,pk->npc", windows, self.phases, optimize=True)
+        block_true_peaks = np.abs(oversampled).max(axis=(0, 1))
+        np.maximum(self.true_peaks, block_true_peaks, out=self.true_peaks)
+        # a true peak can never be below the sample peak
+        np.maximum(self.true_peaks, self.sample_peaks, out=self.true_peaks)
+
+        self.history = extended[-(self.taps - 1):].copy()
+
+    def read(self):
+        """Returns the peaks measured since the last read and resets them"""
+        sample_peaks = self.sample_peaks.copy()
+        true_peaks = self.true_peaks.copy()
+        self.sample_peaks.fill(0.0)
+        self.true_peaks.fill(0.0)
+        return (sample_peaks, true_peaks)
+
+    def clipping(self, sample_peaks, true_peaks):
+        """Returns one bool per channel, True when the channel clipped"""
+        return ((sample_peaks >= SAMPLE_CLIP_LEVEL) | (true_peaks > TRUE_PEAK_CLIP_LEVEL)).tolist()
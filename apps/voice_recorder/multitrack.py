@@ -0,0 +1,99 @@
+"""
+Implements the multi-device capture of the voice recorder: one stream per input device, each
+with its own callback and buffer, and the clock drift compensation that aligns the tracks.
+"""
+import threading
+import time
+
+import numpy as np
+import pyaudio
+
+# callbacks needed before the clock of a device is fitted, below that the nominal rate is used
+_MIN_FIT_POINTS = 8
+
+
+class DeviceTrack:
+    """
+    The capture state of one input device.
+    - callback: the PortAudio callback of the device's stream, only touches this track
+    - clock_fit(): estimates the device's actual sample rate and the time of its first frame
+    """
+    def __init__(self, device_index, name, channels, rate, listeners=()):
+        """
+        Initializes an empty track for the device. The listeners are called with every
+        captured buffer and the track, from the PortAudio thread
+        """
+        self.device_index = device_index
+        self.name = name
+        self.channels = channels
+        self.rate = rate
+        self.stream = None
+        self.listeners = listeners
+
+        # each track has its own lock so a slow device never waits on another one
+        self.lock = threading.Lock()
+        self.frames = []
+        self.frame_count = 0
+
+        # (arrival time of a buffer, frames captured up to the end of that buffer). The times
+        # come from time.perf_counter(), the one clock all the tracks share: the adc times
+        # PortAudio reports are per device and cannot be compared between devices
+        self.timestamps = []
+
+    def callback(self, data_in, frame_count, time_info, status_flag):
+        """Stores the captured buffer and when it arrived"""
+        arrival = time.perf_counter()
+        with self.lock:
+            self.frames.append(data_in)
+            self.frame_count += frame_count
+            self.timestamps.append((arrival, self.frame_count))
+        for listener in self.listeners:
+            listener(data_in, self)
+        return (None, pyaudio.paContinue)
+
+    def clock_fit(self):
+        """
+        Fits time = start + frames / measured_rate over the recorded timestamps by least squares,
+        which averages out the jitter of individual callbacks. start is when the first frame
+        was captured, plus the latency of the device. Returns (start, measured_rate).
+        """
+        with self.lock:
+            timestamps = np.array(self.timestamps, dtype=np.float64)
+        if len(timestamps) < _MIN_FIT_POINTS:
+            start = timestamps[0, 0] - timestamps[0, 1] / self.rate if len(timestamps) else 0.0
+            return (float(start), float(self.rate))
+        seconds_per_frame, start = np.polyfit(timestamps[:, 1], timestamps[:, 0], 1)
+        if seconds_per_frame <= 0:
+            return (float(timestamps[0, 0] - timestamps[0, 1] / self.rate), float(self.rate))
+        return (float(start), 1.0 / seconds_per_frame)
+
+
+def align_tracks(tracks_samples, clock_fits, rate):
+    """
+    Resamples every track onto a common timeline at the nominal rate, from the latest start to
+    the earliest end among the tracks, compensating each device's clock drift.
+    tracks_samples holds one float32 array of shape (n, channels) per track and clock_fits the
+    matching (start, measured_rate) pairs. Returns the aligned arrays, all of the same length.
+    """
+    starts = [start for start, _ in clock_fits]
+    ends = [start + samples.shape[0] / measured_rate
+            for samples, (start, measured_rate) in zip(tracks_samples, clock_fits)]
+    common_start = max(starts)
+    length = max(0, int((min(ends) - common_start) * rate))
+    output_times = common_start + np.arange(length, dtype=np.float64) / rate
+
+    aligned = []
+    for samples, (start, measured_rate) in zip(tracks_samples, clock_fits):
+        # position of each output sample in the track, in (fractional) source frames
+        positions = (output_times - start) * measured_rate
+        source_frames = np.arange(samples.shape[0], dtype=np.float64)
+        track = np.empty((length, samples.shape[1]), dtype=np.float32)
+        for channel in range(samples.shape[1]):
+            track[:, channel] = np.interp(positions, source_frames, samples[:, channel])
+        aligned.append(track)
+    return aligned
+
+
+def drift_ppm(measured_rate, rate):
+    """Returns how far a device's clock is from the nominal rate, in parts per million"""
+    return (measured_rate / rate - 1.0) * 1e6
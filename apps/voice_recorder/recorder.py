@@ -2,14 +2,22 @@
 Implements the recorder logic for the voice recorder
 """
 import os.path
+import queue
 import re
 import threading
 import wave
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from typing import Optional
 
 import numpy as np
 import pyaudio
+import yaml
+
+from apps.voice_recorder.journal import (JOURNAL_DIR, CaptureJournal, interrupted_sessions,
+                                         quarantine_session, recover_session)
+from apps.voice_recorder.stretch import MAX_SPEED, MIN_SPEED, WSOLAStretcher
+from apps.voice_recorder.multitrack import DeviceTrack, align_tracks, drift_ppm
+from apps.voice_recorder.vad import VADEvent, VoiceActivityDetector
 
 # Global variables for the formats and numpy array types for decoding
 _SAMPLE_FORMAT = {
@@ -24,6 +32,47 @@ _NP_DTYPES = {
     "float32": np.float32
 }
 
+# file next to config.yaml where the calibration keeps the chunk sizes of each device
+DEVICE_CHUNKS_FILE = "device_chunks.yaml"
+
+# full scale values used to normalize the integer formats to [-1, 1]
+_NP_SCALES = {
+    "int16": 32768.0,
+    "int32": 2147483648.0
+}
+
+
+def to_float32(raw_data, sample_format, channels):
+    """
+    Decodes raw interleaved bytes into a float32 array in [-1, 1] of shape (n, channels).
+    Trailing bytes that do not make up a full frame are dropped.
+    """
+    if sample_format not in _NP_DTYPES:
+        raise ValueError("Unsupported Format")
+    if not raw_data:
+        return np.empty((0, channels), dtype=np.float32)
+    dtype = _NP_DTYPES[sample_format]
+    frame_bytes = channels * np.dtype(dtype).itemsize
+    remainder_sample = len(raw_data) % frame_bytes
+    if remainder_sample != 0:
+        raw_data = raw_data[:-remainder_sample]
+    numpy_arr = np.frombuffer(raw_data, dtype)
+    if sample_format != "float32":
+        numpy_arr = numpy_arr.astype(np.float32) / _NP_SCALES[sample_format]
+    return numpy_arr.reshape(-1, channels)
+
+
+def from_float32(samples, sample_format):
+    """
+    Encodes float32 samples in [-1, 1] back into the raw bytes of the given sample format.
+    """
+    if sample_format == "float32":
+        return np.ascontiguousarray(samples, dtype=np.float32).tobytes()
+    scale = _NP_SCALES[sample_format] - 1.0
+    encoded = np.round(np.clip(samples, -1.0, 1.0) * scale).astype(_NP_DTYPES[sample_format])
+    return encoded.tobytes()
+
+
 @dataclass
 class AudioConfig:
     """Holds the parameters necessary for the audio file to be processed"""
@@ -32,9 +81,93 @@ class AudioConfig:
     chunk: int = 1024
     sample_format: str = "int16"
     device_index: Optional[int] = None
+    device_indices: Optional[list] = None
     output_dir: str = "recordings"
     default_filename_prefix: str = "take"
     auto_increment: bool = True
+    journal_enabled: bool = True
+    journal_segment_mb: int = 16
+    playback_chunk: Optional[int] = None
+    playback_speed: float = 1.0
+    device_chunks: dict = field(default_factory=dict)
+    vad_enabled: bool = False
+    vad_energy_threshold_db: float = -45.0
+    vad_zcr_max: float = 0.35
+    vad_hang_ms: int = 600
+    vad_pre_roll_ms: int = 200
+
+
+def device_chunks_path(config_path):
+    """Returns the path of the calibrated chunk sizes kept next to a config.yaml file"""
+    return os.path.join(os.path.dirname(config_path), DEVICE_CHUNKS_FILE)
+
+
+def _load_device_chunks(path):
+    """Returns the device name -> chunk sizes mapping of a device_chunks.yaml file"""
+    try:
+        with open(path, "r") as file:
+            device_chunks = yaml.safe_load(file) or {}
+    except FileNotFoundError:
+        return {}
+    if not isinstance(device_chunks, dict):
+        raise yaml.YAMLError(path + " should map device names to chunk sizes")
+    return device_chunks
+
+
+def load_audio_config(path):
+    """
+    Builds an AudioConfig from a config.yaml file. Unknown keys are ignored and missing ones
+    keep their defaults, as does everything when the file is missing or invalid. The chunk
+    sizes calibrated for each device are read from device_chunks.yaml next to it.
+    """
+    try:
+        with open(path, "r") as file:
+            data = yaml.safe_load(file) or {}
+    except FileNotFoundError:
+        print("No config.yaml found")
+        return AudioConfig()
+    except yaml.YAMLError as e:
+        print("Yaml error: " + str(e))
+        return AudioConfig()
+    known_keys = {f.name for f in fields(AudioConfig)}
+    config = AudioConfig(**{k: v for k, v in data.items() if k in known_keys})
+    if config.device_chunks is None:
+        config.device_chunks = {}
+    try:
+        calibrated = _load_device_chunks(device_chunks_path(path))
+    except yaml.YAMLError as e:
+        print("Yaml error: " + str(e))
+        calibrated = {}
+    for device_name, chunks in calibrated.items():
+        config.device_chunks.setdefault(device_name, {}).update(chunks or {})
+    return config
+
+
+def save_device_chunks(path, updates):
+    """
+    Merges calibrated chunk sizes into the device_chunks.yaml file next to the config.yaml at
+    path, which is left untouched with its comments. updates maps a device name to the keys to
+    set, "chunk" for an input device and "playback_chunk" for an output device.
+    Returns False if they could not be saved.
+    """
+    chunks_path = device_chunks_path(path)
+    try:
+        device_chunks = _load_device_chunks(chunks_path)
+    except yaml.YAMLError as e:
+        print("Yaml error: " + str(e))
+        return False
+    for device_name, chunks in updates.items():
+        device_chunks.setdefault(device_name, {}).update(chunks)
+    temp_path = chunks_path + ".tmp"
+    try:
+        with open(temp_path, "w") as file:
+            file.write("# Written by the calibration of the voice recorder\n")
+            yaml.safe_dump(device_chunks, file, default_flow_style=False, allow_unicode=True)
+        os.replace(temp_path, chunks_path)
+    except OSError as e:
+        print("Could not save " + chunks_path + ": " + str(e))
+        return False
+    return True
 
 
 class RecordingInSession(Exception):
@@ -116,6 +249,57 @@ class AudioRecorder:
         # enables us to check if the recording is currently paused, stopped or playing
         self.play_status = "stopped"
 
+        # voice activity detector, takes waiting to be written and the thread writing them.
+        # only used while recording with start_vad()
+        self.vad = None
+        self.take_queue = queue.Queue()
+        self.take_writer = None
+        self.saved_takes = []
+
+        # functions called from the PortAudio thread with every captured chunk and its
+        # DeviceTrack (None unless recording with start_multi()), in every recording mode, and
+        # from the playback monitor thread whenever a playback ends. Used by the asyncio facade.
+        self.chunk_listeners = []
+        self.playback_listeners = []
+
+        # time stretcher used when playing at a speed other than 1.0
+        self.stretcher = None
+
+        # crash-safe copy of the take being recorded, kept until the take is saved
+        self.journal = None
+
+        # one track per device when recording several devices with start_multi()
+        self.tracks = []
+
+        self.apply_device_chunks()
+
+    def apply_device_chunks(self):
+        """
+        Uses the calibrated chunk size of the selected input device and the calibrated playback
+        chunk size of the default output device, for those that have been calibrated.
+        """
+        device_chunks = self.audio_config.device_chunks
+        if not device_chunks:
+            return
+        try:
+            if self.audio_config.device_index is None:
+                info = self.audio_system.get_default_input_device_info()
+            else:
+                info = self.audio_system.get_device_info_by_index(self.audio_config.device_index)
+        except (IOError, OSError):
+            info = {}
+        calibrated = device_chunks.get(info.get("name")) or {}
+        if calibrated.get("chunk"):
+            self.audio_config.chunk = int(calibrated["chunk"])
+        # playback always goes to the default output device
+        try:
+            info = self.audio_system.get_default_output_device_info()
+        except (IOError, OSError):
+            info = {}
+        calibrated = device_chunks.get(info.get("name")) or {}
+        if calibrated.get("playback_chunk"):
+            self.audio_config.playback_chunk = int(calibrated["playback_chunk"])
+
     def list_devices_connected(self):
         """
         returns a dictionary of the devices connected with the key = device name and values are the
@@ -147,24 +331,190 @@ class AudioRecorder:
         current_format = _SAMPLE_FORMAT[self.audio_config.sample_format]
         self.frames.clear()
 
+        # the previous take is replaced, so its journal is no longer needed
+        if self.journal is not None:
+            self.journal.discard()
+            self.journal = None
+        if self.audio_config.journal_enabled:
+            try:
+                self.journal = CaptureJournal(os.path.join(self.get_output_dir(), JOURNAL_DIR),
+                                              self.audio_config,
+                                              self.audio_config.journal_segment_mb << 20)
+            except OSError as e:
+                print("Journal error: " + str(e) + ", recording without a journal")
+        journal = self.journal
+
         def _callback(data_in, frame_count, time_info, status_flag):
             if self.running.is_set():
                 with self.lock:
                     self.frames.append(data_in)
+                if journal is not None:
+                    journal.append(data_in)
+                for listener in self.chunk_listeners:
+                    listener(data_in, None)
                 return (None, pyaudio.paContinue)
             else:
                 return (None, pyaudio.paComplete)
 
-        self.in_stream = self.audio_system.open(format=current_format,
-                                                channels=self.audio_config.channels,
-                                                rate=self.audio_config.rate,
-                                                input=True,
-                                                input_device_index=self.audio_config.device_index,
-                                                frames_per_buffer=self.audio_config.chunk,
-                                                stream_callback=_callback)
+        try:
+            self.in_stream = self.audio_system.open(
+                format=current_format,
+                channels=self.audio_config.channels,
+                rate=self.audio_config.rate,
+                input=True,
+                input_device_index=self.audio_config.device_index,
+                frames_per_buffer=self.audio_config.chunk,
+                stream_callback=_callback)
+        except (IOError, OSError):
+            # nothing was recorded, so the session would only be recovered as an empty take
+            if journal is not None:
+                journal.discard()
+                self.journal = None
+            raise
         self.running.set()
         self.in_stream.start_stream()
 
+    def start_vad(self):
+        """
+        Starts recording in voice activated mode. Each utterance detected in the microphone
+        stream is written as its own take using the auto increment naming, and the silence
+        between utterances is never stored. self.frames only holds the utterance in progress.
+        """
+        if self.in_stream is not None:
+            raise RecordingInSession
+
+        config = self.audio_config
+        current_format = _SAMPLE_FORMAT[config.sample_format]
+        self.vad = VoiceActivityDetector(config.rate, config.chunk,
+                                         energy_threshold_db=config.vad_energy_threshold_db,
+                                         zcr_max=config.vad_zcr_max,
+                                         hang_ms=config.vad_hang_ms,
+                                         pre_roll_ms=config.vad_pre_roll_ms)
+        self.frames = self.vad.take
+        self.saved_takes = []
+
+        def _callback(data_in, frame_count, time_info, status_flag):
+            if self.running.is_set():
+                samples = to_float32(data_in, config.sample_format, config.channels)
+                with self.lock:
+                    event = self.vad.push(data_in, samples)
+                    self.frames = self.vad.take
+                if event == VADEvent.STOP:
+                    self.take_queue.put(self.vad.pop_take())
+                for listener in self.chunk_listeners:
+                    listener(data_in, None)
+                return (None, pyaudio.paContinue)
+            else:
+                return (None, pyaudio.paComplete)
+
+        try:
+            self.in_stream = self.audio_system.open(format=current_format,
+                                                    channels=config.channels,
+                                                    rate=config.rate,
+                                                    input=True,
+                                                    input_device_index=config.device_index,
+                                                    frames_per_buffer=config.chunk,
+                                                    stream_callback=_callback)
+        except (IOError, OSError):
+            # a later stop() of a plain recording would otherwise wait for a take writer
+            self.vad = None
+            self.frames = []
+            raise
+        # started once the stream is open, so that a failed open leaves no thread waiting
+        self.take_writer = threading.Thread(target=self._take_writer_loop, daemon=True)
+        self.take_writer.start()
+        self.running.set()
+        self.in_stream.start_stream()
+
+    def start_multi(self, device_indices=None):
+        """
+        Starts recording several input devices at once, each on its own stream with its own
+        callback and buffer so that no device waits on another. The tracks are aligned and
+        saved with save_tracks().
+        """
+        if self.in_stream is not None or any(t.stream is not None for t in self.tracks):
+            raise RecordingInSession
+        if device_indices is None:
+            device_indices = self.audio_config.device_indices
+        config = self.audio_config
+        current_format = _SAMPLE_FORMAT[config.sample_format]
+
+        self.tracks = []
+        try:
+            for device_index in device_indices:
+                info = self.audio_system.get_device_info_by_index(device_index)
+                channels = min(config.channels, int(info.get("maxInputChannels", 1)))
+                track = DeviceTrack(device_index, info.get("name"), channels, config.rate,
+                                    self.chunk_listeners)
+                track.stream = self.audio_system.open(format=current_format,
+                                                      channels=channels,
+                                                      rate=config.rate,
+                                                      input=True,
+                                                      input_device_index=device_index,
+                                                      frames_per_buffer=config.chunk,
+                                                      stream_callback=track.callback,
+                                                      start=False)
+                self.tracks.append(track)
+        except (IOError, OSError):
+            # the streams opened so far would make every later start raise RecordingInSession
+            for track in self.tracks:
+                track.stream.close()
+            self.tracks = []
+            raise
+        self.running.set()
+        for track in self.tracks:
+            track.stream.start_stream()
+
+    def save_tracks(self):
+        """
+        Aligns the tracks of the last multi-device recording on a common timeline, resampling
+        each one to compensate for the drift of its device's clock, and writes one int16 wav per
+        device named after the next take. Returns a list of (path, device name, drift in ppm).
+        """
+        if self.is_recording():
+            raise RecordingInSession()
+        if not self.tracks:
+            raise NoRecordingAvailable
+        config = self.audio_config
+        tracks_samples = []
+        clock_fits = []
+        for track in self.tracks:
+            raw_data = self.get_raw_bytes(track.frames)
+            tracks_samples.append(to_float32(raw_data, config.sample_format, track.channels))
+            clock_fits.append(track.clock_fit())
+        aligned = align_tracks(tracks_samples, clock_fits, config.rate)
+
+        take_name = self.next_take_name()
+        saved = []
+        for number, (track, samples, (_, measured_rate)) in enumerate(
+                zip(self.tracks, aligned, clock_fits), start=1):
+            path = os.path.join(self.get_output_dir(), f"{take_name}_{number}.wav")
+            int16_samples = np.round(np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+            with wave.open(path, "wb") as wf:
+                wf.setnchannels(track.channels)
+                wf.setsampwidth(2)
+                wf.setframerate(config.rate)
+                wf.writeframes(int16_samples.tobytes())
+            saved.append((path, track.name, drift_ppm(measured_rate, config.rate)))
+        return saved
+
+    def _take_writer_loop(self):
+        """
+        Writes the takes handed over by the voice activity detector, off the audio thread.
+        A None in the queue ends the loop.
+        """
+        while True:
+            take = self.take_queue.get()
+            if take is None:
+                break
+            if take:
+                try:
+                    # numbered even without auto increment, an utterance must not replace the last
+                    self.saved_takes.append(self.write_take(take, self.next_take_name()))
+                except Exception as e:
+                    # the next utterances are still saved
+                    print("Take error: " + str(e))
+
     def is_recording(self):
         """
         Checks the thread where the recording is currently being done.
@@ -184,13 +534,31 @@ class AudioRecorder:
         Stops the recording and releases the thread event for when recording is running
          that signifies pyAudio background thread is working
         """
-        if (not self.is_recording()) or (self.in_stream is None):
+        multi_streams = [t for t in self.tracks if t.stream is not None]
+        if (not self.is_recording()) or (self.in_stream is None and not multi_streams):
             return
+        elif multi_streams:
+            self.running.clear()
+            for track in multi_streams:
+                track.stream.stop_stream()
+                track.stream.close()
+                track.stream = None
         else:
             self.running.clear()
             self.in_stream.stop_stream()
             self.in_stream.close()
             self.in_stream = None
+            if self.journal is not None:
+                self.journal.close()
+            if self.vad is not None:
+                with self.lock:
+                    if self.vad.flush():
+                        self.take_queue.put(self.vad.pop_take())
+                    self.frames = []
+                self.take_queue.put(None)
+                self.take_writer.join()
+                self.take_writer = None
+                self.vad = None
 
     def get_raw_bytes(self, frames):
         """
@@ -200,134 +568,123 @@ class AudioRecorder:
             concatenated_chunks = b"".join(frames)
             return concatenated_chunks
 
-    def get_numpy(self):
+    def get_numpy(self, frames=None):
         """
         Convert raw bytes to a float32 array in [-1, 1], because most edits are simpler
         in a normalized float domain.
         format == "int24" not supported
         should be called after stop
         """
-        raw_data = self.get_raw_bytes(self.frames)
-        if not raw_data:
-            return np.empty((0, self.audio_config.channels), dtype=np.float32)
-        current_format = self.audio_config.sample_format
-        if current_format == "int16":
-            if self.audio_config.channels > 1:
-                frame_bytes = self.audio_config.channels * 2
-                remainder_sample = len(raw_data) % frame_bytes
-                if remainder_sample == 0:
-                    numpy_arr = (np.frombuffer(raw_data, _NP_DTYPES[current_format])
-                                 .astype(np.float32) / 32768.0)
-                    numpy_arr_result = numpy_arr.reshape(-1, self.audio_config.channels)
-                    return numpy_arr_result
-                else:
-                    new_raw_data = raw_data[:-remainder_sample]
-                    numpy_arr = (np.frombuffer(new_raw_data, _NP_DTYPES[current_format])
-                                 .astype(np.float32) / 32768.0)
-                    numpy_arr_result = numpy_arr.reshape(-1, self.audio_config.channels)
-                    return numpy_arr_result
-            else:
-                numpy_arr = (np.frombuffer(raw_data, _NP_DTYPES[current_format])
-                             .astype(np.float32) / 32768.0)
-                numpy_arr_result = numpy_arr.reshape(-1, 1)
-                return numpy_arr_result
-
-        elif current_format == "int32":
-            if self.audio_config.channels > 1:
-                frame_bytes = self.audio_config.channels * 4
-                remainder_sample = len(raw_data) % frame_bytes
-                if remainder_sample == 0:
-                    numpy_arr = (np.frombuffer(raw_data, _NP_DTYPES[current_format])
-                                 .astype(np.float32) / 2147483648.0)
-                    numpy_arr_result = numpy_arr.reshape(-1, self.audio_config.channels)
-                    return numpy_arr_result
-                else:
-                    new_raw_data = raw_data[:-remainder_sample]
-                    numpy_arr = (np.frombuffer(new_raw_data, _NP_DTYPES[current_format])
-                                 .astype(np.float32) / 2147483648.0)
-                    numpy_arr_result = numpy_arr.reshape(-1, self.audio_config.channels)
-                    return numpy_arr_result
-            else:
-                numpy_arr = (np.frombuffer(raw_data, _NP_DTYPES[current_format])
-                             .astype(np.float32) / 2147483648.0)
-                numpy_arr_result = numpy_arr.reshape(-1, 1)
-                return numpy_arr_result
-
-        elif current_format == 'float32':
-            if self.audio_config.channels > 1:
-                frame_bytes = self.audio_config.channels * 4
-                remainder_sample = len(raw_data) % frame_bytes
-                if remainder_sample == 0:
-                    numpy_arr = np.frombuffer(raw_data, _NP_DTYPES[current_format])
-                    numpy_arr_result = numpy_arr.reshape(-1, self.audio_config.channels)
-                    return numpy_arr_result
-                else:
-                    new_raw_data = raw_data[:-remainder_sample]
-                    numpy_arr = np.frombuffer(new_raw_data, _NP_DTYPES[current_format])
-                    numpy_arr_result = numpy_arr.reshape(-1, self.audio_config.channels)
-                    return numpy_arr_result
-            else:
-                numpy_arr = np.frombuffer(raw_data, _NP_DTYPES[current_format])
-                numpy_arr_result = numpy_arr.reshape(-1, 1)
-                return numpy_arr_result
-        else:
-            raise ValueError("Unsupported Format")
+        if frames is None:
+            frames = self.frames
+        raw_data = self.get_raw_bytes(frames)
+        return to_float32(raw_data, self.audio_config.sample_format, self.audio_config.channels)
 
     def save_wav(self, wav_name=None):
         """
         Saves the audio recording to a wav file. File can be played.
         """
+        if self.is_recording():
+            raise RecordingInSession()
+        path = self.write_take(self.frames, wav_name)
+        if self.journal is not None:
+            self.journal.discard()
+            self.journal = None
+        return path
+
+    def get_output_dir(self):
+        """Returns the absolute path of the directory the takes are saved in"""
+        current_wd = os.path.dirname(os.path.abspath(__file__))
+        return os.path.join(current_wd, self.audio_config.output_dir)
+
+    def list_interrupted(self):
+        """Returns the journal sessions left behind by a crash, oldest first"""
+        journal_root = os.path.join(self.get_output_dir(), JOURNAL_DIR)
+        return [session_dir for session_dir in interrupted_sessions(journal_root)
+                if self.journal is None or session_dir != self.journal.session_dir]
+
+    def recover_interrupted(self, session_dirs=None):
+        """
+        Turns the journal sessions left behind by a crash (all of them by default) into wav
+        files named after the session, in the output directory. A session that cannot be read
+        is reported and quarantined rather than retried on every startup. Returns the paths of
+        the recovered takes.
+        """
+        if session_dirs is None:
+            session_dirs = self.list_interrupted()
+        output_dir = self.get_output_dir()
+        recovered = []
+        for session_dir in session_dirs:
+            wav_path = os.path.join(output_dir,
+                                    "recovered_" + os.path.basename(session_dir) + ".wav")
+            try:
+                recover_session(session_dir, wav_path)
+            except (OSError, ValueError, KeyError, TypeError, wave.Error) as e:
+                print("Journal error: " + os.path.basename(session_dir) + ": " + str(e))
+                quarantine_session(session_dir)
+                try:
+                    os.remove(wav_path)
+                except OSError:
+                    pass
+                continue
+            recovered.append(wav_path)
+        return recovered
+
+    def next_take_name(self):
+        """
+        Returns the auto increment name of the next take, without extension: the prefix of the
+        audio config followed by one more than the highest number found in the output directory.
+        """
+        recordings_dir = self.get_output_dir()
+        if not os.path.isdir(recordings_dir):
+            os.mkdir(recordings_dir)
+        files = os.listdir(recordings_dir)
+        max_number = 0
+        for f in files:
+            if (f.endswith(".wav") and f.startswith(f"{self.audio_config.default_filename_prefix}_")):
+                match = re.search(rf'(?<={re.escape(self.audio_config.default_filename_prefix)}_)\d+', f)
+                if match:
+                    extracted_part = match.group(0)
+                    max_number = max(int(extracted_part), max_number)
+
+        left_padded_filenumber = str(max_number + 1).zfill(3)
+        return self.audio_config.default_filename_prefix + "_" + left_padded_filenumber
+
+    def write_take(self, frames, wav_name=None):
+        """
+        Writes the given byte chunks to a wav file in the output directory. When no name is
+        given, uses the auto increment naming of the audio config, or the bare filename prefix
+        when auto increment is off. Returns the path written.
+        Does not check the recording state so it can be used while capture is running.
+        """
         def clamp():
             """
             clamps float32 to int16 values and returns a byte string of the format
             """
-            numeric_samples = self.get_numpy()
-            np.clip(numeric_samples, -1.0, 1.0, out=numeric_samples)
+            numeric_samples = np.clip(self.get_numpy(frames), -1.0, 1.0)
             numeric_samples = numeric_samples * 32767.0
             numeric_samples = np.round(numeric_samples)
             int16_samples = numeric_samples.astype(np.int16)
             return int16_samples.tobytes()
 
-        def find_latest_filenumber():
-            """
-            Finds the max file number in the directory recordings
-            """
-            current_wd = os.path.dirname(os.path.abspath(__file__))
-            recordings_dir = os.path.join(current_wd, self.audio_config.output_dir)
-            if not os.path.isdir(recordings_dir):
-                os.mkdir(recordings_dir)
-            files = os.listdir(recordings_dir)
-            max_number = 0
-            for f in files:
-                if (f.endswith(".wav") and f.startswith(f"{self.audio_config.default_filename_prefix}_")):
-                    match = re.search(rf'(?<={re.escape(self.audio_config.default_filename_prefix)}_)\d+', f)
-                    if match:
-                        extracted_part = match.group(0)
-                        max_number = max(int(extracted_part), max_number)
-
-            return max_number + 1
-
-        if self.is_recording():
-            raise RecordingInSession()
         current_channels = self.audio_config.channels
         current_format = self.audio_config.sample_format
         current_sample_rate = self.audio_config.rate
 
-        current_audio_bytes = self.get_raw_bytes(self.frames)
+        current_audio_bytes = self.get_raw_bytes(frames)
 
-        current_wd = os.path.dirname(os.path.abspath(__file__))
-        output_dir = os.path.join(current_wd, self.audio_config.output_dir)
-        file_name_prefix = self.audio_config.default_filename_prefix
-        if not self.audio_config.auto_increment or wav_name:
+        output_dir = self.get_output_dir()
+        if not wav_name and not self.audio_config.auto_increment:
+            # without auto increment every take goes to the same file, named after the prefix
+            wav_name = self.audio_config.default_filename_prefix
+        if wav_name:
             if not os.path.isdir(output_dir):
                 os.mkdir(output_dir)
             if wav_name.endswith(".wav"):
                 wav_name = wav_name[:-4]
             filename_wav_format = os.path.join(output_dir, (wav_name + ".wav"))
         else:
-            latest_filenumber = find_latest_filenumber()
-            left_padded_filenumber = str(latest_filenumber).zfill(3)
-            file_name = file_name_prefix + "_" + left_padded_filenumber + ".wav"
+            file_name = self.next_take_name() + ".wav"
             filename_wav_format = os.path.join(output_dir, file_name)
 
         with wave.open(filename_wav_format, "wb") as wf:
@@ -360,6 +717,7 @@ class AudioRecorder:
 
             wf.setframerate(current_sample_rate)
             wf.writeframes(current_audio_bytes)
+        return filename_wav_format
 
     def _start_playback_monitor(self):
         """
@@ -402,6 +760,8 @@ class AudioRecorder:
                 with self.lock:
                     self.play_pos = 0
                 self.playback_done.clear()
+                for listener in self.playback_listeners:
+                    listener()
 
     def play_audio(self):
         """
@@ -428,6 +788,20 @@ class AudioRecorder:
                 silence_bytes = bytes([0] * bytes_needed)
                 return (silence_bytes, pyaudio.paContinue)
 
+        def _stretched_callback(data_in, frame_count, time_info, status_flag):
+            if self.is_in_playing():
+                with self.lock:
+                    block, finished = self.stretcher.read(frame_count)
+                    self.play_pos = int(self.stretcher.position) * bytes_per_frame
+                    chunk = from_float32(block, current_format_str)
+                    if finished:
+                        self.playback_done.set()
+                        return (chunk, pyaudio.paComplete)
+                    return (chunk, pyaudio.paContinue)
+            else:
+                bytes_needed = frame_count * current_channel_number * bytes_per_sample
+                return (bytes(bytes_needed), pyaudio.paContinue)
+
         if len(self.frames) == 0:
             raise NoRecordingAvailable
 
@@ -447,12 +821,25 @@ class AudioRecorder:
         recorded_bytes = self.get_raw_bytes(self.frames)
         if self.play_pos % bytes_per_frame != 0:
             self.play_pos -= self.play_pos % bytes_per_frame
+        playback_chunk = self.audio_config.playback_chunk or self.audio_config.chunk
+        if self.audio_config.playback_speed != 1.0:
+            source = to_float32(recorded_bytes, current_format_str, current_channel_number)
+            # PortAudio may ask for more frames than requested, so leave room for that
+            self.stretcher = WSOLAStretcher(source, current_rate,
+                                            speed=self.audio_config.playback_speed,
+                                            start_frame=self.play_pos // bytes_per_frame,
+                                            max_block=4 * playback_chunk,
+                                            chunk=playback_chunk)
+            stream_callback = _stretched_callback
+        else:
+            self.stretcher = None
+            stream_callback = _callback
         self.out_stream = self.audio_system.open(format=current_format,
                                                  channels=current_channel_number,
                                                  rate=current_rate,
                                                  output=True,
-                                                 frames_per_buffer=self.audio_config.chunk,
-                                                 stream_callback=_callback)
+                                                 frames_per_buffer=playback_chunk,
+                                                 stream_callback=stream_callback)
 
         self.playing.set()
         self.play_status = "playing"
@@ -460,6 +847,19 @@ class AudioRecorder:
         self.out_stream.start_stream()
         self._start_playback_monitor()
 
+    def set_playback_speed(self, speed):
+        """
+        Sets the playback speed, between 0.5x and 3x, without changing the pitch. Takes effect
+        immediately when a recording is being played at a speed other than 1.0, otherwise on
+        the next play.
+        """
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ValueError(f"Playback speed must be between {MIN_SPEED} and {MAX_SPEED}")
+        with self.lock:
+            self.audio_config.playback_speed = speed
+            if self.stretcher is not None:
+                self.stretcher.speed = speed
+
     def pause_playing(self):
         """
         Pauses the playing of a recording
@@ -473,6 +873,18 @@ class AudioRecorder:
         self.playback_done.set()
         self.out_stream = None
 
+    def close(self):
+        """
+        Stops recording and playing and throws the unsaved take away with its journal, so that
+        only a crash leaves a session to be recovered. The audio subsystem stays open.
+        """
+        self.stop()
+        if self.play_status == "playing":
+            self.stop_playing()
+        if self.journal is not None:
+            self.journal.discard()
+            self.journal = None
+
     def stop_playing(self):
         """
         Stops the playing of a recording and resets the playhead position to the start of the
@@ -0,0 +1,159 @@
+"""
+Implements the variable speed playback of the voice recorder: a WSOLA (waveform similarity
+overlap-add) time stretcher that changes the speed of a recording without changing its pitch.
+It produces its output block by block from preallocated buffers so it can run in the
+playback callback.
+"""
+import numpy as np
+
+MIN_SPEED = 0.5
+MAX_SPEED = 3.0
+
+# the similarity search runs on every n-th sample, then is refined around the best coarse lag
+_SEARCH_DECIMATION = 4
+
+# longest window, and shortest one: below about 10 ms a window no longer holds a pitch period
+# of a low voice and the overlap-add gets rough
+WINDOW_MS = 40
+MIN_WINDOW_MS = 10
+
+
+def window_frames(rate, chunk=None, window_ms=WINDOW_MS):
+    """
+    Returns the WSOLA window length in frames (even). With the chunk of the playback stream,
+    the window is at most two chunks so the output lags by one chunk at most, down to a
+    window of MIN_WINDOW_MS.
+    """
+    window = int(rate * window_ms / 1000)
+    if chunk:
+        window = min(window, 2 * chunk)
+    window = max(window, int(rate * MIN_WINDOW_MS / 1000), 16)
+    return window // 2 * 2
+
+
+class WSOLAStretcher:
+    """
+    Plays a float32 recording of shape (n, channels) at a given speed.
+    - read(frame_count): returns the next frame_count output frames and whether the end of the
+      recording was reached
+    - speed: can be changed between two reads
+    - position: the frame of the recording currently being played
+    The output lags the input by at most one hop (half a window, see window_frames()): one
+    chunk of the playback stream, or MIN_WINDOW_MS / 2 for smaller chunks.
+    """
+    def __init__(self, source, rate, speed=1.0, start_frame=0, max_block=4096,
+                 window_ms=WINDOW_MS, tolerance_ms=10, chunk=None):
+        """Initializes the stretcher and preallocates its buffers"""
+        self.source = source
+        self.channels = source.shape[1]
+        self.speed = speed
+
+        self.window = window_frames(rate, chunk, window_ms)
+        self.hop = self.window // 2
+        self.tolerance = max(1, int(rate * tolerance_ms / 1000))
+        # periodic hann: windows overlapping by half sum to one
+        self.hann = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.window) / self.window))
+        self.hann = self.hann.astype(np.float32)[:, None]
+
+        self.accumulator = np.zeros((self.window, self.channels), dtype=np.float32)
+        self.segment = np.zeros((self.window, self.channels), dtype=np.float32)
+        self.ready = np.zeros((max_block + self.hop, self.channels), dtype=np.float32)
+        self.ready_count = 0
+        self.output = np.zeros((max_block, self.channels), dtype=np.float32)
+
+        self.position = float(start_frame)
+        self.previous_start = None
+        self.finished = False
+
+    def _copy_segment(self, start):
+        """Copies the window of the source starting at start into self.segment, zero padded"""
+        end = min(start + self.window, self.source.shape[0])
+        available = max(0, end - start)
+        if available:
+            self.segment[:available] = self.source[start:end]
+        self.segment[available:] = 0.0
+
+    def _best_start(self, nominal):
+        """
+        Finds, within the tolerance around the nominal start, the segment most similar to the
+        natural continuation of the previous segment, so that the overlap-add stays in phase.
+        """
+        natural = self.previous_start + self.hop
+        total = self.source.shape[0]
+        if natural + self.window > total:
+            return nominal
+        low = max(0, nominal - self.tolerance)
+        high = min(total - self.window, nominal + self.tolerance)
+        if high <= low:
+            return nominal
+
+        step = _SEARCH_DECIMATION
+        target = self.source[natural:natural + self.window:step].mean(axis=1)
+        region = self.source[low:high + self.window].mean(axis=1)
+
+        # coarse search on decimated lags and samples
+        coarse = np.lib.stride_tricks.sliding_window_view(region[::step], target.size)
+        scores = coarse @ target
+        energy = np.sqrt(np.einsum("ij,ij->i", coarse, coarse)) + 1e-9
+        best = int(np.argmax(scores / energy)) * step
+
+        # refine around the coarse lag at full resolution
+        fine_low = max(0, best - step)
+        fine_high = min(high - low, best + step)
+        target = self.source[natural:natural + self.window].mean(axis=1)
+        fine = np.lib.stride_tricks.sliding_window_view(
+            region[fine_low:fine_high + self.window], self.window)
+        scores = fine @ target
+        energy = np.sqrt(np.einsum("ij,ij->i", fine, fine)) + 1e-9
+        return low + fine_low + int(np.argmax(scores / energy))
+
+    def _step(self):
+        """Overlap-adds one more segment and moves one hop of finished output to ready"""
+        if self.previous_start is None:
+            nominal = int(self.position)
+            start = nominal
+        else:
+            nominal = int(round(self.position + self.hop * self.speed))
+            start = self._best_start(nominal)
+        if nominal >= self.source.shape[0]:
+            self.finished = True
+            return
+
+        self._copy_segment(start)
+        self.segment *= self.hann
+        self.accumulator += self.segment
+
+        self.ready[self.ready_count:self.ready_count + self.hop] = self.accumulator[:self.hop]
+        self.ready_count += self.hop
+        self.accumulator[:self.hop] = self.accumulator[self.hop:]
+        self.accumulator[self.hop:] = 0.0
+
+        self.position = float(nominal)
+        self.previous_start = start
+
+    def _grow(self, max_block):
+        """Reallocates the output buffers for blocks of up to max_block frames"""
+        ready = np.zeros((max_block + self.hop, self.channels), dtype=np.float32)
+        ready[:self.ready_count] = self.ready[:self.ready_count]
+        self.ready = ready
+        self.output = np.zeros((max_block, self.channels), dtype=np.float32)
+
+    def read(self, frame_count):
+        """
+        Returns a view on the next frame_count output frames and True once the recording has
+        been played to its end (the missing frames are then silence). The view is only valid
+        until the next read.
+        """
+        if frame_count > self.output.shape[0]:
+            # more than max_block: rare, so the buffers are grown rather than kept oversized
+            self._grow(frame_count)
+        while self.ready_count < frame_count and not self.finished:
+            self._step()
+        available = min(frame_count, self.ready_count)
+        out = self.output[:frame_count]
+        out[:available] = self.ready[:available]
+        out[available:] = 0.0
+        remaining = self.ready_count - available
+        self.ready[:remaining] = self.ready[available:self.ready_count]
+        self.ready_count = remaining
+        return (out, self.finished and self.ready_count == 0)
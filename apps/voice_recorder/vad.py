@@ -0,0 +1,120 @@
+"""
+Implements the voice activity detection used by the auto-record mode of the voice recorder
+"""
+import math
+from collections import deque
+from enum import Enum, auto
+
+import numpy as np
+
+
+class VADEvent(Enum):
+    """Events reported by the detector when a take starts or finishes"""
+    START = auto()
+    STOP = auto()
+
+
+def chunk_features(samples):
+    """
+    Computes the energy (in dB) and the zero-crossing rate of a chunk of float32 samples
+    of shape (n, channels). Both are computed on the mono mix of the chunk.
+    """
+    if samples.ndim == 2:
+        mono = samples.mean(axis=1)
+    else:
+        mono = samples
+    if mono.size == 0:
+        return (-120.0, 0.0)
+    energy = float(np.dot(mono, mono)) / mono.size
+    energy_db = 10.0 * math.log10(energy + 1e-12)
+    signs = np.signbit(mono)
+    crossings = np.count_nonzero(signs[1:] != signs[:-1])
+    zcr = crossings / max(1, mono.size - 1)
+    return (energy_db, zcr)
+
+
+class VoiceActivityDetector:
+    """
+    Decides chunk by chunk whether someone is speaking and collects the chunks of each
+    utterance into its own take.
+    - push(data, samples): feeds one captured chunk, returns a VADEvent or None
+    - take: the chunks of the utterance currently being captured
+    - pop_take(): hands over a finished take, trimmed of its trailing silence
+    """
+    def __init__(self, rate, chunk, energy_threshold_db=-45.0, zcr_max=0.35,
+                 hang_ms=600, pre_roll_ms=200):
+        """Initializes the detector with the thresholds and the timings in milliseconds"""
+        chunk_ms = 1000.0 * chunk / rate
+        self.energy_threshold_db = energy_threshold_db
+        self.zcr_max = zcr_max
+
+        # number of silent chunks tolerated before an utterance is considered finished
+        self.hang_chunks = max(1, math.ceil(hang_ms / chunk_ms))
+
+        # silent chunks kept before the onset and after the end of each utterance
+        self.pad_chunks = max(0, math.ceil(pre_roll_ms / chunk_ms))
+        self.pre_roll = deque(maxlen=self.pad_chunks or 1)
+
+        self.active = False
+        self.silent_chunks = 0
+        self.take = []
+        self._finished = None
+
+    def is_speech(self, energy_db, zcr):
+        """
+        Speech is loud enough and has a low enough zero-crossing rate, which rejects hiss
+        and other broadband noise with a similar energy.
+        """
+        return energy_db >= self.energy_threshold_db and zcr <= self.zcr_max
+
+    def push(self, data, samples):
+        """
+        Feeds one chunk of raw bytes together with its decoded samples.
+        Returns VADEvent.START when an utterance begins, VADEvent.STOP once it has been
+        silent for the hang time, and None otherwise.
+        """
+        speech = self.is_speech(*chunk_features(samples))
+        if not self.active:
+            if speech:
+                self.active = True
+                self.silent_chunks = 0
+                self.take = list(self.pre_roll) if self.pad_chunks else []
+                self.take.append(data)
+                self.pre_roll.clear()
+                return VADEvent.START
+            if self.pad_chunks:
+                self.pre_roll.append(data)
+            return None
+
+        self.take.append(data)
+        if speech:
+            self.silent_chunks = 0
+            return None
+        self.silent_chunks += 1
+        if self.silent_chunks < self.hang_chunks:
+            return None
+        self._finish()
+        return VADEvent.STOP
+
+    def flush(self):
+        """
+        Ends the utterance in progress, if any. Returns True if a take is ready to be popped.
+        """
+        if self.active:
+            self._finish()
+        return self._finished is not None
+
+    def pop_take(self):
+        """Returns the last finished take and forgets it"""
+        finished = self._finished
+        self._finished = None
+        return finished
+
+    def _finish(self):
+        """Trims the trailing silence of the current take and marks it as finished"""
+        trailing = min(self.silent_chunks, len(self.take))
+        keep = len(self.take) - max(0, trailing - self.pad_chunks)
+        self._finished = self.take[:keep]
+        self.take = []
+        self.active = False
+        self.silent_chunks = 0
@@ -3,15 +3,98 @@ Creates the specific UI for the voice recorder app.
 """
 import os.path
 
-from PySide6.QtWidgets import QGridLayout, QHBoxLayout, QLabel, QMainWindow, QMessageBox, \
-    QProgressBar, \
-    QPushButton, QVBoxLayout, QWidget
+from PySide6.QtWidgets import QCheckBox, QComboBox, QGridLayout, QHBoxLayout, QHeaderView, QLabel, \
+    QMainWindow, QMessageBox, QProgressBar, \
+    QPushButton, QTableView, QVBoxLayout, QWidget
 from PySide6.QtGui import QAction
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, Signal
+
+
+class TakeTableModel(QAbstractTableModel):
+    """
+    Table model over the entries of the recordings library. Qt only asks for the rows that
+    are visible, so thousands of takes cost nothing until they are scrolled to.
+    """
+    HEADERS = ["Take", "Duration (s)", "Channels", "Rate", "Peak", "RMS", "LUFS"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []
+
+    def set_entries(self, entries):
+        """replaces the takes displayed by the table"""
+        self.beginResetModel()
+        self.entries = entries
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        take = self.entries[index.row()]
+        column = index.column()
+        if column == 0:
+            return take.name
+        if take.error:
+            return "unreadable" if column == 1 else ""
+        if column == 1:
+            return f"{take.duration:.1f}"
+        if column == 2:
+            return str(take.channels)
+        if column == 3:
+            return str(take.rate)
+        if column == 4:
+            return f"{take.peak:.3f}"
+        if column == 5:
+            return f"{take.rms:.3f}"
+        return "-inf" if take.lufs == float("-inf") else f"{take.lufs:.1f}"
+
+
+class RecordingsLibraryPanel(QWidget):
+    """A window listing the takes of the recordings directory and their metadata"""
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Recordings Library")
+        self.setGeometry(450, 450, 700, 500)
+        layout = QVBoxLayout(self)
+        self.status_label = QLabel("")
+        self.table_model = TakeTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        # fixed widths: sizing the columns to their contents measures every row of the library
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setDefaultSectionSize(80)
+        header.setStretchLastSection(True)
+        self.table.setColumnWidth(0, 200)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.table)
+
+    def setEntries(self, entries):
+        """updates the takes displayed in the table"""
+        self.table_model.set_entries(entries)
+
+    def setStatus(self, text):
+        """updates the indexing status shown above the table"""
+        self.status_label.setText(text)
 
 
 class VoiceRecorderView(QMainWindow):
     """A class that represents the main window display for the voice recorder"""
+    # emitted when the window is closed
+    closed = Signal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Welcome to the Voice Recorder App")
@@ -50,6 +133,21 @@ class VoiceRecorderView(QMainWindow):
         menu_options_layout.addWidget(self.play_button)
         menu_options_layout.addWidget(self.save_wav_button)
 
+        self.speed_selector = QComboBox()
+        for speed in (0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 2.5, 3.0):
+            self.speed_selector.addItem(f"{speed:g}x", speed)
+        self.speed_selector.setCurrentIndex(2)
+        menu_options_layout.addWidget(self.speed_selector)
+
+        self.library_button = QPushButton("Library")
+        menu_options_layout.addWidget(self.library_button)
+        self.calibrate_button = QPushButton("Calibrate")
+        menu_options_layout.addWidget(self.calibrate_button)
+
+        # voice activated mode: every utterance is saved as its own take
+        self.vad_checkbox = QCheckBox("Voice activated")
+        menu_options_layout.addWidget(self.vad_checkbox)
+
         # recording in progress (red when active and grey when incactive),
         # recording paused (black when paused and grey when not),
         # no recording and playing (recording normal and paused label normal)
@@ -89,6 +187,12 @@ class VoiceRecorderView(QMainWindow):
         self.clip_level.setFixedSize(12, 12)
         self.clip_level.setObjectName("ClipLevel")
         clip_level_layout.addWidget(self.clip_level)
+        clip_level_layout.addSpacing(10)
+
+        # one clip light per channel, created once the channel count is known
+        self.channel_clip_layout = QHBoxLayout()
+        self.channel_clip_lights = []
+        clip_level_layout.addLayout(self.channel_clip_layout)
 
         # shows a popup box for when there are important messages
         message_box_layout = QVBoxLayout()
@@ -111,6 +215,11 @@ class VoiceRecorderView(QMainWindow):
         """Closes the app"""
         self.close()
 
+    def closeEvent(self, event):
+        """Lets the app release what it holds before the window goes"""
+        self.closed.emit()
+        super().closeEvent(event)
+
     def setVULevel(self, level):
         """
         updates the progress bar
@@ -137,3 +246,33 @@ class VoiceRecorderView(QMainWindow):
         updates the dB level of the label to correspond to the sound level
         """
         self.decibel_level.setText(text)
+
+    def setChannelCount(self, channels):
+        """
+        creates one labelled clip light per channel
+        """
+        while self.channel_clip_layout.count():
+            item = self.channel_clip_layout.takeAt(0)
+            if item.widget() is not None:
+                item.widget().setParent(None)
+        self.channel_clip_lights = []
+        for i in range(channels):
+            name = QLabel("L" if channels == 2 and i == 0 else
+                          "R" if channels == 2 else f"Ch {i + 1}")
+            light = QLabel()
+            light.setFixedSize(12, 12)
+            light.setObjectName("ClipLevel")
+            self.channel_clip_layout.addWidget(name)
+            self.channel_clip_layout.addWidget(light)
+            self.channel_clip_layout.addSpacing(5)
+            self.channel_clip_lights.append(light)
+
+    def setChannelClipping(self, states):
+        """
+        changes the color of each channel's clip light
+        """
+        for light, is_clipping in zip(self.channel_clip_lights, states):
+            if is_clipping:
+                light.setStyleSheet("background-color: red; border-radius: 6px;")
+            else:
+                light.setStyleSheet("background-color: grey; border-radius: 6px;")
@@ -0,0 +1,122 @@
+"""
+The words still possible in a game, narrowed after every guess without rescanning the words.
+
+A word list is indexed once per word length: for each position, the bit of the letter each
+word has there (bit 0 for a, ... bit 25 for z), and the count of each letter in each word. The
+feedback of the guesses is kept as constraints, a mask of the letters still allowed at each
+position and bounds on the count of each letter, and each guess only checks the candidates
+left against the constraints it changed, with a few numpy operations.
+"""
+import functools
+
+import numpy as np
+
+from apps.word_guessing_game import scoring
+
+# letters a to z are bits 0 to 25, in either case, anything else shares bit 26 and is never
+# ruled out
+_LETTERS = 26
+_OTHER = _LETTERS
+ALL_LETTERS = (1 << (_LETTERS + 1)) - 1
+
+
+def letter_codes(letters):
+    """Maps byte codes of letters to 0-25 for a-z and A-Z, and to _OTHER for anything else"""
+    # A-Z differ from a-z by the 0x20 bit only
+    upper = (letters >= ord("A")) & (letters <= ord("Z"))
+    codes = (letters | (upper.astype(np.uint8) << 5)).astype(np.int16) - ord("a")
+    codes[(codes < 0) | (codes >= _LETTERS)] = _OTHER
+    return codes.astype(np.uint8)
+
+
+class CandidateIndex:
+    """
+    The words of one length of a word list, indexed for filtering.
+    - words: the words as a numpy bytes array
+    - position_bits[i]: the letter bit of each word at position i
+    - counts[:, c]: the count of letter c in each word
+    """
+    def __init__(self, words):
+        self.words = words
+        self.length = words.dtype.itemsize
+        codes = letter_codes(scoring.as_letters(words)) if len(words) else \
+            np.zeros((0, self.length), dtype=np.uint8)
+        self.position_bits = np.left_shift(np.uint32(1), codes.T.astype(np.uint32))
+        # letters counted for all the words at once, word i owning bins 27 * i to 27 * i + 26
+        bins = np.arange(len(words))[:, None] * (_LETTERS + 1) + codes
+        self.counts = np.bincount(bins.ravel(), minlength=len(words) * (_LETTERS + 1)) \
+            .astype(np.uint8).reshape(len(words), _LETTERS + 1)
+
+
+@functools.lru_cache(maxsize=8)
+def candidate_index(word_list, length):
+    """Returns the CandidateIndex of the words of length bytes of a WordList, built once"""
+    return CandidateIndex(word_list.of_length(length))
+
+
+class CandidateFilter:
+    """
+    The candidates of one game, narrowed by the feedback of each guess.
+    - update(guess, pattern): applies the feedback of a guess
+    - words(): the remaining candidates, as a numpy bytes array
+    """
+    def __init__(self, index):
+        self.index = index
+        self.candidates = np.arange(len(index.words))
+        self.allowed = [ALL_LETTERS] * index.length
+        self.min_counts = [0] * (_LETTERS + 1)
+        self.max_counts = [index.length] * (_LETTERS + 1)
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def update(self, guess, pattern):
+        """Narrows the candidates with the pattern code of guess (str)"""
+        letters = np.frombuffer(guess.encode("utf-8"), dtype=np.uint8)
+        if len(letters) != self.index.length:
+            # a guess of another length tells nothing about the positions of the letters
+            return
+        codes = letter_codes(letters).tolist()
+        states = scoring.states(pattern, len(codes))
+
+        changed_positions = []
+        for i, (code, state) in enumerate(zip(codes, states)):
+            if code == _OTHER:
+                continue
+            allowed = 1 << code if state == scoring.CORRECT else self.allowed[i] & ~(1 << code)
+            if allowed != self.allowed[i]:
+                self.allowed[i] = allowed
+                changed_positions.append(i)
+
+        # a letter is in the target as many times as it is CORRECT or PRESENT, and no more
+        # if one of its copies is ABSENT
+        found = {}
+        absent = set()
+        for code, state in zip(codes, states):
+            if code == _OTHER:
+                continue
+            if state == scoring.ABSENT:
+                absent.add(code)
+                found.setdefault(code, 0)
+            else:
+                found[code] = found.get(code, 0) + 1
+        changed_letters = []
+        for code, count in found.items():
+            low = max(self.min_counts[code], count)
+            high = min(self.max_counts[code], count) if code in absent else self.max_counts[code]
+            if (low, high) != (self.min_counts[code], self.max_counts[code]):
+                self.min_counts[code], self.max_counts[code] = low, high
+                changed_letters.append(code)
+
+        keep = np.ones(len(self.candidates), dtype=bool)
+        for i in changed_positions:
+            bits = self.index.position_bits[i][self.candidates]
+            keep &= (bits & np.uint32(self.allowed[i])) != 0
+        for code in changed_letters:
+            counts = self.index.counts[self.candidates, code]
+            keep &= (counts >= self.min_counts[code]) & (counts <= self.max_counts[code])
+        self.candidates = self.candidates[keep]
+
+    def words(self):
+        """Returns the remaining candidates as a numpy bytes array"""
+        return self.index.words[self.candidates]
@@ -20,6 +20,7 @@ class WordGuesserController(QObject):
 
         self.views.user_input.returnPressed.connect(self.submit_user_input)
         self.views.submit_button.clicked.connect(self.submit_user_input)
+        self.views.hint_button.clicked.connect(self.show_hint)
         # self.views.restart_button.clicked.connect(self.restart_game)
 
     @Slot(bool)
@@ -44,12 +45,22 @@ class WordGuesserController(QObject):
             self.game.set_guess_count()
             self.views.guess_count.setText(str(self.game.guess_count))
             self.views.board.setup_tiles(self.game.word_length)
+        self.views.show_possible_words(self.game.candidate_filter.words())
         self.views.easy_difficulty_button.setDisabled(True)
         self.views.medium_difficulty_button.setDisabled(True)
         self.views.hard_difficulty_button.setDisabled(True)
         self.views.submit_button.setDisabled(True)
         self.views.submit_button.setEnabled(True)
 
+    @Slot(bool)
+    def show_hint(self):
+        """Writes the suggested guess in the input, for the user to submit or change"""
+        if self.game.word_target is None or self.game.game_state != GameState.RUNNING:
+            return
+        hint = self.game.hint()
+        if hint:
+            self.views.user_input.setText(hint)
+
     @Slot(bool)
     def submit_user_input(self):
         """does the game logic"""
@@ -59,6 +70,7 @@ class WordGuesserController(QObject):
         else:
             self.game.user_guess = self.views.user_input.text()
             self.game.check_user_input()
+            self.views.show_possible_words(self.game.candidate_filter.words())
             if self.game.game_state == GameState.LOSE:
                 self.views.easy_difficulty_button.setEnabled(True)
                 self.views.medium_difficulty_button.setEnabled(True)
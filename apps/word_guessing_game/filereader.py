@@ -1,61 +1,150 @@
 """A file reader class that loads the files containing the words for the guesses"""
+import mmap
+import threading
+
+import numpy as np
+
+# word files at least this large are memory-mapped instead of read into memory
+MMAP_MIN_BYTES = 1 << 20
+
+_NEWLINE = ord("\n")
+_CARRIAGE_RETURN = ord("\r")
+
+# word lists loaded so far, by path, shared by every WordProvider of the process
+_WORD_LISTS = {}
+_WORD_LISTS_LOCK = threading.Lock()
+
+
+class WordList:
+    """
+    The words of a file, one per line, kept as the bytes of the file and an array of where
+    each word starts and ends: no str object exists until a word is asked for.
+    - len(words), words[i], iteration: the words as str
+    - of_length(n): the words of n letters as a fixed-width numpy bytes array
+    """
+    def __init__(self, data=b""):
+        # data is the file content, bytes or an mmap
+        self.data = data
+        buffer = np.frombuffer(data, dtype=np.uint8) if len(data) else np.zeros(0, np.uint8)
+        self.buffer = buffer
+        ends = np.flatnonzero(buffer == _NEWLINE)
+        if len(buffer) and buffer[-1] != _NEWLINE:
+            ends = np.append(ends, len(buffer))
+        starts = np.empty_like(ends)
+        starts[:1] = 0
+        starts[1:] = ends[:-1] + 1
+        # "\r\n" line endings
+        ends = ends - ((ends > starts) & (buffer[np.maximum(ends - 1, 0)] == _CARRIAGE_RETURN))
+        # blank lines are no words. 4-byte offsets are enough for files under 4 GB
+        kept = ends > starts
+        offset_type = np.uint32 if len(buffer) < 1 << 32 else np.int64
+        self.starts = starts[kept].astype(offset_type)
+        self.ends = ends[kept].astype(offset_type)
+        self._by_length = {}
+
+    @classmethod
+    def from_file(cls, path, mmap_min_bytes=MMAP_MIN_BYTES):
+        """Loads a word file, memory-mapped when it is large"""
+        with open(path, "rb") as f:
+            f.seek(0, 2)
+            size = f.tell()
+            if size >= mmap_min_bytes:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            f.seek(0)
+            return cls(f.read())
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        return self.data[self.starts[i]:self.ends[i]].decode("utf-8", "replace")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def of_length(self, n):
+        """Returns the words of n bytes (letters, for ASCII words) as a numpy array of dtype Sn"""
+        words = self._by_length.get(n)
+        if words is None:
+            starts = self.starts[(self.ends - self.starts) == n].astype(np.intp)
+            # every word of the length gathered at once, one row of n bytes per word
+            rows = self.buffer[starts[:, None] + np.arange(n)]
+            words = np.ascontiguousarray(rows).view(f"S{n}").ravel()
+            self._by_length[n] = words
+        return words
+
+
+def load_word_list(path):
+    """
+    Returns the WordList of a file, loaded on the first call for that path and then shared
+    by every caller.
+    """
+    words = _WORD_LISTS.get(path)
+    if words is None:
+        with _WORD_LISTS_LOCK:
+            words = _WORD_LISTS.get(path)
+            if words is None:
+                words = WordList.from_file(path)
+                _WORD_LISTS[path] = words
+    return words
 
 
 class WordProvider:
-    """Class that contains the file reading and saving function"""
+    """
+    Class that gives the words of each difficulty. The word files are only read when the
+    words of their difficulty are first needed, once per process.
+    """
 
     def __init__(self, easy_path, medium_path, hard_path):
         self.easy_diff_path = easy_path
         self.medium_diff_path = medium_path
         self.hard_diff_path = hard_path
-        self.easy_lst = []
-        self.easy_count = 0
-        self.medium_lst = []
-        self.medium_count = 0
-        self.hard_lst = []
-        self.hard_count = 0
 
-    def load_easy_words(self):
-        """Loads and stores the words from the .txt file containing easy words"""
+    def _words(self, path, difficulty):
+        """Loads the words of a file, an empty list if it cannot be read"""
         try:
-            with open(self.easy_diff_path, "r") as ef:
-                curr_word = ef.readline()
-                while curr_word:
-                    self.easy_lst.append(curr_word.strip())
-                    self.easy_count += 1
-                    curr_word = ef.readline()
-
+            return load_word_list(path)
         except FileNotFoundError:
-            print("Error: file containing easy words not found")
+            print(f"Error: file containing {difficulty} words not found")
         except Exception as e:
             print(f"An error occurred: {e}")
+        # the error is only reported once, unless another thread loaded the file meanwhile
+        with _WORD_LISTS_LOCK:
+            return _WORD_LISTS.setdefault(path, WordList())
 
-    def load_medium_words(self):
-        """Loads and stores the words from the .txt file containing medium words"""
-        try:
-            with open(self.medium_diff_path, "r") as mf:
-                curr_word = mf.readline()
-                while curr_word:
-                    self.medium_lst.append(curr_word.strip())
-                    self.medium_count += 1
-                    curr_word = mf.readline()
+    @property
+    def easy_lst(self):
+        return self._words(self.easy_diff_path, "easy")
 
-        except FileNotFoundError:
-            print("Error: file containing medium words not found")
-        except Exception as e:
-            print(f"An error occurred: {e}")
+    @property
+    def easy_count(self):
+        return len(self.easy_lst)
 
-    def load_hard_words(self):
-        """Loads and stores the words from the .txt file containing hard words"""
-        try:
-            with open(self.hard_diff_path, "r") as hf:
-                curr_word = hf.readline()
-                while curr_word:
-                    self.hard_lst.append(curr_word.strip())
-                    self.hard_count += 1
-                    curr_word = hf.readline()
+    @property
+    def medium_lst(self):
+        return self._words(self.medium_diff_path, "medium")
 
-        except FileNotFoundError:
-            print("Error: file containing hard words not found")
-        except Exception as e:
-            print(f"An error occurred: {e}")
+    @property
+    def medium_count(self):
+        return len(self.medium_lst)
+
+    @property
+    def hard_lst(self):
+        return self._words(self.hard_diff_path, "hard")
+
+    @property
+    def hard_count(self):
+        return len(self.hard_lst)
+
+    def load_easy_words(self):
+        """Returns the words of the .txt file containing easy words, loading them if needed"""
+        return self.easy_lst
+
+    def load_medium_words(self):
+        """Returns the words of the .txt file containing medium words, loading them if needed"""
+        return self.medium_lst
+
+    def load_hard_words(self):
+        """Returns the words of the .txt file containing hard words, loading them if needed"""
+        return self.hard_lst
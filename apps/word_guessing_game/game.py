@@ -1,9 +1,14 @@
 """A class representing the game logic for the word guessing game."""
 import os.path
 from enum import Enum
-from random import randint
+from random import randrange
 
+import numpy as np
+
+from apps.word_guessing_game import scoring
+from apps.word_guessing_game.candidates import CandidateFilter, candidate_index
 from apps.word_guessing_game.filereader import WordProvider
+from apps.word_guessing_game.solver import HintSolver
 
 
 class LetterState(Enum):
@@ -14,6 +19,14 @@ class LetterState(Enum):
     UNKNOWN = "GREY"
 
 
+# letter state of each state of a scoring pattern
+_LETTER_STATES = {
+    scoring.ABSENT: LetterState.ABSENT,
+    scoring.PRESENT: LetterState.PRESENT,
+    scoring.CORRECT: LetterState.CORRECT,
+}
+
+
 class GameDifficulty(Enum):
     """a state machine to determine the game difficulty chosen by the user"""
     EASY = 1
@@ -40,6 +53,15 @@ class WordGuessingLogic():
         self.game_state = GameState.RUNNING
         self.guess_result = []
         self.guess_result_correct = []
+        # pattern code of the last guess, see scoring
+        self.guess_pattern = None
+        # the words of the chosen difficulty, and the (guess, pattern code) of the game so far
+        self.words = None
+        self.guess_history = []
+        # created by the first hint of a game
+        self.solver = None
+        # the words of the list still possible, see candidates
+        self.candidate_filter = None
 
         # initialized and store the word provider object
         BASE_PATH = os.path.dirname(__file__)
@@ -49,10 +71,8 @@ class WordGuessingLogic():
         easy_file_path = os.path.join(BASE_PATH, EASY_FILE)
         medium_file_path = os.path.join(BASE_PATH, MEDIUM_FILE)
         hard_file_path = os.path.join(BASE_PATH, HARD_FILE)
+        # the words of a difficulty are only read once it is chosen, and shared by every game
         self.word_provider = WordProvider(easy_file_path, medium_file_path, hard_file_path)
-        self.word_provider.load_easy_words()
-        self.word_provider.load_medium_words()
-        self.word_provider.load_hard_words()
 
     def random_word_pick(self):
         """chooses the random word based on the game difficulty chosen by the user"""
@@ -62,11 +82,15 @@ class WordGuessingLogic():
             self.medium_pick()
         else:
             self.hard_pick()
+        self.guess_history = []
+        self.solver = None
+        length = len(self.word_target.encode("utf-8"))
+        self.candidate_filter = CandidateFilter(candidate_index(self.words, length))
 
     def easy_pick(self):
         """Chooses a random easy word from the easy word list in word provider"""
-        random_idx = randint(0, self.word_provider.easy_count)
-        random_word = self.word_provider.easy_lst[random_idx]
+        words = self.words = self.word_provider.easy_lst
+        random_word = words[randrange(len(words))].lower()
         self.word_target = random_word
         self.word_length = len(random_word)
 
@@ -74,8 +98,8 @@ class WordGuessingLogic():
         """
         Chooses a random hard word from the hard word list in word provider
         """
-        random_idx = randint(0, self.word_provider.hard_count)
-        random_word = self.word_provider.hard_lst[random_idx]
+        words = self.words = self.word_provider.hard_lst
+        random_word = words[randrange(len(words))].lower()
         self.word_target = random_word
         self.word_length = len(random_word)
 
@@ -83,8 +107,8 @@ class WordGuessingLogic():
         """
         Chooses a random medium word from the medium word list in word provider
         """
-        random_idx = randint(0, self.word_provider.medium_count)
-        random_word = self.word_provider.medium_lst[random_idx]
+        words = self.words = self.word_provider.medium_lst
+        random_word = words[randrange(len(words))].lower()
         self.word_target = random_word
         self.word_length = len(random_word)
 
@@ -115,26 +139,30 @@ class WordGuessingLogic():
         """
         if self.user_guess is None:
             return
-        target_work_breakdown = list(self.word_target)
-        user_guess_breakdown = list(self.user_guess)
-        for i in range(len(user_guess_breakdown)):
-            present = False
-            correct = False
-            for j in range(len(target_work_breakdown)):
-                if user_guess_breakdown[i] == target_work_breakdown[j] and i == j:
-                    correct = True
-                    present = True
-                    break
-                elif user_guess_breakdown[i] == target_work_breakdown[j]:
-                    present = True
-                    break
-            if correct and present:
-                self.guess_result.append((user_guess_breakdown[i], i, LetterState.CORRECT))
-                self.guess_result_correct.append((user_guess_breakdown[i], i, LetterState.CORRECT))
-            elif not correct and present:
-                self.guess_result.append((user_guess_breakdown[i], i, LetterState.PRESENT))
-            elif not correct and not present:
-                self.guess_result.append((user_guess_breakdown[i], i, LetterState.ABSENT))
-
-        if len(self.guess_result_correct) == len(target_work_breakdown):
+        # the words are guessed without case, as typed in the view
+        guess = self.user_guess.lower()
+        self.guess_pattern = scoring.score(guess, self.word_target)
+        self.guess_history.append((guess, self.guess_pattern))
+        if self.solver is not None:
+            self.solver.update(guess, self.guess_pattern)
+        if self.candidate_filter is not None:
+            self.candidate_filter.update(guess, self.guess_pattern)
+        for i, state in enumerate(scoring.states(self.guess_pattern, len(guess))):
+            self.guess_result.append((guess[i], i, _LETTER_STATES[state]))
+            if state == scoring.CORRECT:
+                self.guess_result_correct.append((guess[i], i, LetterState.CORRECT))
+
+        if len(self.guess_result_correct) == len(self.word_target):
             self.game_state = GameState.WIN
+
+    def hint(self):
+        """
+        Returns the word whose feedback would tell the most about the target, given the
+        guesses so far, or None when no word of the list fits them
+        """
+        if self.solver is None:
+            length = len(self.word_target.encode("utf-8"))
+            self.solver = HintSolver(np.char.lower(self.words.of_length(length)))
+            for guess, pattern in self.guess_history:
+                self.solver.update(guess, pattern)
+        return self.solver.best_guess()
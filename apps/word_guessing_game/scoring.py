@@ -0,0 +1,95 @@
+"""
+Scoring of a guess against a target word, shared by the game, the solver and simulations.
+
+The feedback of a guess is a pattern code: the state of letter i of the guess (ABSENT,
+PRESENT or CORRECT) is digit i of the code in base 3. A letter is only PRESENT as many times
+as the target holds it beyond the CORRECT ones: with a target of "crate", the guess "geese"
+gets its last e CORRECT and the other two ABSENT.
+"""
+import numpy as np
+
+ABSENT = 0
+PRESENT = 1
+CORRECT = 2
+
+
+def all_correct(length):
+    """The pattern code of a word guessed right"""
+    return 3 ** length - 1
+
+
+def pattern_dtype(length):
+    """The smallest unsigned integer type holding the pattern codes of words of length letters"""
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if 3 ** length <= np.iinfo(dtype).max + 1:
+            return dtype
+    raise ValueError(f"no pattern code type for words of {length} letters")
+
+
+def score(guess, target):
+    """Returns the pattern code of guess against target, in O(length)"""
+    length = min(len(guess), len(target))
+    states = [ABSENT] * len(guess)
+    # letters of the target not guessed at their position, with their count
+    remaining = {}
+    for i in range(length):
+        if guess[i] == target[i]:
+            states[i] = CORRECT
+        else:
+            remaining[target[i]] = remaining.get(target[i], 0) + 1
+    for i in range(length, len(target)):
+        remaining[target[i]] = remaining.get(target[i], 0) + 1
+    code = 0
+    power = 1
+    for i, letter in enumerate(guess):
+        state = states[i]
+        if state == ABSENT and remaining.get(letter):
+            state = PRESENT
+            remaining[letter] -= 1
+        code += state * power
+        power *= 3
+    return code
+
+
+def states(code, length):
+    """Returns the letter states of a pattern code, in the order of the guess"""
+    result = []
+    for _ in range(length):
+        code, state = divmod(code, 3)
+        result.append(state)
+    return result
+
+
+def as_letters(words):
+    """Returns words (a sequence of str or a numpy bytes array) as a matrix of byte codes"""
+    if not isinstance(words, np.ndarray):
+        words = np.array([word.encode("utf-8") for word in words])
+    length = words.dtype.itemsize
+    return np.frombuffer(np.ascontiguousarray(words).tobytes(), dtype=np.uint8).reshape(-1, length)
+
+
+def score_many(guess, targets):
+    """
+    Returns the pattern codes of guess against every target at once, as an array. The targets
+    are a matrix of byte codes (see as_letters()), or words, all of the length of guess.
+    """
+    if isinstance(guess, str):
+        guess = guess.encode("utf-8")
+    guess = np.frombuffer(guess, dtype=np.uint8)
+    if not (isinstance(targets, np.ndarray) and targets.dtype == np.uint8):
+        targets = as_letters(targets)
+    length = len(guess)
+    correct = targets == guess
+    # per letter of the guess, how many more times each target may show it as PRESENT
+    remaining = {letter: ((targets == letter) & ~correct).sum(axis=1)
+                 for letter in np.unique(guess).tolist()}
+    dtype = pattern_dtype(length)
+    codes = np.zeros(len(targets), dtype=dtype)
+    power = 1
+    for i in range(length):
+        count = remaining[int(guess[i])]
+        present = ~correct[:, i] & (count > 0)
+        count -= present
+        codes += (correct[:, i] * CORRECT + present * PRESENT).astype(dtype) * dtype(power)
+        power *= 3
+    return codes
@@ -0,0 +1,165 @@
+"""
+Hints for the word guessing game: the guess that tells the most about the target, on average,
+among the words still possible.
+
+The pattern code of every guess against every target of a word list (see scoring) is computed
+once per list and word length, kept in an on-disk cache and memory-mapped from it afterwards.
+With that matrix, the feedback of a guess over the remaining candidates is one row lookup, and
+the best guess is the one whose patterns split the candidates with the largest entropy.
+"""
+import hashlib
+import multiprocessing
+import os
+
+import numpy as np
+
+from apps.word_guessing_game import scoring
+
+# bump whenever the content of the matrices changes, so old caches are rebuilt
+MATRIX_VERSION = 1
+
+_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# guesses scored by a pool worker at a time
+_ROWS_PER_TASK = 64
+
+# below this many guesses, the matrix is built without a process pool
+_MIN_POOL_ROWS = 256
+
+# letter matrix of the words the pool workers score, set by _init_worker()
+_LETTERS = None
+
+
+def cache_path(words, cache_dir=None):
+    """Returns the cache file of the pattern matrix of words (a numpy bytes array)"""
+    if cache_dir is None:
+        cache_dir = _CACHE_DIR
+    digest = hashlib.blake2b(words.tobytes(), digest_size=8).hexdigest()
+    length = words.dtype.itemsize
+    name = f"patterns_v{MATRIX_VERSION}_{length}_{len(words)}_{digest}.npy"
+    return os.path.join(cache_dir, name)
+
+
+def _init_worker(letters):
+    """Pool initializer: keeps the letter matrix of the words to score"""
+    global _LETTERS
+    _LETTERS = letters
+
+
+def _score_rows(start):
+    """Runs in a pool worker: the rows of the matrix from start"""
+    stop = min(start + _ROWS_PER_TASK, len(_LETTERS))
+    return start, np.stack([scoring.score_many(_LETTERS[i].tobytes(), _LETTERS)
+                            for i in range(start, stop)])
+
+
+def build_matrix(words, out, jobs=None):
+    """Fills out[i, j] with the pattern code of words[i] against words[j], on jobs processes"""
+    letters = scoring.as_letters(words)
+    jobs = jobs or os.cpu_count() or 1
+    starts = range(0, len(words), _ROWS_PER_TASK)
+    if jobs <= 1 or len(words) < _MIN_POOL_ROWS:
+        _init_worker(letters)
+        for start, rows in map(_score_rows, starts):
+            out[start:start + len(rows)] = rows
+        return
+    # handed to the workers rather than inherited, which only works when they are forked
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(letters,)) as pool:
+        for start, rows in pool.imap_unordered(_score_rows, starts):
+            out[start:start + len(rows)] = rows
+
+
+def pattern_matrix(words, cache_dir=None, jobs=None):
+    """
+    Returns the matrix of the pattern codes of every word of words (a numpy bytes array, see
+    WordList.of_length()) against every other, memory-mapped from the cache when possible,
+    otherwise built and saved for the next games. A cache that cannot be written is ignored.
+    """
+    path = cache_path(words, cache_dir)
+    try:
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        pass
+
+    # one byte per pattern when they all fit, as for the 243 patterns of five letters
+    dtype = scoring.pattern_dtype(words.dtype.itemsize)
+    temp_path = f"{path}.{os.getpid()}.tmp.npy"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        matrix = np.lib.format.open_memmap(temp_path, mode="w+", dtype=dtype,
+                                           shape=(len(words), len(words)))
+        build_matrix(words, matrix, jobs)
+        matrix.flush()
+        del matrix
+        os.replace(temp_path, path)
+        return np.load(path, mmap_mode="r")
+    except OSError as e:
+        print(f"Could not save the pattern matrix cache: {e}")
+    finally:
+        # a matrix left half built by an error is never used
+        matrix = None
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    matrix = np.empty((len(words), len(words)), dtype=dtype)
+    build_matrix(words, matrix, jobs)
+    return matrix
+
+
+def split_entropies(patterns):
+    """
+    Returns, for each row of patterns (guesses x candidates), the entropy in bits of how its
+    patterns split the candidates
+    """
+    count = patterns.shape[1]
+    ordered = np.sort(patterns, axis=1)
+    # runs of equal patterns in the sorted rows. Every row starts a run, so a run ends where
+    # the next one starts, even across rows
+    starts = np.ones(ordered.shape, dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    positions = np.flatnonzero(starts)
+    sizes = np.diff(np.append(positions, ordered.size))
+    weighted = np.bincount(positions // count, weights=sizes * np.log2(sizes),
+                           minlength=len(patterns))
+    return np.log2(count) - weighted / count
+
+
+class HintSolver:
+    """
+    Narrows the candidates of a game from its feedback and suggests the next guess.
+    - update(guess, pattern): keeps the candidates that give pattern for guess
+    - best_guess(): the word whose feedback is expected to tell the most
+    """
+    def __init__(self, words, matrix=None):
+        # words is a numpy bytes array of words of the same length
+        self.words = words
+        self.matrix = pattern_matrix(words) if matrix is None else matrix
+        self.positions = {word: i for i, word in enumerate(words.tolist())}
+        self.candidates = np.arange(len(words))
+
+    def update(self, guess, pattern):
+        """Keeps the candidates for which guess (str) gets pattern"""
+        guess = guess.encode("utf-8")
+        if len(guess) != self.words.dtype.itemsize:
+            return
+        row = self.positions.get(guess)
+        if row is not None:
+            patterns = self.matrix[row, self.candidates]
+        else:
+            patterns = scoring.score_many(guess, self.words[self.candidates])
+        self.candidates = self.candidates[patterns == pattern]
+
+    def best_guess(self):
+        """
+        Returns the word (str) that maximizes the expected information over the remaining
+        candidates, preferring a candidate among equals. None when no candidate is left.
+        """
+        candidates = self.candidates
+        if len(candidates) <= 2:
+            return self.words[candidates[0]].decode("utf-8") if len(candidates) else None
+        entropies = split_entropies(self.matrix[:, candidates])
+        # a candidate may be the target itself, which wins ties
+        entropies[candidates] += 1e-6
+        return self.words[int(np.argmax(entropies))].decode("utf-8")
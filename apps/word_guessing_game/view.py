@@ -1,9 +1,9 @@
 """Creates the GUI for the word guessing game"""
 import os
 
-from PySide6.QtWidgets import QGridLayout, QHBoxLayout, QLabel, QLineEdit, QMainWindow, QPushButton, \
-    QVBoxLayout, QWidget
-from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QAbstractItemView, QGridLayout, QHBoxLayout, QLabel, QLineEdit, QListView, \
+    QMainWindow, QPushButton, QVBoxLayout, QWidget
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
 
 
 class LetterTile(QLabel):
@@ -112,6 +112,30 @@ class OneBoardRow(QWidget):
             t.clear_tile()
 
 
+class CandidateListModel(QAbstractListModel):
+    """
+    List model over the remaining possible words (a numpy bytes array). Qt only asks for the
+    rows that are visible, so a list of thousands of words costs no more than a few.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.words = []
+
+    def set_words(self, words):
+        """replaces the words displayed"""
+        self.beginResetModel()
+        self.words = words
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.words)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.words[index.row()].decode("utf-8", "replace")
+
+
 class WordGuesserView(QMainWindow):
     """Class implementing the GUI for the game"""
 
@@ -183,6 +207,17 @@ class WordGuesserView(QMainWindow):
         menu_layout.addLayout(game_result_layout)
         game_result_layout.addSpacing(5)
 
+        # remaining possible words
+        possible_words_layout = QVBoxLayout()
+        possible_words_title = QLabel("Possible Words:")
+        possible_words_title.setObjectName("title")
+        self.possible_words_count = QLabel("")
+        self.possible_words_count.setObjectName("label")
+        possible_words_layout.addWidget(possible_words_title)
+        possible_words_layout.addSpacing(5)
+        possible_words_layout.addWidget(self.possible_words_count)
+        menu_layout.addLayout(possible_words_layout)
+
         # choose difficulty buttons
         choose_diff_layout = QHBoxLayout()
         self.easy_difficulty_button = QPushButton("Easy")
@@ -200,9 +235,12 @@ class WordGuesserView(QMainWindow):
         self.user_input.setMaxLength(15)
         self.user_input.setPlaceholderText("Write your guess!")
         self.submit_button = QPushButton("Submit")
+        self.hint_button = QPushButton("Hint")
         user_input_layout.addWidget(self.user_input)
         user_input_layout.addSpacing(10)
         user_input_layout.addWidget(self.submit_button)
+        user_input_layout.addSpacing(5)
+        user_input_layout.addWidget(self.hint_button)
 
         board_layout = QVBoxLayout()
         self.board = OneBoardRow(self)
@@ -210,7 +248,22 @@ class WordGuesserView(QMainWindow):
         board_layout.addSpacing(10)
         board_layout.addLayout(user_input_layout)
 
+        # list of the remaining possible words
+        self.possible_words_model = CandidateListModel(self)
+        self.possible_words = QListView()
+        self.possible_words.setModel(self.possible_words_model)
+        self.possible_words.setUniformItemSizes(True)
+        self.possible_words.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.possible_words.setMaximumHeight(120)
+        board_layout.addSpacing(10)
+        board_layout.addWidget(self.possible_words)
+
         # central layout setup for the ui
         central_widget_layout.addLayout(menu_layout, 0, 1, 2, 6)
         central_widget_layout.addLayout(choose_diff_layout, 3, 1, 1, 6)
         central_widget_layout.addLayout(board_layout, 5, 1, 5, 6)
+
+    def show_possible_words(self, words):
+        """Shows the count and the list of the remaining possible words"""
+        self.possible_words_count.setText(f"{len(words):,}")
+        self.possible_words_model.set_words(words)
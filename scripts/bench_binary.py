@@ -0,0 +1,57 @@
+"""
+Benchmarks the binary encoding of the translator on 1 MB of mixed ASCII and emoji text: the
+previous per-byte format(w, '08b') loop, a 256-entry lookup table joined in bulk, and the
+numpy encoders of Translator.
+
+    python -m scripts.bench_binary [--size MB] [--repeat N]
+"""
+import argparse
+import timeit
+
+from apps.emoji_to_text.translator import Translator
+
+_SAMPLE = "hello there 🙂 how are you :) all good 👍🏽 see you soon XD "
+
+_BYTE_TABLE = [format(w, "08b") for w in range(256)]
+
+
+def per_byte_loop(text):
+    """The previous implementation of convert_to_binary()"""
+    result = []
+    for w in bytearray(text, "utf-8"):
+        result.append(format(w, "08b"))
+    return "".join(result)
+
+
+def lookup_table(text):
+    """The 256-entry table alternative"""
+    return "".join(map(_BYTE_TABLE.__getitem__, text.encode("utf-8")))
+
+
+def main():
+    """Prints the time of each encoder and checks they agree"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=float, default=1.0, help="MB of UTF-8 text")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    translator = Translator()
+    text = _SAMPLE * max(1, int(args.size * 1e6 / len(_SAMPLE.encode("utf-8"))))
+    assert per_byte_loop(text) == lookup_table(text) == translator.convert_to_binary(text)
+
+    encoders = {
+        "format() per byte": per_byte_loop,
+        "lookup table": lookup_table,
+        "convert_to_binary": translator.convert_to_binary,
+        "convert_to_bits": translator.convert_to_bits,
+        "encode (packed)": lambda text: text.encode("utf-8"),
+    }
+    size_mb = len(text.encode("utf-8")) / 1e6
+    print(f"{size_mb:.1f} MB of text")
+    for name, encoder in encoders.items():
+        seconds = min(timeit.repeat(lambda: encoder(text), number=1, repeat=args.repeat))
+        print(f"{name:18} {seconds * 1000:9.2f} ms {size_mb / seconds:9.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Measures the startup time of the emoji translator: building the emoji index from the emot
+dictionaries against loading it from the on-disk cache. Each measurement runs in a fresh
+interpreter so that module imports are counted.
+
+    python -m scripts.bench_emoji_index [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MEASURE = """
+import time
+start = time.perf_counter()
+from apps.emoji_to_text.index import load_index
+load_index({cache_dir!r})
+print(time.perf_counter() - start)
+"""
+
+
+def time_startup(cache_dir):
+    """Runs load_index in a new interpreter and returns its duration in seconds"""
+    result = subprocess.run([sys.executable, "-c", _MEASURE.format(cache_dir=cache_dir)],
+                            cwd=_REPO_ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """Prints the median cold (build and save) and warm (load) startup times"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    cold = []
+    warm = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold.append(time_startup(cache_dir))
+            warm.append(time_startup(cache_dir))
+    cold_ms = statistics.median(cold) * 1000
+    warm_ms = statistics.median(warm) * 1000
+    print(f"build from emot (no cache): {cold_ms:8.2f} ms")
+    print(f"load from cache:            {warm_ms:8.2f} ms")
+    print(f"speedup:                    {cold_ms / warm_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
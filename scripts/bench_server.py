@@ -0,0 +1,120 @@
+"""
+Load test of the translation server on localhost: starts the server in a subprocess on a free
+port, then opens concurrent keep-alive connections that pipeline requests of a synthetic chat
+log. Prints the requests per second and latency percentiles of single and batch requests.
+
+    python -m scripts.bench_server [--connections 8] [--depth 4] [--requests 20000]
+                                   [--batch 50] [--large] [--jobs 1]
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+from scripts.bench_translation_cache import make_chat_log
+
+
+def request_bytes(path, payload):
+    """Returns the bytes of a POST of the JSON payload"""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return (f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode("ascii") + body
+
+
+async def read_response(reader):
+    """Reads one response, returns (status, body)"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return int(lines[0].split(" ")[1]), await reader.readexactly(length)
+
+
+async def run_connection(port, requests, depth, latencies):
+    """Sends the requests over one connection, at most depth of them unanswered at a time"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    window = asyncio.Semaphore(depth)
+    sent_at = asyncio.Queue()
+
+    async def send():
+        for data in requests:
+            await window.acquire()
+            await sent_at.put(time.perf_counter())
+            writer.write(data)
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    for _ in requests:
+        status, _ = await read_response(reader)
+        if status != 200:
+            raise RuntimeError(f"server answered {status}")
+        latencies.append(time.perf_counter() - await sent_at.get())
+        window.release()
+    await sender
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load(port, requests, connections, depth):
+    """Spreads the requests over the connections, returns (seconds, latencies)"""
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_connection(port, requests[i::connections], depth, latencies)
+                           for i in range(connections)))
+    return time.perf_counter() - start, latencies
+
+
+def report(name, count, seconds, latencies):
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e3
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e3
+    print(f"{name:8} {count:7} requests in {seconds:6.2f} s: {count / seconds:9,.0f} req/s, "
+          f"p50 {p50:6.2f} ms, p99 {p99:6.2f} ms")
+
+
+def main():
+    """Starts the server, runs the load and prints the results"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=4, help="pipelined requests per connection")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=50, help="messages per batch request")
+    parser.add_argument("--large", action="store_true",
+                        help="also send requests large enough for the worker pool")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes of the server")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "apps.emoji_to_text.server", "--port", "0",
+         "--jobs", str(args.jobs)], stdout=subprocess.PIPE, text=True)
+    try:
+        # "Listening on http://127.0.0.1:PORT"
+        port = int(server.stdout.readline().rsplit(":", 1)[1])
+        messages = make_chat_log(args.requests, args.seed)
+        singles = [request_bytes("/translate", {"text": message, "modes": ["full", "first"]})
+                   for message in messages]
+        batches = [request_bytes("/batch", {"texts": messages[i:i + args.batch],
+                                            "modes": ["full", "first"]})
+                   for i in range(0, len(messages), args.batch)]
+        runs = [("single", singles), ("batch", batches)]
+        if args.large:
+            # distinct texts of 256k characters, so that none is answered from a cache
+            text = " ".join(messages)
+            runs.append(("large", [request_bytes("/translate", {"text": text[i:i + (1 << 18)]})
+                                   for i in range(20)]))
+        for name, requests in runs:
+            seconds, latencies = asyncio.run(load(port, requests, args.connections, args.depth))
+            report(name, len(requests), seconds, latencies)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Measures the throughput of the emoji tokenizer, in MB of UTF-8 text per second, on large
+generated inputs: plain prose, prose with spaced emoji and emoticons, and dense unspaced
+emoji (skin tones, ZWJ sequences and flags).
+
+    python -m scripts.bench_tokenizer [--size MB] [--repeat N]
+"""
+import argparse
+import timeit
+
+from apps.emoji_to_text.index import load_index
+from apps.emoji_to_text.tokenizer import EmojiTokenizer
+
+_PROSE = "the quick brown fox jumps over the lazy dog, then sleeps until noon. "
+_MIXED = "hello there 🙂 how are you :) all good 👍 see you soon XD, ok:) "
+_DENSE = "hi🙂🙂👍🏽👨‍👩‍👧🇫🇷❤️:D "
+
+SAMPLES = {
+    "prose": _PROSE,
+    "mixed": _MIXED,
+    "dense emoji": _DENSE,
+}
+
+
+def make_text(sample, size_mb):
+    """Repeats the sample until the text is about size_mb of UTF-8"""
+    sample_size = len(sample.encode("utf-8"))
+    return sample * max(1, int(size_mb * 1e6 / sample_size))
+
+
+def main():
+    """Prints the matches found and the throughput of finditer() for each sample"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=float, default=4.0, help="MB of text per sample")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tokenizer = EmojiTokenizer(load_index().trie)
+    for name, sample in SAMPLES.items():
+        text = make_text(sample, args.size)
+        size_mb = len(text.encode("utf-8")) / 1e6
+        matches = sum(1 for _ in tokenizer.finditer(text))
+        seconds = min(timeit.repeat(lambda: sum(1 for _ in tokenizer.finditer(text)),
+                                    number=1, repeat=args.repeat))
+        print(f"{name:12} {size_mb:6.1f} MB {matches:9d} matches {size_mb / seconds:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Microbenchmark of Translator.translate_emoji() on short and long messages.
+The baseline rebuilds the keyword table with get_all_keywords() on every call, as the
+translator used to, so the two lines of each table can be compared directly.
+
+    python -m scripts.bench_translate [--repeat N]
+"""
+import argparse
+import timeit
+
+from apps.emoji_to_text.translator import Translator
+
+_WORDS = "hello there 🙂 how are you :) all good 👍 see you soon XD".split(" ")
+
+MESSAGES = {
+    "short (12 words)": " ".join(_WORDS),
+    "long (12k words)": " ".join(_WORDS * 1000),
+}
+
+
+def baseline_translate(translator):
+    """The previous implementation: one full walk of the trie per message"""
+    mappings = translator.kp_all_emoji.get_all_keywords()
+    result_first_letter = []
+    result_middle_letter = []
+    result_last_letter = []
+    result_full_word = []
+    for el in translator.message.split(" "):
+        if el not in mappings:
+            result_first_letter.append(el)
+            result_middle_letter.append(el)
+            result_last_letter.append(el)
+            result_full_word.append(el)
+        else:
+            val = mappings[el]
+            result_first_letter.append(val[0])
+            result_middle_letter.append(val[(len(val) // 2)])
+            result_last_letter.append(val[-1])
+            result_full_word.append(val)
+    full_meaning = " ".join(result_full_word)
+    return (" ".join(result_first_letter), " ".join(result_middle_letter),
+            " ".join(result_last_letter), full_meaning,
+            translator.convert_to_binary(full_meaning))
+
+
+def main():
+    """Prints the time per call of the baseline and of translate_emoji()"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # the same message is translated over and over, which the caches would answer directly
+    translator = Translator(cache_entries=0, word_cache_entries=0)
+    for name, message in MESSAGES.items():
+        translator.message = message
+        number = 2000 if len(message) < 1000 else 20
+        baseline = min(timeit.repeat(lambda: baseline_translate(translator),
+                                     number=number, repeat=args.repeat)) / number
+        current = min(timeit.repeat(translator.translate_emoji,
+                                    number=number, repeat=args.repeat)) / number
+        print(f"{name:18} get_all_keywords per call: {baseline * 1e6:10.1f} us")
+        print(f"{name:18} translate_emoji:           {current * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
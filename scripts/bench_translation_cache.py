@@ -0,0 +1,63 @@
+"""
+Benchmarks the message and word caches of the translator on a synthetic chat log: messages
+are drawn with a Zipf-like distribution from a pool of phrases, half of them verbatim and half
+rebuilt from common words, so both caches get exercised. Prints the time per message with and
+without the caches and their hit rates.
+
+    python -m scripts.bench_translation_cache [--messages N] [--seed S]
+"""
+import argparse
+import random
+import time
+
+from apps.emoji_to_text.index import load_index
+from apps.emoji_to_text.translator import Translator
+
+_WORDS = ("hi hello ok lol yes no see you soon thanks good night morning what where when "
+          "🙂 😂 👍 👍🏽 ❤️ 🔥 :) :D XD ;) :( 🇫🇷 👨‍👩‍👧").split()
+
+
+def make_chat_log(count, seed):
+    """Returns count chat messages with repeated phrases and words"""
+    rng = random.Random(seed)
+    phrases = [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 10)))
+               for _ in range(2000)]
+    weights = [1 / (rank + 1) for rank in range(len(phrases))]
+    messages = []
+    for phrase in rng.choices(phrases, weights, k=count):
+        if rng.random() < 0.5:
+            messages.append(phrase)
+        else:
+            messages.append(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 14))))
+    return messages
+
+
+def run(translator, messages):
+    """Translates every message into its full meaning and returns the seconds it took"""
+    start = time.perf_counter()
+    for message in messages:
+        translator.translate_modes(message, ("full",))
+    return time.perf_counter() - start
+
+
+def main():
+    """Prints the time per message with and without caches, and the cache statistics"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    index = load_index()
+    messages = make_chat_log(args.messages, args.seed)
+    uncached = run(Translator(index, cache_entries=0, word_cache_entries=0), messages)
+    cached_translator = Translator(index)
+    cached = run(cached_translator, messages)
+    print(f"no cache:    {uncached / len(messages) * 1e6:7.2f} us per message")
+    print(f"with caches: {cached / len(messages) * 1e6:7.2f} us per message")
+    for name, info in cached_translator.cache_info().items():
+        print(f"{name:9} hit rate {info.hit_rate:6.1%}, {info.entries} entries, "
+              f"{info.bytes / 1e6:.1f} MB, {info.evictions} evictions")
+
+
+if __name__ == "__main__":
+    main()
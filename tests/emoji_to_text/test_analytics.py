@@ -0,0 +1,66 @@
+import io
+
+import pytest
+
+from apps.emoji_to_text import analytics
+from apps.emoji_to_text.analytics import PAIR_SEPARATOR, analyze, count_chunk, read_chunks
+from apps.emoji_to_text.tokenizer import EmojiTokenizer, build_trie
+
+LOOKUP = {"👍": "thumbs up", "🔥": "fire", "🇫🇷": "France", ":)": "smile"}
+
+
+class CountingFile(io.BytesIO):
+    """A file that remembers the largest read"""
+    largest_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.largest_read = max(self.largest_read, len(data))
+        return data
+
+
+@pytest.fixture
+def tokenizer():
+    return EmojiTokenizer(build_trie(LOOKUP))
+
+
+def test_count_chunk_groups_pairs_by_line(tokenizer):
+    emoji_counts, pair_counts, size = count_chunk("👍🔥 :) 👍\n🔥 x\n🇫🇷".encode(), tokenizer)
+    assert emoji_counts == {"👍": 2, "🔥": 2, ":)": 1, "🇫🇷": 1}
+    assert pair_counts == {f"👍{PAIR_SEPARATOR}🔥": 1, f":){PAIR_SEPARATOR}🔥": 1,
+                           f":){PAIR_SEPARATOR}👍": 1}
+    assert size == len("👍🔥 :) 👍\n🔥 x\n🇫🇷".encode())
+
+
+@pytest.mark.parametrize("data", [
+    "short line\n" * 50,
+    "👍 🔥 " * 200,
+    "🇫🇷👍é" * 300,
+    "no line end at all",
+])
+def test_read_chunks_keeps_words_and_characters_whole(data):
+    raw = data.encode()
+    file = CountingFile(raw)
+    chunks = list(read_chunks([file], chunk_bytes=64))
+    assert b"".join(chunks) == raw
+    assert file.largest_read <= 64
+    for chunk in chunks:
+        chunk.decode("utf-8")
+        if " " in data:
+            assert chunk.endswith((b"\n", b" ")) or chunk is chunks[-1]
+
+
+def test_a_single_long_line_is_not_read_at_once(tokenizer):
+    line = ("👍 🔥 " * 10000).encode()
+    file = CountingFile(line)
+    emoji_counter, pair_counter, read = analyze([file], exact=True, chunk_bytes=1024)
+    assert file.largest_read <= 1024 and read == len(line)
+    assert dict(emoji_counter.most_common(2)) == {"👍": 10000, "🔥": 10000}
+
+
+def test_index_is_loaded_once_per_process(monkeypatch):
+    loads = []
+    monkeypatch.setattr(analytics, "_INDEX", None)
+    monkeypatch.setattr(analytics, "load_index", lambda: loads.append(1) or object())
+    assert analytics.get_index() is analytics.get_index()
+    assert len(loads) == 1
@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+from apps.emoji_to_text.buffers import BinaryBuffer, TextBuffer
+from apps.emoji_to_text.tokenizer import cluster_boundary
+
+FAMILY = "👨‍👩‍👧"
+THUMBS = "👍🏽"
+FLAGS = "🇫🇷🇩🇪"
+
+
+def _rows(buffer):
+    return [buffer.row(i) for i in range(buffer.row_count())]
+
+
+@pytest.mark.parametrize("text", [
+    "abcdefghij" * 3,
+    "ab" + FAMILY * 4 + "cd",
+    "a" + THUMBS * 7 + "é́" * 3,
+    "x" + FLAGS * 5,
+    FLAGS * 3 + "y",
+    "abc" + FAMILY,
+])
+# no row is empty as long as the rows are longer than the clusters
+@pytest.mark.parametrize("row_length", [5, 6, 7, 10])
+def test_rows_never_split_a_cluster(text, row_length):
+    buffer = TextBuffer(text, row_length)
+    rows = _rows(buffer)
+    assert "".join(rows) == text
+    boundaries = {0}
+    position = 0
+    while position < len(text):
+        position = cluster_boundary(text, position + 1)
+        boundaries.add(position)
+    cut = 0
+    for row in rows:
+        assert row
+        cut += len(row)
+        assert cut in boundaries
+
+
+def test_plain_text_rows_keep_their_length():
+    buffer = TextBuffer("a" * 250, 100)
+    assert [len(row) for row in _rows(buffer)] == [100, 100, 50]
+    assert TextBuffer("", 100).row_count() == 0
+
+
+def test_cluster_boundary():
+    text = "a" + FAMILY + "b"
+    assert [cluster_boundary(text, pos) for pos in range(len(text) + 2)] == \
+        [0, 1] + [len(FAMILY) + 1] * len(FAMILY) + [len(text)] * 2
+    assert cluster_boundary(FLAGS, 1) == 2 and cluster_boundary(FLAGS, 3) == 4
+
+
+def test_binary_buffer_rows():
+    buffer = BinaryBuffer.from_text("hé", row_bytes=2)
+    assert len(buffer) == 24 and buffer.row_count() == 2
+    assert buffer.row(0) == "0110100011000011" and buffer.row(1) == "10101001"
+    out = io.StringIO()
+    buffer.write_to(out)
+    assert out.getvalue() == buffer.row(0) + buffer.row(1)
@@ -0,0 +1,63 @@
+import pytest
+
+from apps.emoji_to_text.cache import LRUCache, Memo
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions, info.entries) == (3, 1, 1, 2)
+    assert info.hit_rate == pytest.approx(0.75)
+
+
+def test_lru_byte_limit_and_resize():
+    cache = LRUCache(max_bytes=10)
+    cache.put("a", 1, 4)
+    cache.put("b", 2, 4)
+    cache.put("huge", 3, 11)
+    assert len(cache) == 2 and cache.bytes == 8
+    cache.put("a", 1, 5)
+    assert cache.bytes == 9
+    cache.resize("a", 8)
+    # b was used least recently
+    assert cache.get("b") is None and cache.bytes == 8
+    cache.resize("gone", 100)
+    cache.clear()
+    assert len(cache) == 0 and cache.info().hits == 0
+
+
+def test_disabled_lru_keeps_nothing():
+    cache = LRUCache(max_entries=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None and cache.info().hit_rate == 0.0
+
+
+def test_memo_computes_once_and_evicts_the_oldest():
+    calls = []
+
+    def square(key):
+        calls.append(key)
+        return key * key
+
+    memo = Memo(square, lambda key, value: 1, max_entries=2)
+    assert [memo[k] for k in (2, 3, 2)] == [4, 9, 4]
+    memo.count_lookups(3)
+    assert calls == [2, 3]
+    assert memo[4] == 16 and 2 not in memo
+    memo.count_lookups(1)
+    info = memo.info()
+    assert (info.hits, info.misses, info.evictions, info.entries) == (1, 3, 1, 2)
+
+
+def test_memo_byte_limit():
+    memo = Memo(str.upper, lambda key, value: len(value), max_bytes=5)
+    assert memo["abc"] == "ABC" and memo["de"] == "DE" and memo.bytes == 5
+    assert memo["toolong"] == "TOOLONG" and "toolong" not in memo
+    assert memo["f"] == "F" and "abc" not in memo
+    memo.clear()
+    assert len(memo) == 0 and memo.bytes == 0 and memo.info().misses == 0
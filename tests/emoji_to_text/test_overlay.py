@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from apps.emoji_to_text.index import letter_views
+from apps.emoji_to_text.overlay import DictionaryOverlay, clean_meaning
+from apps.emoji_to_text.tokenizer import EmojiTokenizer, build_trie
+
+BASE = {"👍": letter_views("thumbs up"), "🔥": letter_views("fire")}
+
+
+@pytest.fixture
+def overlay_file(tmp_path):
+    path = tmp_path / "custom_emoji.yaml"
+    mtime = [1_000_000_000]
+
+    def write(text):
+        path.write_text(text, encoding="utf-8")
+        # a new modification time on every write, however fast the writes come
+        mtime[0] += 1_000_000_000
+        os.utime(path, ns=(mtime[0], mtime[0]))
+    return str(path), write
+
+
+def _make(path):
+    lookup = dict(BASE)
+    trie = build_trie(lookup)
+    tokenizer = EmojiTokenizer(trie)
+    return DictionaryOverlay(path, lookup, tokenizer, check_interval=0), lookup, trie
+
+
+def _matches(overlay, text):
+    return [text[start:end] for start, end, _ in overlay.tokenizer.finditer(text)]
+
+
+def test_clean_meaning():
+    assert clean_meaning(":thumbs_up: ") == "thumbs up"
+    assert clean_meaning(42) == "42"
+
+
+def test_entries_are_added_changed_and_restored(overlay_file):
+    path, write = overlay_file
+    overlay, index_lookup, index_trie = _make(path)
+    assert not overlay.check()
+
+    write("🦊: fox\n👍: ':approve:'\n🔥: ''\n")
+    assert overlay.check()
+    assert overlay.lookup["🦊"][0] == "fox" and overlay.lookup["👍"][0] == "approve"
+    assert "🔥" not in overlay.lookup
+    assert _matches(overlay, "🦊 👍 🔥") == ["🦊", "👍"]
+    # the index itself is left alone
+    assert index_lookup == BASE and "🦊" not in index_trie
+
+    write("🦊: fox\n")
+    assert overlay.check()
+    assert overlay.lookup["👍"][0] == "thumbs up" and overlay.lookup["🔥"][0] == "fire"
+    assert _matches(overlay, "🦊 👍 🔥") == ["🦊", "👍", "🔥"]
+
+    os.remove(path)
+    assert overlay.check()
+    assert overlay.lookup == BASE
+
+
+def test_broken_file_keeps_the_previous_entries(overlay_file, capsys):
+    path, write = overlay_file
+    overlay, _, _ = _make(path)
+    write("🦊: fox\n")
+    assert overlay.check()
+    write("🦊: [unclosed\n")
+    assert not overlay.check()
+    write("- a list\n")
+    assert not overlay.check()
+    assert overlay.lookup["🦊"][0] == "fox"
+    assert capsys.readouterr().out.count("Yaml error") == 2
+
+
+def test_checks_are_rate_limited(overlay_file):
+    path, write = overlay_file
+    overlay, _, _ = _make(path)
+    overlay.check_interval = 3600
+    assert not overlay.check()
+    write("🦊: fox\n")
+    assert not overlay.check()
+    assert "🦊" not in overlay.lookup
@@ -0,0 +1,68 @@
+import pytest
+
+from apps.emoji_to_text.phrases import PhraseMatcher, build_phrase_trie, is_emoji, phrase_words
+
+MAPPING = {
+    "👍": "thumbsup",
+    "👍🏽": "thumbs up medium skin tone",
+    "🐕": "dog",
+    "🐕‍🦺": "dog2",
+    "🔥": "fire",
+    "👮": "police officer",
+    "🌑": "new moon",
+    "🌒": "new moon with face",
+    ":-)": "Happy face smiley",
+    ":)": "Happy face smiley",
+    "😀": "happy face smiley",
+}
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return PhraseMatcher(build_phrase_trie(MAPPING))
+
+
+def test_phrase_words():
+    assert phrase_words("Man’s Thumbs-UP") == ["man's", "thumbs", "up"]
+    assert is_emoji("👍") and is_emoji("1️⃣") and not is_emoji(":-)")
+
+
+@pytest.mark.parametrize("text", [
+    "I love my dog and the cat",
+    "The man and woman took the baby to the bank",
+    "There was a fire at the office, top floor",
+    "Thumbsup",
+])
+def test_common_prose_is_unchanged(matcher, text):
+    assert matcher.replace(text) == text
+
+
+def test_phrases_are_replaced(matcher):
+    assert matcher.replace("Thumbs up, a police  officer!") == "👍, a 👮!"
+    assert matcher.replace("new moon with face") == "🌒"
+    assert matcher.replace("new moon, with face") == "🌑, with face"
+    # emoji are preferred to emoticons for the same meaning
+    assert matcher.replace("happy face smiley") == "😀"
+
+
+def test_shortcodes(matcher):
+    assert matcher.replace(":dog: :fire: :thumbs_up: :new_moon:") == "🐕 🔥 👍 🌑"
+    assert matcher.replace(":thumbsup:") == "👍"
+    assert matcher.replace("dog: :dog :cat:") == "dog: :dog :cat:"
+
+
+def test_finditer_spans(matcher):
+    text = "a :dog: and a thumbs up"
+    spans = list(matcher.finditer(text))
+    assert [text[start:end] for start, end, _ in spans] == [":dog:", "thumbs up"]
+
+
+def test_full_index_leaves_prose_alone(tmp_path):
+    pytest.importorskip("emot")
+    pytest.importorskip("flashtext")
+    from apps.emoji_to_text.index import load_index
+    index_matcher = PhraseMatcher(load_index(str(tmp_path)).phrases)
+    prose = ("I love my dog and the cat. The man and woman took the baby to the bank. "
+             "Be right back, on top of things at the office, the fire is out.")
+    assert index_matcher.replace(prose) == prose
+    assert index_matcher.replace("thumbs up :fire:") == "👍 🔥"
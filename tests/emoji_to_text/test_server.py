@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+from apps.emoji_to_text.server import HttpError, TranslationServer, parse_modes, read_request
+
+
+class EchoTranslator:
+    """Stands in for Translator: every mode returns the text upper-cased"""
+    def translate_modes(self, text, modes):
+        if text == "boom":
+            raise RuntimeError("boom")
+        return [text.upper() for _ in modes]
+
+
+def _reader(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def _post(path, payload):
+    body = json.dumps(payload).encode()
+    return (f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+async def _exchange(data):
+    """Runs the server on a local port, sends data and returns every response received"""
+    server = await asyncio.start_server(TranslationServer(EchoTranslator()).handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(data + b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        received = await reader.read()
+        writer.close()
+    return [json.loads(part.split(b"\r\n\r\n", 1)[1].split(b"HTTP/1.1")[0])
+            for part in received.split(b"HTTP/1.1 ")[1:]], received
+
+
+@pytest.mark.parametrize("modes", [[["full"]], [{"a": 1}], [1], [], "nope", {"full": 1}])
+def test_parse_modes_rejects_invalid_modes(modes):
+    with pytest.raises(HttpError) as error:
+        parse_modes({"modes": modes})
+    assert error.value.status == 400
+
+
+def test_parse_modes_accepts_list_and_comma_string():
+    assert parse_modes({}) == ["full"]
+    assert parse_modes({"modes": "full, first"}) == ["full", "first"]
+
+
+def test_negative_content_length_is_rejected():
+    data = b"POST /translate HTTP/1.1\r\nContent-Length: -5\r\n\r\n"
+    with pytest.raises(HttpError) as error:
+        asyncio.run(read_request(_reader(data)))
+    assert error.value.status == 400
+
+
+def test_pipelined_requests_survive_bad_and_failing_ones():
+    data = (_post("/translate", {"text": "hi"})
+            + _post("/translate", {"text": "hi", "modes": [["full"]]})
+            + _post("/translate", {"text": "boom"})
+            + _post("/batch", {"texts": ["a", "b"], "modes": ["full"]}))
+    payloads, raw = asyncio.run(_exchange(data))
+    assert raw.count(b"HTTP/1.1 ") == 5
+    assert payloads[0] == {"full": "HI"}
+    assert b"400 Bad Request" in raw and b"500 Internal Server Error" in raw
+    assert payloads[3] == {"results": [{"full": "A"}, {"full": "B"}]}
+    assert payloads[4] == {"status": "ok"}
+
+
+def test_unexpected_error_in_respond_is_a_500():
+    class Broken(TranslationServer):
+        def respond(self, request, keep_alive):
+            raise KeyError("bug")
+
+    async def run():
+        server = await asyncio.start_server(Broken(EchoTranslator()).handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n")
+            received = await reader.read()
+            writer.close()
+        return received
+
+    assert asyncio.run(run()).startswith(b"HTTP/1.1 500")
@@ -0,0 +1,50 @@
+import collections
+import random
+
+import numpy as np
+
+from apps.emoji_to_text.sketch import CountMinSketch, TopK, key_hashes
+
+
+def test_key_hashes_are_stable_and_odd():
+    h1, h2 = key_hashes(["👍", "🔥"])
+    again_h1, again_h2 = key_hashes(["👍", "🔥"])
+    assert (h1 == again_h1).all() and (h2 == again_h2).all()
+    assert (h2 % 2 == 1).all()
+
+
+def test_sketch_never_underestimates():
+    rng = random.Random(0)
+    counts = collections.Counter(f"key{rng.randrange(2000)}" for _ in range(20000))
+    sketch = CountMinSketch(width=1024, depth=4)
+    items = list(counts.items())
+    for start in range(0, len(items), 100):
+        sketch.add(dict(items[start:start + 100]))
+    keys = list(counts)
+    estimates = sketch.estimate(keys)
+    true = np.array([counts[key] for key in keys])
+    assert (estimates >= true).all()
+    assert sketch.total == 20000
+    # within the bound of most keys, e * total / width
+    assert np.mean(estimates - true <= np.e * 20000 / 1024) > 0.95
+    assert sketch.estimate([]).size == 0
+
+
+def test_merge_adds_the_counts():
+    first, second = CountMinSketch(64, 2), CountMinSketch(64, 2)
+    first.add({"a": 2})
+    second.add({"a": 3, "b": 1})
+    first.merge(second)
+    assert first.estimate(["a"])[0] >= 5 and first.total == 6
+
+
+def test_top_k_keeps_the_largest_counts():
+    top = TopK(3)
+    running = collections.Counter()
+    rng = random.Random(1)
+    for _ in range(2000):
+        key = f"k{min(int(rng.expovariate(0.5)), 30)}"
+        running[key] += 1
+        top.offer(key, running[key])
+    assert [key for key, _ in top.items()] == [key for key, _ in running.most_common(3)]
+    assert dict(top.items()) == dict(running.most_common(3))
@@ -0,0 +1,63 @@
+import pytest
+
+from apps.emoji_to_text.tokenizer import EmojiTokenizer, build_trie, cluster_end, copy_trie
+
+LOOKUP = {
+    "👍": "thumbs up",
+    "👨‍👩‍👧": "family",
+    "👨": "man",
+    "🇫🇷": "France",
+    ":)": "smile",
+    ":-)": "smile nose",
+    "XD": "laughing",
+    "<(_ _)>": "bow",
+}
+
+
+@pytest.fixture
+def tokenizer():
+    return EmojiTokenizer(copy_trie(build_trie(LOOKUP)))
+
+
+def _values(tokenizer, text):
+    return [(text[start:end], value) for start, end, value in tokenizer.finditer(text)]
+
+
+def test_cluster_end():
+    assert cluster_end("👨‍👩‍👧x", 0) == 5
+    assert cluster_end("👍🏽x", 0) == 2
+    assert cluster_end("🇫🇷🇩🇪", 0) == 2
+    assert cluster_end("é́", 0) == 2
+    assert cluster_end("ab", 0) == 1
+
+
+def test_longest_match_and_absorbed_modifiers(tokenizer):
+    assert _values(tokenizer, "hi👨‍👩‍👧👍🏽 :-)") == [
+        ("👨‍👩‍👧", "family"), ("👍🏽", "thumbs up"), (":-)", "smile nose")]
+
+
+def test_no_match_inside_a_cluster(tokenizer):
+    # the man of an unknown ZWJ sequence is not a match on his own
+    assert _values(tokenizer, "👨‍🚀") == []
+    assert _values(tokenizer, "🇩🇪🇫🇷") == [("🇫🇷", "France")]
+
+
+def test_emoticons_need_a_boundary(tokenizer):
+    assert _values(tokenizer, "ok:). XD") == [(":)", "smile"), ("XD", "laughing")]
+    assert _values(tokenizer, "http://x :)a ABXD") == []
+
+
+def test_insert_and_delete(tokenizer):
+    tokenizer.insert("🦊", "fox")
+    tokenizer.insert("o_o", "stare")
+    assert _values(tokenizer, "🦊 o_o") == [("🦊", "fox"), ("o_o", "stare")]
+    assert tokenizer.delete("🦊") == "fox"
+    assert tokenizer.delete("🦊") is None
+    assert "🦊" not in tokenizer.trie
+    assert _values(tokenizer, "🦊") == []
+
+
+def test_keys_with_spaces_span_words(tokenizer):
+    assert tokenizer.spans_words("a <(_ _)> b")
+    assert not tokenizer.spans_words("a b")
+    assert _values(tokenizer, "a <(_ _)>") == [("<(_ _)>", "bow")]
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+RATE = 8000
+CHUNK = 80
+
+
+class FakeStream:
+    def __init__(self, callback, channels):
+        self.callback = callback
+        self.channels = channels
+
+    def start_stream(self):
+        pass
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAudio:
+    """A PyAudio whose input devices have the given channel counts, fed by the tests"""
+    input_channels = [1]
+    fail_open = False
+
+    def __init__(self):
+        self.streams = []
+
+    def open(self, stream_callback=None, channels=1, **kwargs):
+        if self.fail_open:
+            raise OSError("Invalid input device")
+        self.streams.append(FakeStream(stream_callback, channels))
+        return self.streams[-1]
+
+    def get_device_count(self):
+        return len(self.input_channels)
+
+    def get_device_info_by_index(self, index):
+        return {"name": f"fake {index}", "maxInputChannels": self.input_channels[index],
+                "maxOutputChannels": 0, "defaultSampleRate": RATE}
+
+    def get_default_output_device_info(self):
+        raise OSError("no output device")
+
+    def terminate(self):
+        pass
+
+
+def sine_chunk(level, channels=1):
+    """One chunk of int16 bytes of a 200 Hz sine at level, the same on every channel"""
+    t = np.arange(CHUNK) / RATE
+    samples = (level * 32767 * np.sin(2 * np.pi * 200 * t)).astype(np.int16)
+    return np.repeat(samples, channels).tobytes()
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    from apps.voice_recorder.recorder import AudioConfig
+
+    def make(**settings):
+        defaults = dict(rate=RATE, chunk=CHUNK, output_dir=str(tmp_path), journal_enabled=False,
+                        vad_hang_ms=20, vad_pre_roll_ms=0)
+        return AudioConfig(**{**defaults, **settings})
+    return make
+
+
+@pytest.fixture
+def fake_audio(monkeypatch):
+    """Replaces pyaudio.PyAudio with FakeAudio, skips the test when pyaudio is missing"""
+    pyaudio = pytest.importorskip("pyaudio")
+    monkeypatch.setattr(pyaudio, "PyAudio", FakeAudio)
+    monkeypatch.setattr(FakeAudio, "input_channels", [1])
+    return FakeAudio
+
+
+@pytest.fixture
+def make_recorder(fake_audio, make_config):
+    from apps.voice_recorder.recorder import AudioRecorder
+
+    def make(**settings):
+        return AudioRecorder(make_config(**settings))
+    return make
+
+
+@pytest.fixture
+def make_chunk():
+    return sine_chunk
+
+
+@pytest.fixture
+def feed():
+    def feed(stream, levels):
+        """Runs the callback of stream with one chunk per level"""
+        for level in levels:
+            stream.callback(sine_chunk(level, stream.channels), CHUNK, None, 0)
+    return feed
@@ -0,0 +1,54 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("pyaudio")
+
+from apps.voice_recorder.aio import AsyncAudioRecorder  # noqa: E402
+
+
+async def _collect(stream, count):
+    blocks = []
+    async for block in stream:
+        blocks.append(block)
+        if len(blocks) == count:
+            break
+    return blocks
+
+
+def test_vad_takes_are_reported(make_recorder, feed):
+    async def run():
+        recorder = AsyncAudioRecorder(recorder=make_recorder())
+        await recorder.start_vad()
+        stream = recorder.recorder.audio_system.streams[-1]
+        feed(stream, [0, 0.5, 0.5, 0, 0, 0, 0.5, 0])
+        await recorder.stop()
+        takes = [os.path.basename(path) for path in recorder.saved_takes]
+        await recorder.close()
+        return takes
+
+    assert asyncio.run(run()) == ["take_001.wav", "take_002.wav"]
+
+
+def test_multi_device_stream_and_save(make_recorder, fake_audio, feed):
+    fake_audio.input_channels = [2, 1]
+
+    async def run():
+        recorder = AsyncAudioRecorder(recorder=make_recorder(channels=2))
+        consumer = asyncio.ensure_future(_collect(recorder.stream(with_device=True), 4))
+        await asyncio.sleep(0)
+        await recorder.start_multi([0, 1])
+        streams = recorder.recorder.audio_system.streams
+        for _ in range(2):
+            feed(streams[0], [0.5])
+            feed(streams[1], [0.5])
+        blocks = await consumer
+        await recorder.stop()
+        saved = await recorder.save_tracks()
+        await recorder.close()
+        return blocks, saved
+
+    blocks, saved = asyncio.run(run())
+    assert [(device, block.shape[1]) for device, block in blocks] == [(0, 2), (1, 1)] * 2
+    assert [name for _, name, _ in saved] == ["fake 0", "fake 1"]
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+pytest.importorskip("pyaudio")
+pytest.importorskip("PySide6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from apps.voice_recorder import app as app_module  # noqa: E402
+from apps.voice_recorder.app import State, VoiceRecorder  # noqa: E402
+
+
+@pytest.fixture
+def make_app(fake_audio, make_config, monkeypatch):
+    QApplication.instance() or QApplication([])
+    created = []
+
+    def make(**settings):
+        monkeypatch.setattr(app_module, "load_audio_config", lambda path: make_config(**settings))
+        created.append(VoiceRecorder())
+        return created[-1]
+    yield make
+    for voice_recorder in created:
+        voice_recorder.window_closed()
+
+
+def test_multi_device_take_is_metered(make_app, fake_audio, feed):
+    fake_audio.input_channels = [2, 1]
+    voice_recorder = make_app(channels=2, device_indices=[0, 1])
+    voice_recorder.record_requested()
+    assert voice_recorder.state_machine == State.RECORDING
+    streams = voice_recorder.audio_recorder_logic.audio_system.streams
+    feed(streams[0], [0.5] * 20)
+    feed(streams[1], [0.1] * 20)
+    rms, peak, db, clipping, channel_clipping = voice_recorder.compute_byte_slice_size()
+    assert 0.3 < rms < 0.4 and 0.45 < peak < 0.55
+    assert channel_clipping == [False, False]
+    feed(streams[0], [1.0] * 5)
+    assert voice_recorder.compute_byte_slice_size()[3]
+
+
+def test_voice_activated_mode_refuses_several_devices(make_app, fake_audio):
+    fake_audio.input_channels = [1, 1]
+    voice_recorder = make_app(device_indices=[0, 1], vad_enabled=True)
+    voice_recorder.record_requested()
+    assert voice_recorder.state_machine == State.IDLE
+    assert not voice_recorder.audio_recorder_logic.audio_system.streams
+    assert "one device" in voice_recorder.audio_recorder_views.message_box.text()
@@ -0,0 +1,91 @@
+import json
+import os
+import types
+import wave
+
+import numpy as np
+import pytest
+
+from apps.voice_recorder import journal
+from apps.voice_recorder.journal import (BROKEN_DIR, CaptureJournal, interrupted_sessions,
+                                         quarantine_session, recover_session)
+
+
+def _config(sample_format="int16", channels=1):
+    return types.SimpleNamespace(channels=channels, rate=8000, sample_format=sample_format)
+
+
+def _read_wav(path):
+    with wave.open(str(path), "rb") as wf:
+        return wf.getnchannels(), wf.getsampwidth(), wf.readframes(wf.getnframes())
+
+
+def test_journal_roundtrip_across_segments(tmp_path):
+    samples = np.arange(-5000, 5000, dtype=np.int16).reshape(-1, 2)
+    data = samples.tobytes()
+    # segments of 1000 bytes, fed in chunks that do not line up with them
+    capture = CaptureJournal(str(tmp_path), _config(channels=2), segment_bytes=1000)
+    for start in range(0, len(data), 333):
+        capture.append(data[start:start + 333])
+    capture.close()
+    assert len([name for name in os.listdir(capture.session_dir)
+                if name.startswith("seg_")]) == len(data) // 1000
+    assert interrupted_sessions(str(tmp_path)) == [capture.session_dir]
+
+    wav_path = tmp_path / "recovered.wav"
+    assert recover_session(capture.session_dir, str(wav_path)) == len(samples)
+    assert _read_wav(wav_path) == (2, 2, data)
+    assert not os.path.exists(capture.session_dir)
+
+
+def test_float32_is_recovered_as_int16(tmp_path):
+    samples = np.array([0.0, 0.5, -0.5, 2.0], dtype=np.float32)
+    capture = CaptureJournal(str(tmp_path), _config("float32"))
+    capture.append(samples.tobytes())
+    capture.close()
+    wav_path = tmp_path / "recovered.wav"
+    recover_session(capture.session_dir, str(wav_path))
+    _, width, raw = _read_wav(wav_path)
+    assert width == 2
+    assert np.frombuffer(raw, np.int16).tolist() == [0, 16384, -16384, 32767]
+
+
+def test_discard_removes_the_session(tmp_path):
+    capture = CaptureJournal(str(tmp_path), _config())
+    capture.append(b"\x00\x01" * 10)
+    capture.discard()
+    assert interrupted_sessions(str(tmp_path)) == []
+
+
+def test_writer_error_stops_the_journal(tmp_path, monkeypatch, capsys):
+    def full_disk(self):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(CaptureJournal, "_sync", full_disk)
+    monkeypatch.setattr(journal, "_SYNC_BYTES", 1)
+    capture = CaptureJournal(str(tmp_path), _config())
+    capture.append(b"\x00\x01" * 10)
+    capture.writer.join(timeout=5)
+    assert capture.failed and not capture.writer.is_alive()
+    capture.append(b"\x00\x01" * 10)
+    assert capture.chunks.empty()
+    capture.close()
+    assert capsys.readouterr().out.count("Journal error") == 1
+
+
+@pytest.mark.parametrize("index", ["", '{"channels": 1, "ra', '{"channels": 1}', "[1]"])
+def test_broken_index_raises_an_expected_error(tmp_path, index):
+    session = tmp_path / "session"
+    session.mkdir()
+    (session / "index.json").write_text(index)
+    with pytest.raises((OSError, ValueError, KeyError, TypeError)):
+        recover_session(str(session), str(tmp_path / "out.wav"))
+
+
+def test_quarantine_moves_the_session_out_of_the_journal(tmp_path):
+    session = tmp_path / "session"
+    session.mkdir()
+    (session / "index.json").write_text(json.dumps({"channels": 1}))
+    quarantine_session(str(session))
+    assert interrupted_sessions(str(tmp_path)) == []
+    assert (tmp_path / BROKEN_DIR / "session" / "index.json").exists()
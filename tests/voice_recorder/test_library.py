@@ -0,0 +1,75 @@
+import math
+import os
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from apps.voice_recorder.library import RecordingsLibrary, analyze_take, gated_loudness
+
+
+def _write_wav(path, samples, rate=48000):
+    """Writes float samples of shape (n, channels) as an int16 wav"""
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(samples.shape[1])
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.round(samples * 32767).astype(np.int16).tobytes())
+
+
+def _sine(seconds, amplitude, rate=48000, freq=1000.0, channels=1):
+    t = np.arange(int(rate * seconds)) / rate
+    return np.repeat((amplitude * np.sin(2 * np.pi * freq * t))[:, None], channels, axis=1)
+
+
+def test_analyze_take_measures_a_sine(tmp_path):
+    path = tmp_path / "take_001.wav"
+    _write_wav(path, _sine(2.0, 0.5, channels=2))
+    metadata = analyze_take(str(path), str(tmp_path / "take_001.peaks.npz"))
+    assert metadata.error is None
+    assert metadata.channels == 2 and metadata.rate == 48000
+    assert metadata.duration == pytest.approx(2.0)
+    assert metadata.peak == pytest.approx(0.5, abs=1e-3)
+    assert metadata.rms == pytest.approx(0.5 / math.sqrt(2), abs=1e-3)
+    # a 1 kHz sine at -6 dBFS on two channels reads about -6 + 3 - 3.01 LUFS
+    assert metadata.lufs == pytest.approx(-6.0, abs=0.3)
+    levels = np.load(metadata.pyramid_path)
+    assert float(levels["arr_0"].max()) == pytest.approx(0.5, abs=1e-2)
+
+
+def test_analyze_take_errors_stay_per_take(tmp_path):
+    assert analyze_take(str(tmp_path / "gone.wav"), str(tmp_path / "x.npz")) is None
+    (tmp_path / "garbage.wav").write_bytes(b"not a wav file")
+    assert analyze_take(str(tmp_path / "garbage.wav"), str(tmp_path / "x.npz")).error
+    good = tmp_path / "good.wav"
+    _write_wav(good, _sine(0.5, 0.1))
+    metadata = analyze_take(str(good), str(tmp_path / "missing_dir" / "x.npz"))
+    assert metadata.error is None and metadata.pyramid_path is None
+
+
+def test_gated_loudness_of_silence_is_minus_infinity():
+    assert gated_loudness(np.zeros(20)) == -math.inf
+    assert gated_loudness(np.empty(0)) == -math.inf
+
+
+def test_refresh_indexes_only_stale_takes(tmp_path):
+    _write_wav(tmp_path / "take_001.wav", _sine(0.5, 0.2))
+    _write_wav(tmp_path / "take_002.wav", _sine(0.5, 0.4))
+    library = RecordingsLibrary(str(tmp_path))
+    with ProcessPoolExecutor(1) as executor:
+        for future in library.refresh(executor):
+            library.apply(future.result())
+        library.save()
+
+        reloaded = RecordingsLibrary(str(tmp_path))
+        reloaded.load()
+        assert [entry.name for entry in reloaded.sorted_entries()] == \
+            ["take_001.wav", "take_002.wav"]
+        assert reloaded.refresh(executor) == []
+
+        os.remove(tmp_path / "take_001.wav")
+        _write_wav(tmp_path / "take_003.wav", _sine(0.5, 0.3))
+        futures = reloaded.refresh(executor)
+        assert [future.result().name for future in futures] == ["take_003.wav"]
+    assert "take_001.wav" not in reloaded.entries
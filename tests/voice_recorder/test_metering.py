@@ -0,0 +1,41 @@
+import numpy as np
+
+from apps.voice_recorder.metering import TruePeakMeter, polyphase_interpolator
+
+
+def test_interpolator_phases_have_unity_gain():
+    phases = polyphase_interpolator(4, 12)
+    assert phases.shape == (4, 12)
+    np.testing.assert_allclose(phases.sum(axis=1), 1.0, atol=0.02)
+
+
+def test_true_peak_between_samples():
+    # a quarter of the sample rate sampled at 45 degrees peaks between the samples
+    n = np.arange(4096)
+    samples = np.sin(np.pi / 2 * n + np.pi / 4).astype(np.float32).reshape(-1, 1)
+    meter = TruePeakMeter(1)
+    meter.process(samples)
+    sample_peaks, true_peaks = meter.read()
+    assert abs(sample_peaks[0] - np.sqrt(0.5)) < 1e-3
+    assert true_peaks[0] > 0.95
+    assert meter.clipping(sample_peaks, true_peaks) == [False]
+
+
+def test_blocks_of_any_size_give_the_same_peaks():
+    samples = np.random.default_rng(0).uniform(-0.9, 0.9, (1000, 2)).astype(np.float32)
+    whole = TruePeakMeter(2)
+    whole.process(samples)
+    split = TruePeakMeter(2)
+    for start in range(0, 1000, 37):
+        split.process(samples[start:start + 37])
+    for expected, actual in zip(whole.read(), split.read()):
+        np.testing.assert_allclose(actual, expected, rtol=1e-5)
+
+
+def test_read_resets_and_clipping_is_per_channel():
+    meter = TruePeakMeter(2)
+    meter.process(np.array([[1.0, 0.1], [-1.0, 0.2]], dtype=np.float32))
+    assert meter.clipping(*meter.read()) == [True, False]
+    sample_peaks, true_peaks = meter.read()
+    assert not sample_peaks.any() and not true_peaks.any()
+    meter.process(np.empty((0, 2), np.float32))
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyaudio")
+
+from apps.voice_recorder.multitrack import DeviceTrack, align_tracks, drift_ppm  # noqa: E402
+
+
+def test_clock_fit_measures_the_device_rate(monkeypatch):
+    rate = 48000
+    measured = rate * (1 + 100e-6)
+    seen = []
+    track = DeviceTrack(0, "mic", 1, rate, [lambda data, t: seen.append((data, t))])
+    arrivals = iter(10.0 + (n + 1) * 480 / measured for n in range(50))
+    monkeypatch.setattr("time.perf_counter", lambda: next(arrivals))
+    for _ in range(50):
+        track.callback(b"\x00\x00" * 480, 480, None, 0)
+    start, fitted_rate = track.clock_fit()
+    assert abs(start - 10.0) < 1e-6
+    assert drift_ppm(fitted_rate, rate) == pytest.approx(100, abs=0.5)
+    assert track.frame_count == 24000 and len(seen) == 50 and seen[0][1] is track
+
+
+def test_clock_fit_falls_back_to_the_nominal_rate():
+    track = DeviceTrack(0, "mic", 1, 8000)
+    assert track.clock_fit() == (0.0, 8000.0)
+
+
+def test_align_tracks_compensates_drift_and_offset():
+    rate = 1000
+    t = np.arange(5000) / rate
+    ramp = lambda times: (times / 10).astype(np.float32).reshape(-1, 1)  # noqa: E731
+    # the second device starts 0.5 s later and its clock runs 1% fast
+    fast_rate = rate * 1.01
+    first = ramp(t)
+    second = ramp(0.5 + np.arange(5000) / fast_rate)
+    aligned = align_tracks([first, second], [(0.0, rate), (0.5, fast_rate)], rate)
+    assert aligned[0].shape == aligned[1].shape
+    # from the later start to the earlier end
+    assert aligned[0].shape[0] == 4500
+    np.testing.assert_allclose(aligned[0], aligned[1], atol=1e-5)
+    assert aligned[0][0, 0] == pytest.approx(0.05)
+
+
+def test_multi_device_recording_saves_aligned_tracks(make_recorder, fake_audio, feed):
+    fake_audio.input_channels = [2, 1]
+    audio_recorder = make_recorder(channels=2, device_indices=[0, 1])
+    audio_recorder.start_multi()
+    streams = audio_recorder.audio_system.streams
+    assert [stream.channels for stream in streams] == [2, 1]
+    for _ in range(10):
+        feed(streams[0], [0.5])
+        feed(streams[1], [0.25])
+    audio_recorder.stop()
+    saved = audio_recorder.save_tracks()
+    assert [os.path.basename(path) for path, _, _ in saved] == ["take_001_1.wav", "take_001_2.wav"]
+    assert [name for _, name, _ in saved] == ["fake 0", "fake 1"]
+
+
+def test_failed_open_closes_the_other_streams(make_recorder, fake_audio):
+    fake_audio.input_channels = [1, 1]
+    audio_recorder = make_recorder(device_indices=[0, 1])
+    original_open = fake_audio.open
+
+    def second_fails(self, **kwargs):
+        if self.streams:
+            raise OSError("device busy")
+        return original_open(self, **kwargs)
+
+    audio_recorder.audio_system.open = second_fails.__get__(audio_recorder.audio_system)
+    with pytest.raises(OSError):
+        audio_recorder.start_multi()
+    assert audio_recorder.tracks == [] and not audio_recorder.is_recording()
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+pytest.importorskip("pyaudio")
+
+from apps.voice_recorder.recorder import load_audio_config, save_device_chunks  # noqa: E402
+
+
+def test_vad_writes_one_numbered_take_per_utterance(make_recorder, feed):
+    audio_recorder = make_recorder(auto_increment=False)
+    audio_recorder.start_vad()
+    feed(audio_recorder.audio_system.streams[-1], [0, 0.5, 0.5, 0, 0, 0, 0.5, 0])
+    audio_recorder.stop()
+    assert [os.path.basename(path) for path in audio_recorder.saved_takes] == \
+        ["take_001.wav", "take_002.wav"]
+    assert audio_recorder.take_writer is None
+
+
+def test_vad_open_failure_leaves_no_writer(make_recorder, feed):
+    audio_recorder = make_recorder()
+    audio_recorder.audio_system.fail_open = True
+    with pytest.raises(OSError):
+        audio_recorder.start_vad()
+    assert audio_recorder.take_writer is None and audio_recorder.vad is None
+    # a plain recording can still be made and stopped afterwards
+    audio_recorder.audio_system.fail_open = False
+    audio_recorder.start()
+    feed(audio_recorder.audio_system.streams[-1], [0.5])
+    audio_recorder.stop()
+    assert len(audio_recorder.frames) == 1
+
+
+def test_take_writer_survives_a_failed_write(make_recorder, feed, monkeypatch, capsys):
+    audio_recorder = make_recorder()
+    write_take = audio_recorder.write_take
+    calls = []
+
+    def failing_once(frames, wav_name=None):
+        calls.append(wav_name)
+        if len(calls) == 1:
+            raise OSError("disk full")
+        return write_take(frames, wav_name)
+
+    monkeypatch.setattr(audio_recorder, "write_take", failing_once)
+    audio_recorder.start_vad()
+    feed(audio_recorder.audio_system.streams[-1], [0.5, 0, 0, 0.5, 0, 0])
+    audio_recorder.stop()
+    assert len(calls) == 2 and len(audio_recorder.saved_takes) == 1
+    assert "Take error: disk full" in capsys.readouterr().out
+
+
+def test_save_without_auto_increment_uses_the_prefix(make_recorder, make_chunk):
+    audio_recorder = make_recorder(auto_increment=False)
+    audio_recorder.frames = [make_chunk(0.5)]
+    assert os.path.basename(audio_recorder.save_wav()) == "take.wav"
+    assert os.path.basename(audio_recorder.save_wav("named.wav")) == "named.wav"
+
+
+def test_save_with_auto_increment_numbers_the_takes(make_recorder, make_chunk):
+    audio_recorder = make_recorder()
+    audio_recorder.frames = [make_chunk(0.5)]
+    names = [os.path.basename(audio_recorder.save_wav()) for _ in range(2)]
+    assert names == ["take_001.wav", "take_002.wav"]
+
+
+def test_calibrated_chunks_leave_config_yaml_untouched(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    config_text = ("# Audio capture settings\nchunk: 1024   # frames per read\n"
+                   "device_chunks:\n  Mic: {chunk: 256}\n  Desk: {chunk: 128}\n")
+    config_path.write_text(config_text)
+    assert save_device_chunks(str(config_path), {"Mic": {"chunk": 512}})
+    assert save_device_chunks(str(config_path), {"Speakers": {"playback_chunk": 2048}})
+    assert config_path.read_text() == config_text
+
+    config = load_audio_config(str(config_path))
+    assert config.chunk == 1024
+    assert config.device_chunks == {"Mic": {"chunk": 512}, "Desk": {"chunk": 128},
+                                    "Speakers": {"playback_chunk": 2048}}
+
+
+def test_broken_device_chunks_file_is_reported(tmp_path, capsys):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("chunk: 512\n")
+    (tmp_path / "device_chunks.yaml").write_text("[not, a, mapping]\n")
+    assert load_audio_config(str(config_path)).device_chunks == {}
+    assert not save_device_chunks(str(config_path), {"Mic": {"chunk": 256}})
+    assert capsys.readouterr().out.count("Yaml error") == 2
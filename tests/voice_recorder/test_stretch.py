@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from apps.voice_recorder.stretch import MIN_WINDOW_MS, WSOLAStretcher, window_frames
+
+RATE = 44100
+
+
+def _tone(seconds=1.0, channels=1):
+    t = np.arange(int(RATE * seconds)) / RATE
+    mono = 0.5 * np.sin(2 * np.pi * 220 * t)
+    return np.repeat(mono[:, None], channels, axis=1).astype(np.float32)
+
+
+def _play(stretcher, block):
+    blocks = []
+    finished = False
+    while not finished:
+        out, finished = stretcher.read(block)
+        assert out.shape[0] == block
+        blocks.append(out.copy())
+    return np.concatenate(blocks)
+
+
+def test_window_follows_the_chunk_within_bounds():
+    assert window_frames(RATE) == 1764
+    assert window_frames(RATE, 256) == 512
+    assert window_frames(RATE, 64) == int(RATE * MIN_WINDOW_MS / 1000) // 2 * 2
+    assert window_frames(RATE, 4096) == 1764
+
+
+@pytest.mark.parametrize("speed", [0.5, 1.0, 1.5, 3.0])
+def test_output_length_matches_speed(speed):
+    source = _tone()
+    output = _play(WSOLAStretcher(source, RATE, speed=speed, chunk=256), 256)
+    # the last block is padded with silence
+    assert abs(len(output) - len(source) / speed) < len(source) / speed * 0.02 + 256
+
+
+def test_read_more_than_max_block():
+    source = _tone(channels=2)
+    stretcher = WSOLAStretcher(source, RATE, speed=1.25, max_block=256, chunk=128)
+    out, _ = stretcher.read(100)
+    first = out.copy()
+    out, _ = stretcher.read(300)
+    assert out.shape == (300, 2)
+    out, _ = stretcher.read(1000)
+    assert out.shape == (1000, 2)
+    assert np.abs(first).max() > 0
+
+
+def test_speed_one_keeps_the_signal():
+    source = _tone()
+    output = _play(WSOLAStretcher(source, RATE, speed=1.0, chunk=512), 512)
+    # away from the edges, windows overlapping by half sum to one
+    middle = slice(2048, len(source) - 2048)
+    assert np.allclose(output[middle], source[middle], atol=5e-3)
+
+
+def test_start_frame_and_end():
+    source = _tone(0.2)
+    stretcher = WSOLAStretcher(source, RATE, speed=2.0, start_frame=len(source) - 100)
+    _, finished = stretcher.read(4096)
+    assert finished
@@ -0,0 +1,58 @@
+import numpy as np
+
+from apps.voice_recorder.vad import VADEvent, VoiceActivityDetector, chunk_features
+
+RATE = 8000
+CHUNK = 80  # 10 ms
+
+
+def _tone(level=0.5):
+    t = np.arange(CHUNK) / RATE
+    return (level * np.sin(2 * np.pi * 200 * t)).astype(np.float32).reshape(-1, 1)
+
+
+def _silence():
+    return np.zeros((CHUNK, 1), dtype=np.float32)
+
+
+def _push(vad, kinds):
+    """Feeds a sequence of "s" (speech) and "." (silence) chunks, returns the events"""
+    events = []
+    for number, kind in enumerate(kinds):
+        samples = _tone() if kind == "s" else _silence()
+        events.append(vad.push((number, kind), samples))
+    return events
+
+
+def test_chunk_features():
+    energy_db, zcr = chunk_features(_tone())
+    assert -10 < energy_db < -8 and zcr < 0.1
+    assert chunk_features(_silence())[0] < -100
+    noise = np.random.default_rng(0).uniform(-0.5, 0.5, (CHUNK, 1)).astype(np.float32)
+    assert chunk_features(noise)[1] > 0.35
+    assert chunk_features(np.empty((0, 1), np.float32)) == (-120.0, 0.0)
+
+
+def test_utterance_is_padded_and_trimmed():
+    vad = VoiceActivityDetector(RATE, CHUNK, hang_ms=30, pre_roll_ms=20)
+    events = _push(vad, "....sss.s....")
+    assert events.count(VADEvent.START) == 1
+    assert events[11] == VADEvent.STOP
+    take = vad.pop_take()
+    # two chunks of pre roll, the speech with its short gap, two chunks after it
+    assert [number for number, _ in take] == list(range(2, 11))
+    assert vad.pop_take() is None
+
+
+def test_noise_is_not_speech():
+    vad = VoiceActivityDetector(RATE, CHUNK)
+    noise = np.random.default_rng(1).uniform(-0.5, 0.5, (CHUNK, 1)).astype(np.float32)
+    assert all(vad.push(b"", noise) is None for _ in range(10))
+
+
+def test_flush_ends_the_utterance_in_progress():
+    vad = VoiceActivityDetector(RATE, CHUNK, hang_ms=1000, pre_roll_ms=0)
+    _push(vad, "..ss.")
+    assert vad.flush()
+    assert [kind for _, kind in vad.pop_take()] == ["s", "s"]
+    assert not vad.flush()
@@ -0,0 +1,51 @@
+import numpy as np
+
+from apps.word_guessing_game.candidates import (CandidateFilter, CandidateIndex, candidate_index,
+                                                letter_codes)
+from apps.word_guessing_game.filereader import WordList
+from apps.word_guessing_game.scoring import score
+
+WORDS = np.array([b"crate", b"trace", b"geese", b"eerie", b"abide", b"speed", b"Crane",
+                  b"caret"], dtype="S5")
+
+
+def _brute_force(guesses, target):
+    return sorted(word for word in WORDS.tolist()
+                  if all(score(guess, word.decode().lower()) == score(guess, target)
+                         for guess in guesses))
+
+
+def test_letter_codes():
+    codes = letter_codes(np.frombuffer(b"aZz-", dtype=np.uint8))
+    assert codes.tolist() == [0, 25, 25, 26]
+
+
+def test_index_counts_letters():
+    index = CandidateIndex(WORDS)
+    assert index.length == 5
+    assert index.counts[2, 4] == 3  # the three e of geese
+    assert index.position_bits[0][0] == 1 << 2  # c
+
+
+def test_filter_matches_brute_force():
+    index = CandidateIndex(WORDS)
+    for target in ("crate", "geese", "abide", "caret"):
+        guesses = []
+        candidates = CandidateFilter(index)
+        for guess in ("eerie", "trace", "speed"):
+            guesses.append(guess)
+            candidates.update(guess, score(guess, target))
+            assert sorted(candidates.words().tolist()) == _brute_force(guesses, target)
+
+
+def test_guess_of_another_length_is_ignored():
+    candidates = CandidateFilter(CandidateIndex(WORDS))
+    candidates.update("cat", score("cat", "crate"))
+    assert len(candidates) == len(WORDS)
+
+
+def test_candidate_index_is_built_once():
+    words = WordList(b"crate\ntrace\ncat\n")
+    assert candidate_index(words, 5) is candidate_index(words, 5)
+    assert candidate_index(words, 5).words.tolist() == [b"crate", b"trace"]
+    assert len(candidate_index(words, 4).words) == 0
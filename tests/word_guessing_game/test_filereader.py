@@ -0,0 +1,49 @@
+import threading
+
+import numpy as np
+import pytest
+
+from apps.word_guessing_game import filereader
+from apps.word_guessing_game.filereader import WordList, WordProvider, load_word_list
+
+
+@pytest.fixture(autouse=True)
+def fresh_word_lists(monkeypatch):
+    monkeypatch.setattr(filereader, "_WORD_LISTS", {})
+
+
+def test_word_list_parses_lines():
+    words = WordList(b"apple\r\npear\n\nfig\nplum")
+    assert list(words) == ["apple", "pear", "fig", "plum"]
+    assert len(words) == 4 and words[1] == "pear"
+    assert words.of_length(4).tolist() == [b"pear", b"plum"]
+    assert words.of_length(4).dtype == np.dtype("S4")
+    assert len(WordList()) == 0 and WordList().of_length(3).size == 0
+
+
+@pytest.mark.parametrize("mmap_min_bytes", [0, 1 << 20])
+def test_from_file(tmp_path, mmap_min_bytes):
+    path = tmp_path / "words.txt"
+    path.write_bytes(b"cat\ndog\n")
+    assert list(WordList.from_file(str(path), mmap_min_bytes)) == ["cat", "dog"]
+
+
+def test_word_lists_are_shared(tmp_path):
+    path = tmp_path / "easy.txt"
+    path.write_text("cat\ndog\n")
+    assert load_word_list(str(path)) is load_word_list(str(path))
+    provider = WordProvider(str(path), str(path), str(path))
+    assert provider.load_easy_words() is provider.hard_lst
+    assert provider.easy_count == 2
+
+
+def test_missing_file_gives_one_shared_empty_list(tmp_path, capsys):
+    missing = str(tmp_path / "missing.txt")
+    provider = WordProvider(missing, missing, missing)
+    threads = [threading.Thread(target=provider.load_medium_words) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert provider.medium_count == 0 and provider.load_hard_words() is provider.medium_lst
+    assert 1 <= capsys.readouterr().out.count("medium words not found") <= 4
@@ -0,0 +1,35 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from apps.word_guessing_game.scoring import (ABSENT, CORRECT, PRESENT, all_correct, as_letters,
+                                             pattern_dtype, score, score_many, states)
+
+
+@pytest.mark.parametrize("guess, target, expected", [
+    ("crate", "crate", [CORRECT] * 5),
+    ("geese", "crate", [ABSENT, ABSENT, ABSENT, ABSENT, CORRECT]),
+    ("eerie", "crate", [ABSENT, ABSENT, PRESENT, ABSENT, CORRECT]),
+    ("speed", "abide", [ABSENT, ABSENT, PRESENT, ABSENT, PRESENT]),
+    ("llama", "hello", [PRESENT, PRESENT, ABSENT, ABSENT, ABSENT]),
+])
+def test_score(guess, target, expected):
+    assert states(score(guess, target), 5) == expected
+
+
+def test_codes():
+    assert score("crate", "crate") == all_correct(5) == 242
+    assert pattern_dtype(5) == np.uint8 and pattern_dtype(6) == np.uint16
+    assert pattern_dtype(40) == np.uint64
+    with pytest.raises(ValueError):
+        pattern_dtype(41)
+
+
+def test_score_many_matches_score():
+    words = ["".join(letters) for letters in itertools.product("abe", repeat=4)]
+    for guess in ("abba", "eeee", "bead"):
+        expected = [score(guess, target) for target in words]
+        assert score_many(guess, words).tolist() == expected
+        assert score_many(guess.encode(), as_letters(np.array(words, dtype="S4"))).tolist() \
+            == expected
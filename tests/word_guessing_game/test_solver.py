@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+from apps.word_guessing_game import solver
+from apps.word_guessing_game.scoring import score, score_many
+from apps.word_guessing_game.solver import (HintSolver, build_matrix, cache_path, pattern_matrix,
+                                            split_entropies)
+
+WORDS = np.array([b"crate", b"trace", b"geese", b"eerie", b"abide", b"speed", b"crane",
+                  b"caret", b"react", b"elite"], dtype="S5")
+
+
+def test_matrix_is_cached(tmp_path):
+    matrix = pattern_matrix(WORDS, str(tmp_path), jobs=1)
+    assert isinstance(matrix, np.memmap)
+    assert os.path.exists(cache_path(WORDS, str(tmp_path)))
+    expected = np.stack([score_many(word, WORDS) for word in WORDS.tolist()])
+    np.testing.assert_array_equal(matrix, expected)
+    assert pattern_matrix(WORDS, str(tmp_path)).filename == matrix.filename
+
+
+def test_pool_build_matches(monkeypatch):
+    monkeypatch.setattr(solver, "_MIN_POOL_ROWS", 0)
+    monkeypatch.setattr(solver, "_ROWS_PER_TASK", 3)
+    out = np.empty((len(WORDS), len(WORDS)), dtype=np.uint8)
+    build_matrix(WORDS, out, jobs=2)
+    assert out[1, 0] == score("trace", "crate")
+    np.testing.assert_array_equal(out.diagonal(), 242)
+
+
+def test_unwritable_cache_still_gives_the_matrix(tmp_path, capsys):
+    blocked = tmp_path / "file"
+    blocked.write_text("")
+    matrix = pattern_matrix(WORDS, str(blocked / "cache"), jobs=1)
+    assert matrix.shape == (len(WORDS), len(WORDS))
+    assert "Could not save" in capsys.readouterr().out
+
+
+def test_split_entropies():
+    patterns = np.array([[0, 0, 0, 0], [0, 1, 2, 3], [0, 0, 1, 1]])
+    np.testing.assert_allclose(split_entropies(patterns), [0.0, 2.0, 1.0])
+
+
+def test_solver_finds_the_target(tmp_path):
+    matrix = pattern_matrix(WORDS, str(tmp_path), jobs=1)
+    for target in WORDS.tolist():
+        hints = HintSolver(WORDS, matrix)
+        for _ in range(len(WORDS)):
+            guess = hints.best_guess()
+            if guess == target.decode():
+                break
+            hints.update(guess, score(guess, target.decode()))
+        assert guess == target.decode()
+    hints = HintSolver(WORDS, matrix)
+    hints.update("zzzzz", score("zzzzz", "crate"))
+    hints.update("crate", 0)
+    assert hints.best_guess() is None